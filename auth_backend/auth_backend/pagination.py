@@ -0,0 +1,132 @@
+import base64
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def clamp_size(value, default, maximum):
+    """ A client-supplied page size or limit: `default` when missing, non-numeric or below 1, at most `maximum`. """
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    if size <= 0:
+        return default
+    return min(size, maximum)
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Cursor pagination keyed on (ordering_field, id), newest first.
+
+    Each page is a range scan on a composite index, so page N costs the same as
+    page 1 and nothing ever runs a COUNT(*) or an OFFSET. Cursors are opaque to
+    the client; they carry the key of the first/last row of the current page.
+    """
+    ordering_field = 'created_at'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        field = self.ordering_field
+
+        if cursor is None:
+            reverse = False
+            queryset = queryset.order_by(f'-{field}', '-pk')
+        else:
+            reverse, position, pk = cursor
+            if reverse:
+                # Walking back towards newer rows: scan ascending, flip afterwards
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gt': position}) | Q(**{field: position, 'pk__gt': pk})
+                ).order_by(field, 'pk')
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lt': position}) | Q(**{field: position, 'pk__lt': pk})
+                ).order_by(f'-{field}', '-pk')
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        return clamp_size(request.query_params.get(self.page_size_query_param), self.page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            decoded = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            direction, position, pk = decoded.split('|')
+            return direction == 'r', datetime.fromisoformat(position), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        position = getattr(row, self.ordering_field).isoformat()
+        raw = f"{'r' if reverse else 'f'}|{position}|{row.pk}"
+        encoded = base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CreatedAtPagination(KeysetPagination):
+    ordering_field = 'created_at'
+
+
+class SubmittedAtPagination(KeysetPagination):
+    ordering_field = 'submitted_at'
+
+
+class RequestedAtPagination(KeysetPagination):
+    ordering_field = 'requested_at'
@@ -0,0 +1,139 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import permissions, views
+from rest_framework.response import Response
+
+
+def model_tag(model, pk=None):
+    """ 'app_label.modelname' for the whole table, 'app_label.modelname:<pk>' for one row. """
+    tag = model._meta.label_lower
+    return tag if pk is None else f"{tag}:{pk}"
+
+
+class ResponseCache:
+    """
+    Caches serialized response data under the versions of the tags it depends on.
+
+    Invalidating a tag bumps its version, so every entry built against the old
+    version stops being addressable and ages out of the backend on its own.
+    The backend is whatever Django cache alias RESPONSE_CACHE_ALIAS points at:
+    local memory in development and tests, Redis in production.
+    """
+    prefix = 'rc'
+
+    def __init__(self, alias=None, timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias or getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+    @property
+    def default_timeout(self):
+        return self.timeout or getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+    def _tag_key(self, tag):
+        return f"{self.prefix}:tag:{tag}"
+
+    def _tag_versions(self, tags):
+        keys = [self._tag_key(tag) for tag in tags]
+        versions = self.cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # A lost version key must never fall back to a value old entries were
+                # stored under, so seed it from the clock rather than from 1.
+                self.cache.add(key, time.time_ns(), timeout=None)
+                versions[key] = self.cache.get(key)
+        return [versions[key] for key in keys]
+
+    def _entry_key(self, request, tags):
+        versions = self._tag_versions(tags)
+        raw = '|'.join([request.get_full_path(), *tags, *map(str, versions)])
+        return f"{self.prefix}:resp:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+    def _count(self, outcome):
+        key = f"{self.prefix}:stats:{outcome}"
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            if not self.cache.add(key, 1, timeout=None):
+                self.cache.incr(key)
+
+    def get(self, request, tags):
+        """
+        (key, entry), entry being None on a miss. A miss is set() under this
+        key: it is fixed before the view reads anything, so data built while
+        a tag is being invalidated lands under the old version, never the new.
+        """
+        key = self._entry_key(request, tags)
+        entry = self.cache.get(key)
+        self._count('hits' if entry is not None else 'misses')
+        return key, entry
+
+    def set(self, key, data, timeout=None):
+        self.cache.set(key, data, timeout or self.default_timeout)
+
+    def invalidate(self, *tags):
+        """ Bumps the tags' versions once the surrounding transaction commits, so readers can't re-cache pre-commit data. """
+        def bump():
+            for tag in tags:
+                key = self._tag_key(tag)
+                try:
+                    self.cache.incr(key)
+                except ValueError:
+                    self.cache.set(key, time.time_ns(), timeout=None)
+        transaction.on_commit(bump)
+
+    def stats(self):
+        counts = self.cache.get_many([f"{self.prefix}:stats:hits", f"{self.prefix}:stats:misses"])
+        hits = counts.get(f"{self.prefix}:stats:hits", 0)
+        misses = counts.get(f"{self.prefix}:stats:misses", 0)
+        total = hits + misses
+        return {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 4) if total else None}
+
+    def reset_stats(self):
+        self.cache.delete_many([f"{self.prefix}:stats:hits", f"{self.prefix}:stats:misses"])
+
+
+response_cache = ResponseCache()
+
+
+def cache_response(tags, timeout=None, cache=None):
+    """
+    Caches a view method's response data for anonymous GETs.
+
+    `tags` is a list of tags or a callable taking (request, *args, **kwargs) and
+    returning one. Authenticated users get per-user fields, so they always miss.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapped(view, request, *args, **kwargs):
+            store = cache or response_cache
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view_method(view, request, *args, **kwargs)
+
+            resolved = list(tags(request, *args, **kwargs) if callable(tags) else tags)
+            key, cached = store.get(request, resolved)
+            if cached is not None:
+                return Response(cached)
+
+            response = view_method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                store.set(key, response.data, timeout)
+            return response
+        return wrapped
+    return decorator
+
+
+class ResponseCacheStatsView(views.APIView):
+    """ Hit/miss counters of the public response cache (admins only). """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache.stats())
@@ -1,5 +1,7 @@
+from importlib.util import find_spec
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -199,6 +201,79 @@ VISIORA_DATA_API_URL= os.getenv('VISIORA_DATA_SERVER_API_URL')
 RAZORPAY_KEY_ID= os.getenv('RAZORPAY_KEY_ID')
 RAZORPAY_KEY_SECRET=os.getenv('RAZORPAY_KEY_SECRET')
 
+# Withdrawal payouts (wallet.payouts), run by the run_payout_worker command.
+# The fake gateway marks payouts paid without paying anything; use 'wallet.gateways.RazorpayXGateway' in production.
+WALLET_PAYOUT_GATEWAY = os.getenv('WALLET_PAYOUT_GATEWAY', 'wallet.gateways.FakeGateway')
+RAZORPAYX_ACCOUNT_NUMBER = os.getenv('RAZORPAYX_ACCOUNT_NUMBER')
+RAZORPAYX_WEBHOOK_SECRET = os.getenv('RAZORPAYX_WEBHOOK_SECRET')
+PAYOUT_MAX_ATTEMPTS = 8
+PAYOUT_BACKOFF_BASE = 30  # seconds, doubled per attempt
+PAYOUT_BACKOFF_CAP = 3600
+
+
+# Cache: local memory unless a Redis URL is configured (production)
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    if find_spec('redis') is None:
+        raise ImproperlyConfigured("REDIS_URL is set but the redis package isn't installed (pip install -r requirements.txt)")
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "visora-default",
+        }
+    }
+
+# Tag-invalidated cache for public read endpoints (auth_backend.response_cache)
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+
+# Write-behind AnimationRequest view counter (visions.popularity).
+# 'local' buffers per process; 'cache' shares the buffer so flush_view_counts can drain it.
+VIEW_COUNTER_BUFFER = os.getenv('VIEW_COUNTER_BUFFER', 'cache' if REDIS_URL else 'local')
+VIEW_COUNTER_CACHE_ALIAS = 'default'
+VIEW_COUNTER_FLUSH_INTERVAL = 30  # seconds
+VIEW_COUNTER_FLUSH_THRESHOLD = 1000  # dirty rows
+VIEW_COUNTER_TRACK_UNIQUE = True  # HyperLogLog unique viewer estimates
+
+# Coalesced like deltas applied to Contribution.likes (visions.likes)
+LIKE_COUNTER_BUFFER = os.getenv('LIKE_COUNTER_BUFFER', 'cache' if REDIS_URL else 'local')
+LIKE_COUNTER_CACHE_ALIAS = 'default'
+LIKE_COUNTER_FLUSH_INTERVAL = 10  # seconds
+LIKE_COUNTER_FLUSH_THRESHOLD = 500  # dirty rows
+
+# CollaborativeCode history (visions.revisions): a full snapshot every N revisions, patches in between
+CODE_REVISION_SNAPSHOT_INTERVAL = 20
+PROPOSAL_DIFF_CACHE_TIMEOUT = 60 * 60 * 24  # Rendered proposal diffs never go stale; this only bounds memory
+
+# Merged-code previews (visions.previews) are written to MEDIA_ROOT/previews/<sha256>/index.html(.gz/.br).
+# Point a CDN or the web server at that directory and set this to its URL; it should send
+# "Cache-Control: public, max-age=31536000, immutable" and "Content-Security-Policy: sandbox allow-scripts"
+# (nginx: gzip_static/brotli_static). Left empty, previews are served by visions.views.code_preview.
+CODE_PREVIEW_BASE_URL = os.getenv('CODE_PREVIEW_BASE_URL', '')
+
+# Code blob storage (visions.blobs): 'zlib', 'zstd' (needs the zstandard package) or 'none';
+# bodies under the minimum size are stored raw
+CODE_BLOB_COMPRESSION = os.getenv('CODE_BLOB_COMPRESSION', 'zlib')
+CODE_BLOB_MIN_COMPRESS_SIZE = 256  # bytes
+
+# Server-sent project events (visions.events). 'local' only reaches streams in the publishing
+# process; run several ASGI workers with 'redis' so every worker sees every event.
+PROJECT_EVENTS_BACKEND = os.getenv('PROJECT_EVENTS_BACKEND', 'redis' if REDIS_URL else 'local')
+PROJECT_EVENTS_REDIS_URL = REDIS_URL
+PROJECT_EVENTS_HEARTBEAT = 15  # seconds between keepalive comments
+PROJECT_EVENTS_QUEUE_SIZE = 100  # undelivered events before a slow stream is cut off
+# Streams end after this long and the browser reconnects (resuming from Last-Event-ID); under WSGI
+# (the vercel.json deploy) every open stream holds a worker thread until then. Serve
+# auth_backend.asgi:application with an ASGI server (uvicorn, daphne) to avoid that.
+PROJECT_EVENTS_MAX_STREAM_SECONDS = 300
+
 
 # -----------------------------------------------------------------------------------------------
 # ---------------------CUSTOM SETTINGS-----------------------------------------------------------
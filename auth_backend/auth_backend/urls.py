@@ -7,6 +7,7 @@ from rest_framework.routers import DefaultRouter
 from dj_rest_auth.views import UserDetailsView
 from custom_user.serializers import CustomRegisterSerializer,CustomUserDetailsSerializer,CustomLoginSerializer
 from custom_user.views import CustomRegisterView,CustomLoginView
+from auth_backend.response_cache import ResponseCacheStatsView
 
 app_name='auth_backend'
 
@@ -20,6 +21,7 @@ urlpatterns = [
     path('auth/', include('dj_rest_auth.urls')),
     path('auth/registration/', CustomRegisterView.as_view(serializer_class=CustomRegisterSerializer)),
     path('auth/login/', CustomLoginView.as_view()),
+    path('api/cache-stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
 ]
 
 if settings.DEBUG:
@@ -1,6 +1,18 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from custom_user.models import CustomUser,CustomUserSocielMedia,Score
+from wallet import accounts
+
+
+@admin.register(CustomUser)
+class CustomUserAdmin(admin.ModelAdmin):
+    actions = ['deactivate_users']
+
+    @admin.action(description="Deactivate selected users (keeps their wallet ledger)")
+    def deactivate_users(self, request, queryset):
+        # Users with wallet ledger entries can't be deleted; this is how their accounts are closed
+        count = accounts.deactivate(queryset)
+        self.message_user(request, f"Deactivated {count} user(s).", messages.SUCCESS)
+
 
-admin.site.register(CustomUser)
 admin.site.register(CustomUserSocielMedia)
 admin.site.register(Score)
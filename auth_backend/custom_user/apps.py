@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CustomUserConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "custom_user"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from auth_backend.response_cache import model_tag, response_cache
+from .models import Score
+
+
+@receiver([post_save, post_delete], sender=Score)
+def invalidate_cached_scores(sender, instance, **kwargs):
+    response_cache.invalidate(model_tag(Score))
@@ -23,6 +23,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework import serializers, viewsets, pagination, filters
 from dj_rest_auth.views import LoginView
 from custom_user.serializers import CustomLoginSerializer
+from auth_backend.response_cache import cache_response, model_tag
 
 def home(request):
     return render(request,'home.html')
@@ -206,3 +207,7 @@ class ScoreViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['score', 'updated_at']
 
+    @cache_response(tags=[model_tag(Score)])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
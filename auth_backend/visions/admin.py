@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AnimationRequest, Contribution, Engagement, Notification
+from .models import AnimationRequest, Contribution, Engagement, Notification, LeaderboardEntry
 from .models import OpenSourceVisionRequest, OpenSourceAttachment,OpenSourceContribution,CollaborationRequest
 
 
@@ -12,7 +12,7 @@ class AnimationRequestAdmin(admin.ModelAdmin):
 
 @admin.register(Contribution)
 class ContributionAdmin(admin.ModelAdmin):
-    list_display = ('get_animation_request', 'developer', 'likes', 'comments', 'submitted_at', 'approved')
+    list_display = ('get_animation_request', 'developer', 'likes', 'comment_count', 'submitted_at', 'approved')
     list_filter = ('approved', 'submitted_at')
     search_fields = ('animation_request__title', 'developer__username')
     ordering = ('-submitted_at',)
@@ -40,6 +40,14 @@ class NotificationAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
 
 
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'window', 'period_start', 'total_likes', 'total_contributions', 'approved_contributions')
+    list_filter = ('window', 'period_start')
+    search_fields = ('user__username',)
+    readonly_fields = ('updated_at',)
+    ordering = ('window', '-period_start', '-total_likes')
+
 
 class OpenSourceAttachmentInline(admin.TabularInline): 
     model = OpenSourceAttachment
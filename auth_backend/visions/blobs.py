@@ -0,0 +1,47 @@
+import hashlib
+import zlib
+
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:  # Optional; zlib is always available
+    zstandard = None
+
+
+def digest(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _compression():
+    method = getattr(settings, 'CODE_BLOB_COMPRESSION', 'zlib')
+    if method == 'zstd' and zstandard is None:
+        return 'zlib'
+    return method
+
+
+def encode(text):
+    """
+    (encoding, payload) for a blob body. Small bodies and ones that don't
+    shrink are stored raw, so reading them costs nothing extra.
+    """
+    raw = text.encode()
+    method = _compression()
+    if method == 'none' or len(raw) < getattr(settings, 'CODE_BLOB_MIN_COMPRESS_SIZE', 256):
+        return 'raw', raw
+    if method == 'zstd':
+        packed = zstandard.ZstdCompressor(level=10).compress(raw)
+    else:
+        packed = zlib.compress(raw, 6)
+    return (method, packed) if len(packed) < len(raw) else ('raw', raw)
+
+
+def decode(encoding, payload):
+    payload = bytes(payload)
+    if encoding == 'zlib':
+        payload = zlib.decompress(payload)
+    elif encoding == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("This blob is zstd-compressed but the zstandard package isn't installed")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    return payload.decode()
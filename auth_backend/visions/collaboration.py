@@ -0,0 +1,74 @@
+from collections import defaultdict
+
+from django.db.models import CharField, Value
+
+from .models import OpenSourceVisionRequest, CollaborationRequest
+
+# Strongest role wins when a user shows up in more than one source
+ROLE_PRIORITY = {'owner': 3, 'approved': 2, 'pending': 1}
+
+
+class CollaborationStatusMap:
+    """
+    Resolved collaboration state of one user across a set of projects.
+    Projects missing from the role map are 'none'.
+    """
+
+    def __init__(self, project_ids, roles, pending_requests):
+        self.project_ids = frozenset(project_ids)
+        self.roles = roles
+        self.pending = pending_requests
+
+    def __contains__(self, project_id):
+        return project_id in self.project_ids
+
+    def role(self, project_id):
+        return self.roles.get(project_id, 'none')
+
+    def pending_requests(self, project_id):
+        """Pending requests on a project the user owns, newest first."""
+        return self.pending.get(project_id, [])
+
+
+def resolve_collaboration_status(user, project_ids):
+    """
+    Works out the user's role on every project in `project_ids` and the pending
+    requests for the ones they own, in two set-based queries however many
+    projects are passed in.
+    """
+    project_ids = list(project_ids)
+    if not project_ids or user is None or not user.is_authenticated:
+        return CollaborationStatusMap(project_ids, {}, {})
+
+    def tagged(queryset, project_field, role):
+        return queryset.order_by().annotate(
+            role=Value(role, output_field=CharField())
+        ).values_list(project_field, 'role')
+
+    owned = tagged(
+        OpenSourceVisionRequest.objects.filter(pk__in=project_ids, creator_id=user.pk), 'pk', 'owner'
+    )
+    approved = tagged(
+        OpenSourceVisionRequest.collaborators.through.objects.filter(
+            opensourcevisionrequest_id__in=project_ids, customuser_id=user.pk
+        ),
+        'opensourcevisionrequest_id', 'approved',
+    )
+    pending = tagged(
+        CollaborationRequest.objects.filter(project_id__in=project_ids, requester_id=user.pk, status='pending'),
+        'project_id', 'pending',
+    )
+
+    roles = {}
+    for project_id, role in owned.union(approved, pending, all=True):
+        if ROLE_PRIORITY[role] > ROLE_PRIORITY.get(roles.get(project_id), 0):
+            roles[project_id] = role
+
+    pending_requests = defaultdict(list)
+    incoming = CollaborationRequest.objects.filter(
+        project_id__in=project_ids, project__creator_id=user.pk, status='pending'
+    ).select_related('requester', 'project').order_by('-requested_at', '-pk')
+    for collab_request in incoming:
+        pending_requests[collab_request.project_id].append(collab_request)
+
+    return CollaborationStatusMap(project_ids, roles, dict(pending_requests))
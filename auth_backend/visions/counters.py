@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class LocalCounterBuffer:
+    """ Accumulates increments in process memory. Each worker flushes its own buffer. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+
+    def add(self, pk, amount=1):
+        with self._lock:
+            self._pending[pk] += amount
+
+    def pending(self, pk):
+        return self._pending.get(pk, 0)
+
+    def size(self):
+        return len(self._pending)
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        return {pk: amount for pk, amount in pending.items() if amount}
+
+
+class CacheCounterBuffer:
+    """
+    Accumulates increments in a shared Django cache (Redis in production), so any
+    process - including a cron-driven flush command - can drain them.
+
+    Each object gets an atomic counter key. The first increment that moves a
+    counter off zero also appends the pk to a numbered slot list, which is how
+    drain() finds dirty objects without a set type in the cache API. Draining
+    decrements by the value read, so increments racing with a flush are kept.
+    """
+
+    def __init__(self, namespace, alias='default', lock_timeout=60):
+        self.namespace = namespace
+        self.alias = alias
+        self.lock_timeout = lock_timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _key(self, *parts):
+        return ':'.join(['counter', self.namespace, *map(str, parts)])
+
+    def _incr(self, key, amount):
+        self.cache.add(key, 0, timeout=None)
+        return self.cache.incr(key, amount)
+
+    def _register(self, pk):
+        slot = self._incr(self._key('slots'), 1)
+        self.cache.set(self._key('slot', slot), pk, timeout=None)
+
+    def add(self, pk, amount=1):
+        if self._incr(self._key('value', pk), amount) == amount:
+            self._register(pk)
+
+    def pending(self, pk):
+        return self.cache.get(self._key('value', pk)) or 0
+
+    def size(self):
+        return (self.cache.get(self._key('slots')) or 0) - (self.cache.get(self._key('drained')) or 0)
+
+    def drain(self):
+        lock = self._key('lock')
+        if not self.cache.add(lock, 1, timeout=self.lock_timeout):
+            return {}  # Another process is flushing
+        try:
+            drained = self.cache.get(self._key('drained')) or 0
+            last = self.cache.get(self._key('slots')) or 0
+            slot_keys = [self._key('slot', n) for n in range(drained + 1, last + 1)]
+            pks = set(self.cache.get_many(slot_keys).values())
+
+            deltas = {}
+            for pk in pks:
+                key = self._key('value', pk)
+                value = self.cache.get(key) or 0
+                if not value:
+                    continue
+                if self.cache.decr(key, value) > 0:
+                    # Increments landed after our read without re-registering; keep them findable
+                    self._register(pk)
+                deltas[pk] = value
+
+            self.cache.set(self._key('drained'), last, timeout=None)
+            self.cache.delete_many(slot_keys)
+            return deltas
+        finally:
+            self.cache.delete(lock)
+
+
+class BufferedCounter:
+    """
+    Write-behind counter for an integer model field.
+
+    increment() only touches the buffer; flush() writes everything pending with
+    one UPDATE ... SET field = field + n per distinct n, instead of a row write
+    per event. Flushes happen opportunistically once `flush_interval` seconds
+    or `flush_threshold` dirty rows have accumulated, or from a periodic job.
+    `on_flush`, if given, is called with the applied {pk: delta} map.
+    """
+
+    batch_size = 500  # Keeps the IN (...) list well under backend parameter limits
+
+    def __init__(self, model, field, buffer=None, flush_interval=30, flush_threshold=1000, on_flush=None):
+        self.model = model
+        self.field = field
+        self.buffer = buffer or LocalCounterBuffer()
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.on_flush = on_flush
+        self._last_flush = time.monotonic()
+
+    def increment(self, pk, amount=1):
+        self.buffer.add(pk, amount)
+        self.maybe_flush()
+
+    def pending(self, pk):
+        return self.buffer.pending(pk)
+
+    def maybe_flush(self):
+        """ Flushes if due. Called on the request path, so a failed flush never fails the request. """
+        due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due or self.buffer.size() >= self.flush_threshold:
+            try:
+                self.flush()
+            except Exception:
+                pass  # flush() logged it and put the deltas back for the next one
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        deltas = self.buffer.drain()
+        if not deltas:
+            return 0
+
+        by_amount = defaultdict(list)
+        for pk, amount in deltas.items():
+            by_amount[amount].append(pk)
+
+        try:
+            with transaction.atomic():
+                for amount, pks in by_amount.items():
+                    for start in range(0, len(pks), self.batch_size):
+                        batch = pks[start:start + self.batch_size]
+                        self.model.objects.filter(pk__in=batch).update(**{self.field: F(self.field) + amount})
+                if self.on_flush:
+                    self.on_flush(deltas)
+        except Exception:
+            # Put the deltas back so the next flush retries them
+            for pk, amount in deltas.items():
+                self.buffer.add(pk, amount)
+            logger.exception(f"Failed to flush buffered {self.model.__name__}.{self.field} counters")
+            raise
+        return len(deltas)
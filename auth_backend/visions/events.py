@@ -0,0 +1,198 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Events anyone who can see the project may receive; everything else is for the owner and collaborators
+PUBLIC_EVENTS = frozenset({'code.merged', 'funding.updated'})
+
+CLOSED = object()  # Pushed to a subscription the broker has given up on
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class LocalBackend:
+    """ Delivers straight back into this process. Enough for one worker, and for tests. """
+
+    def __init__(self):
+        self.handler = None
+
+    def attach(self, handler):
+        self.handler = handler
+
+    def publish(self, event):
+        self.handler(event)
+
+
+class RedisBackend:
+    """
+    Fans events out to every process through a Redis pub/sub channel. Each
+    process runs one listener thread that hands received events to its broker.
+    """
+
+    def __init__(self, url, channel='visora:project-events'):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("PROJECT_EVENTS_BACKEND = 'redis' needs the redis package installed")
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+        self.handler = None
+
+    def attach(self, handler):
+        self.handler = handler
+        threading.Thread(target=self._listen, name='project-events', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    self.handler(json.loads(message['data']))
+            except Exception:
+                logger.exception("Project event listener lost its Redis connection; reconnecting")
+                time.sleep(1)
+
+    def publish(self, event):
+        self.client.publish(self.channel, json.dumps(event, cls=DjangoJSONEncoder))
+
+
+class Subscription:
+    """ One open stream: a bounded queue fed from whichever thread delivers events. """
+
+    def __init__(self, project_id, members, queue_size):
+        self.project_id = project_id
+        self.members = members
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.backlog = []
+        self.closed = False
+
+    def wants(self, event):
+        return self.members or event['type'] in PUBLIC_EVENTS
+
+    def push(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # The stream's loop is gone; it unsubscribes on its way out
+
+    def _put(self, event):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client this far behind is cut off; it reconnects and catches up from the replay buffer
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(CLOSED)
+
+    async def get(self, timeout):
+        """ The next event, or None if nothing arrived within `timeout` seconds. """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+    """
+    Routes published project events to the streams open in this process.
+
+    publish() goes through the backend, so with a cross-process backend every
+    worker's broker receives every event. Each broker keeps the last few
+    events per project so a reconnecting client can resume from Last-Event-ID.
+    """
+
+    def __init__(self, backend, queue_size=100, replay_size=50):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.replay_size = replay_size
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+        self._recent = defaultdict(lambda: deque(maxlen=self.replay_size))
+        backend.attach(self.deliver)
+
+    def publish(self, project_id, event_type, data=None):
+        event = {'id': str(time.time_ns()), 'project': project_id, 'type': event_type, 'data': data or {}}
+        try:
+            self.backend.publish(event)
+        except Exception:
+            # Streams are a convenience; the write that triggered the event has already committed
+            logger.exception(f"Failed to publish {event_type} for project {project_id}")
+
+    def deliver(self, event):
+        with self._lock:
+            self._recent[event['project']].append(event)
+            subscriptions = list(self._subscriptions.get(event['project'], ()))
+        for subscription in subscriptions:
+            if subscription.wants(event):
+                subscription.push(event)
+
+    def subscribe(self, project_id, members=False, last_event_id=None):
+        """ Opens a subscription; must be called from the event loop that will read it. """
+        subscription = Subscription(project_id, members, self.queue_size)
+        with self._lock:
+            self._subscriptions[project_id].add(subscription)
+            if last_event_id is not None:
+                subscription.backlog = [
+                    event for event in self._recent.get(project_id, ())
+                    if int(event['id']) > last_event_id and subscription.wants(event)
+                ]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.project_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.project_id]
+
+    def subscriber_count(self, project_id):
+        return len(self._subscriptions.get(project_id, ()))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            if _setting('PROJECT_EVENTS_BACKEND', 'local') == 'redis':
+                backend = RedisBackend(_setting('PROJECT_EVENTS_REDIS_URL', None))
+            else:
+                backend = LocalBackend()
+            _broker = EventBroker(backend, queue_size=_setting('PROJECT_EVENTS_QUEUE_SIZE', 100))
+        return _broker
+
+
+def publish(project_id, event_type, data=None):
+    """ Publishes once the surrounding transaction commits, so streams never see rolled-back work. """
+    def send():
+        try:
+            get_broker().publish(project_id, event_type, data)
+        except ImproperlyConfigured:
+            logger.exception(f"Project events are misconfigured; dropped {event_type} for project {project_id}")
+    transaction.on_commit(send)
+
+
+def format_sse(event):
+    payload = json.dumps(event['data'], cls=DjangoJSONEncoder)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
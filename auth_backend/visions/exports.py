@@ -0,0 +1,19 @@
+from auth_backend.exports import Dataset
+
+from .models import OpenSourceContribution
+
+CONTRIBUTIONS = Dataset(
+    'contributions',
+    lambda: OpenSourceContribution.objects.all(),
+    {
+        'id': 'pk',
+        'project_id': 'request_id',
+        'project_title': 'request__title',
+        'contributor_id': 'contributor_id',
+        'contributor': 'contributor__username',
+        'amount': 'amount',
+        'razorpay_payment_id': 'razorpay_payment_id',
+        'timestamp': 'timestamp',
+    },
+    date_field='timestamp',
+)
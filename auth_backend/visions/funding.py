@@ -0,0 +1,24 @@
+from django.db.models import F
+
+from .models import OpenSourceVisionRequest
+
+
+def add_funding(project_id, amount):
+    """
+    Adds `amount` to the project's funding in one conditional UPDATE, accepted
+    only while the result stays within the goal. Concurrent contributions
+    serialize on the row inside the database, so none are lost and the goal
+    is never overshot. Returns whether the amount was accepted; run it in the
+    transaction that records the contribution.
+    """
+    return OpenSourceVisionRequest.objects.filter(
+        pk=project_id, funding_goal__gt=0, current_funding__lte=F('funding_goal') - amount,
+    ).update(current_funding=F('current_funding') + amount) == 1
+
+
+def remaining(project_id):
+    """ (current funding, goal, amount still needed) as stored right now. """
+    current, goal = OpenSourceVisionRequest.objects.filter(pk=project_id).values_list(
+        'current_funding', 'funding_goal'
+    ).get()
+    return current, goal, max(goal - current, 0)
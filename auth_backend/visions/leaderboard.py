@@ -0,0 +1,164 @@
+import datetime
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from auth_backend.response_cache import model_tag, response_cache
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = ('all', 'weekly', 'monthly')
+ALL_TIME_START = datetime.date(1970, 1, 1)  # Every all-time row shares this period
+RANK_SCAN_LIMIT = 10_000  # rank_of() ranks exactly within the top this many rows of a window
+
+
+def period_start(window, when=None):
+    """ First day of the period `when` falls into for the given window. """
+    if window == 'all':
+        return ALL_TIME_START
+    day = timezone.localtime(when or timezone.now()).date()
+    if window == 'weekly':
+        return day - datetime.timedelta(days=day.weekday())
+    if window == 'monthly':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown leaderboard window '{window}'")
+
+
+def _entry_model():
+    from .models import LeaderboardEntry
+    return LeaderboardEntry
+
+
+def _apply(user_id, when, likes=0, contributions=0, approved=0):
+    """
+    Adds the deltas to the user's row in every window, creating rows on first
+    sight. Only additions create rows: removals (deltas below zero) just
+    update existing ones, so they never insert for a user being deleted.
+    """
+    if not (likes or contributions or approved):
+        return
+    removal = min(likes, contributions, approved) < 0
+    LeaderboardEntry = _entry_model()
+    deltas = {
+        'total_likes': F('total_likes') + likes,
+        'total_contributions': F('total_contributions') + contributions,
+        'approved_contributions': F('approved_contributions') + approved,
+        'updated_at': timezone.now(),
+    }
+    for window in WINDOWS:
+        lookup = {'user_id': user_id, 'window': window, 'period_start': period_start(window, when)}
+        if LeaderboardEntry.objects.filter(**lookup).update(**deltas) or removal:
+            continue
+        try:
+            with transaction.atomic():
+                LeaderboardEntry.objects.create(
+                    total_likes=likes, total_contributions=contributions,
+                    approved_contributions=approved, **lookup
+                )
+        except IntegrityError:
+            # Someone else created the row between our update and insert
+            LeaderboardEntry.objects.filter(**lookup).update(**deltas)
+    response_cache.invalidate(model_tag(LeaderboardEntry))
+
+
+def record_contribution(contribution, sign=1):
+    """ Counts a new contribution (or removes a deleted one with sign=-1). """
+    _apply(
+        contribution.developer_id, contribution.submitted_at,
+        likes=sign * contribution.likes,
+        contributions=sign,
+        approved=sign if contribution.approved else 0,
+    )
+
+
+def record_approval(contribution, approved=True):
+    _apply(contribution.developer_id, contribution.submitted_at, approved=1 if approved else -1)
+
+
+def record_likes(contribution, delta):
+    """ Likes count towards the periods the contribution was submitted in. """
+    _apply(contribution.developer_id, contribution.submitted_at, likes=delta)
+
+
+def top(window='all', limit=10, when=None):
+    """ Top `limit` entries for the window, read straight off leaderboard_rank_idx. """
+    return (
+        _entry_model().objects
+        .filter(window=window, period_start=period_start(window, when))
+        .select_related('user')
+        .order_by('-total_likes', '-total_contributions', 'user_id')[:limit]
+    )
+
+
+def rank_of(user, window='all', when=None, limit=None):
+    """
+    Returns (rank, entry) for the user, or (None, None) if they have no entry.
+    The rank counts the rows strictly ahead of the user's row on
+    leaderboard_rank_idx, but at most `limit` (RANK_SCAN_LIMIT) of them, so
+    the lookup is a bounded index range scan however big the window is.
+    Users further down get (None, entry): they are outside the top `limit`.
+    """
+    LeaderboardEntry = _entry_model()
+    limit = limit or RANK_SCAN_LIMIT
+    start = period_start(window, when)
+    user_id = getattr(user, 'pk', user)
+    entry = LeaderboardEntry.objects.filter(user_id=user_id, window=window, period_start=start).select_related('user').first()
+    if entry is None:
+        return None, None
+    ahead = LeaderboardEntry.objects.filter(window=window, period_start=start).filter(
+        Q(total_likes__gt=entry.total_likes)
+        | Q(total_likes=entry.total_likes, total_contributions__gt=entry.total_contributions)
+        | Q(total_likes=entry.total_likes, total_contributions=entry.total_contributions, user_id__lt=user_id)
+    ).values('pk')[:limit].count()  # COUNT(*) over a LIMITed subquery stops scanning at `limit`
+    if ahead >= limit:
+        return None, entry
+    return ahead + 1, entry
+
+
+def rebuild_leaderboard(contribution_model=None, entry_model=None, batch_size=1000):
+    """
+    Recomputes every leaderboard row from the Contribution table.
+    Models can be passed in so data migrations can use their historical versions.
+    """
+    if contribution_model is None:
+        from .models import Contribution as contribution_model
+    entry_model = entry_model or _entry_model()
+
+    aggregates = {
+        'likes': Sum('likes'),
+        'contributions': Count('id'),
+        'approved_count': Count('id', filter=Q(approved=True)),
+    }
+    period_columns = {
+        'weekly': TruncWeek('submitted_at', output_field=DateField()),
+        'monthly': TruncMonth('submitted_at', output_field=DateField()),
+    }
+
+    with transaction.atomic():
+        entry_model.objects.all().delete()
+        for window in WINDOWS:
+            rows = contribution_model.objects.order_by()
+            if window == 'all':
+                rows = rows.values('developer_id').annotate(**aggregates)
+            else:
+                rows = rows.annotate(period=period_columns[window]).values('developer_id', 'period').annotate(**aggregates)
+
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(entry_model(
+                    user_id=row['developer_id'],
+                    window=window,
+                    period_start=row.get('period', ALL_TIME_START),
+                    total_likes=row['likes'] or 0,
+                    total_contributions=row['contributions'],
+                    approved_contributions=row['approved_count'],
+                ))
+                if len(batch) >= batch_size:
+                    entry_model.objects.bulk_create(batch)
+                    batch = []
+            entry_model.objects.bulk_create(batch)
+    response_cache.invalidate(model_tag(entry_model))
+    logger.info("Leaderboard rebuilt from contributions.")
@@ -0,0 +1,115 @@
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+
+from . import leaderboard
+from .counters import BufferedCounter, CacheCounterBuffer, LocalCounterBuffer
+from .models import Contribution, Engagement
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _apply_to_leaderboard(deltas):
+    """ Folds a flushed batch of like deltas into the leaderboard, one update per developer period. """
+    grouped = defaultdict(int)
+    submitted = {}
+    rows = Contribution.objects.filter(pk__in=list(deltas)).values_list('pk', 'developer_id', 'submitted_at')
+    for pk, developer_id, submitted_at in rows:
+        key = (
+            developer_id,
+            leaderboard.period_start('weekly', submitted_at),
+            leaderboard.period_start('monthly', submitted_at),
+        )
+        grouped[key] += deltas[pk]
+        submitted[key] = submitted_at
+    for key, delta in grouped.items():
+        if delta:
+            leaderboard.record_likes(Contribution(developer_id=key[0], submitted_at=submitted[key]), delta)
+
+
+def _make_buffer():
+    if _setting('LIKE_COUNTER_BUFFER', 'local') == 'cache':
+        return CacheCounterBuffer('contribution-likes', alias=_setting('LIKE_COUNTER_CACHE_ALIAS', 'default'))
+    return LocalCounterBuffer()
+
+
+# Likes and unlikes are coalesced per contribution and applied to Contribution.likes in batches
+like_counter = BufferedCounter(
+    Contribution, 'likes',
+    buffer=_make_buffer(),
+    flush_interval=_setting('LIKE_COUNTER_FLUSH_INTERVAL', 10),
+    flush_threshold=_setting('LIKE_COUNTER_FLUSH_THRESHOLD', 500),
+    on_flush=_apply_to_leaderboard,
+)
+
+
+def like(user, contribution):
+    """ Likes the contribution once. Returns False if the user had already liked it. """
+    try:
+        with transaction.atomic():
+            Engagement.objects.create(user=user, contribution=contribution, liked=True)
+    except IntegrityError:
+        return False
+    like_counter.increment(contribution.pk, 1)
+    return True
+
+
+def unlike(user, contribution):
+    """ Removes the user's like. Returns False if there was nothing to remove. """
+    with transaction.atomic():
+        likes = Engagement.objects.filter(user=user, contribution=contribution, liked=True)
+        # A like row that also carries a comment keeps the comment
+        removed, _ = likes.filter(Q(comment__isnull=True) | Q(comment='')).delete()
+        removed += likes.update(liked=False)
+    if not removed:
+        return False
+    like_counter.increment(contribution.pk, -1)
+    return True
+
+
+def like_count(contribution):
+    """ Stored likes plus deltas still waiting in the buffer. """
+    return contribution.likes + like_counter.pending(contribution.pk)
+
+
+def reconcile_likes(chunk_size=500, stdout=None):
+    """
+    Recomputes Contribution.likes from the Engagement table, walking contributions
+    in primary-key chunks with a short transaction per chunk. Returns the number
+    of contributions that were corrected. Likes still buffered in other worker
+    processes are not visible here, so run it after those buffers have flushed.
+    """
+    like_counter.flush()
+    corrected = 0
+    last_pk = 0
+    while True:
+        chunk = list(
+            Contribution.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'likes', 'developer_id', 'submitted_at')[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        actual = dict(
+            Engagement.objects.filter(contribution_id__in=[row[0] for row in chunk], liked=True)
+            .order_by().values('contribution_id').annotate(total=Count('id'))
+            .values_list('contribution_id', 'total')
+        )
+        with transaction.atomic():
+            for pk, stored, developer_id, submitted_at in chunk:
+                expected = actual.get(pk, 0)
+                if expected == stored:
+                    continue
+                Contribution.objects.filter(pk=pk).update(likes=expected)
+                leaderboard.record_likes(Contribution(developer_id=developer_id, submitted_at=submitted_at), expected - stored)
+                corrected += 1
+        if stdout:
+            stdout.write(f"Checked contributions up to id {last_pk}, corrected {corrected} so far.")
+    return corrected
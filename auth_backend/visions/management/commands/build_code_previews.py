@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from visions import previews, revisions
+from visions.models import CollaborativeCode
+
+
+class Command(BaseCommand):
+    help = "Renders the preview bundle of every merged collaborative code that doesn't have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-render codes that already have a preview.")
+
+    def handle(self, *args, **options):
+        codes = CollaborativeCode.objects.filter(head_revision__gt=0).select_related(
+            *CollaborativeCode.CONTENT_BLOBS.values()
+        ).order_by('pk')
+        if not options['all']:
+            codes = codes.filter(preview_digest='')
+        built = 0
+        for code in codes.iterator(chunk_size=200):
+            digest = previews.publish(revisions.head_contents(code))
+            # A merge since this row was read has published its own preview
+            CollaborativeCode.objects.filter(pk=code.pk, head_revision=code.head_revision).update(preview_digest=digest)
+            built += 1
+        self.stdout.write(self.style.SUCCESS(f"Built {built} previews."))
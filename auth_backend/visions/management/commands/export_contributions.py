@@ -0,0 +1,7 @@
+from auth_backend.exports import ExportCommand
+from visions.exports import CONTRIBUTIONS
+
+
+class Command(ExportCommand):
+    help = "Streams open-source contributions as CSV or NDJSON, optionally within a timestamp range."
+    dataset = CONTRIBUTIONS
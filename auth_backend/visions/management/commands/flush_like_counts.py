@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from visions.counters import LocalCounterBuffer
+from visions.likes import like_counter
+
+
+class Command(BaseCommand):
+    help = (
+        "Applies buffered like/unlike deltas to Contribution.likes in batched F() updates. "
+        "Only works with LIKE_COUNTER_BUFFER='cache'; local buffers are flushed by their own worker."
+    )
+
+    def handle(self, *args, **options):
+        if isinstance(like_counter.buffer, LocalCounterBuffer):
+            # This process's buffer is empty: the likes sit in each web worker's memory
+            raise CommandError(
+                "LIKE_COUNTER_BUFFER is 'local', so there is nothing to flush from here; "
+                "each web worker flushes its own likes. Set it to 'cache' to flush from a separate process."
+            )
+        flushed = like_counter.flush()
+        self.stdout.write(self.style.SUCCESS(f"Flushed likes for {flushed} contribution(s)."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from visions.counters import LocalCounterBuffer
+from visions.popularity import unique_viewers, view_counter
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes buffered AnimationRequest view counts to the database in batched F() updates. "
+        "Only works with VIEW_COUNTER_BUFFER='cache'; local buffers are flushed by their own worker."
+    )
+
+    def handle(self, *args, **options):
+        if isinstance(view_counter.buffer, LocalCounterBuffer):
+            # This process's buffer is empty: the views sit in each web worker's memory
+            raise CommandError(
+                "VIEW_COUNTER_BUFFER is 'local', so there is nothing to flush from here; "
+                "each web worker flushes its own views. Set it to 'cache' to flush from a separate process."
+            )
+        flushed = view_counter.flush()
+        unique_viewers.flush()
+        self.stdout.write(self.style.SUCCESS(f"Flushed view counts for {flushed} request(s)."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from visions.leaderboard import rebuild_leaderboard
+
+
+class Command(BaseCommand):
+    help = "Recomputes the materialized leaderboard from the Contribution table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rebuild_leaderboard(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS("Leaderboard rebuilt."))
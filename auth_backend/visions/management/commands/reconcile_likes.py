@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from visions.likes import reconcile_likes
+
+
+class Command(BaseCommand):
+    help = "Recomputes Contribution.likes from liked Engagement rows, in primary-key chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        corrected = reconcile_likes(chunk_size=options['chunk_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Reconciled likes; corrected {corrected} contribution(s)."))
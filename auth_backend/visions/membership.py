@@ -0,0 +1,71 @@
+import itertools
+
+from django.db.models import Exists, OuterRef, Q
+
+from .models import OpenSourceVisionRequest
+
+Collaborator = OpenSourceVisionRequest.collaborators.through
+
+# Bumped whenever ownership or a collaborator list changes; memos filled under an older value are dropped
+_generation = itertools.count()
+_current = next(_generation)
+
+
+def changed():
+    global _current
+    _current = next(_generation)
+
+
+def _memo(request):
+    """ The {(user_id, project_id): bool} memo of this request, shared by the DRF and Django request objects. """
+    if request is None:
+        return {}
+    request = getattr(request, '_request', request)
+    memo = getattr(request, '_project_membership', None)
+    if memo is None or memo[0] != _current:
+        memo = (_current, {})
+        request._project_membership = memo
+    return memo[1]
+
+
+def _members(user_id, project_ids):
+    """ The ids among `project_ids` that the user owns or collaborates on, in one query. """
+    return set(
+        OpenSourceVisionRequest.objects.filter(pk__in=project_ids)
+        .filter(Q(creator_id=user_id) | Exists(
+            Collaborator.objects.filter(opensourcevisionrequest_id=OuterRef('pk'), customuser_id=user_id)
+        ))
+        .values_list('pk', flat=True)
+    )
+
+
+def is_member(user, project, request=None):
+    """
+    Whether `user` owns or collaborates on `project` (an instance or a pk).
+    Answers are memoized on `request`, so repeated permission checks in one
+    request cost a single query.
+    """
+    if user is None or not user.is_authenticated:
+        return False
+    if isinstance(project, OpenSourceVisionRequest):
+        if project.creator_id == user.pk:
+            return True
+        project = project.pk
+    memo = _memo(request)
+    key = (user.pk, project)
+    if key not in memo:
+        memo[key] = project in _members(user.pk, [project])
+    return memo[key]
+
+
+def member_project_ids(user, project_ids, request=None):
+    """ The subset of `project_ids` the user owns or collaborates on; one query for any number of projects. """
+    project_ids = set(project_ids)
+    if user is None or not user.is_authenticated or not project_ids:
+        return set()
+    memo = _memo(request)
+    missing = [pk for pk in project_ids if (user.pk, pk) not in memo]
+    if missing:
+        found = _members(user.pk, missing)
+        memo.update({(user.pk, pk): pk in found for pk in missing})
+    return {pk for pk in project_ids if memo[user.pk, pk]}
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visions', '0008_codechangeproposal_collaborativecode'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animationrequest',
+            index=models.Index(fields=['-created_at', '-id'], name='anim_req_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['-submitted_at', '-id'], name='contribution_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['animation_request', '-submitted_at', '-id'], name='contribution_req_submit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='engagement',
+            index=models.Index(fields=['-created_at', '-id'], name='engagement_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='notification_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='opensourcevisionrequest',
+            index=models.Index(fields=['visibility', '-created_at', '-id'], name='os_request_visible_created_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_leaderboard(apps, schema_editor):
+    from visions.leaderboard import rebuild_leaderboard
+    rebuild_leaderboard(
+        contribution_model=apps.get_model('visions', 'Contribution'),
+        entry_model=apps.get_model('visions', 'LeaderboardEntry'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visions', '0009_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('all', 'All Time'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('total_likes', models.IntegerField(default=0)),
+                ('total_contributions', models.IntegerField(default=0)),
+                ('approved_contributions', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window', 'period_start', '-total_likes', '-total_contributions', 'user'], name='leaderboard_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'window', 'period_start'), name='unique_leaderboard_entry')],
+            },
+        ),
+        migrations.RunPython(backfill_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:42
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Q
+
+
+def dedupe_likes(apps, schema_editor):
+    """ Keeps the earliest like per (user, contribution); later duplicates lose the like. """
+    Engagement = apps.get_model('visions', 'Engagement')
+    duplicates = (
+        Engagement.objects.filter(liked=True).order_by()
+        .values('user_id', 'contribution_id')
+        .annotate(first_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates.iterator(chunk_size=500):
+        extra = Engagement.objects.filter(
+            user_id=row['user_id'], contribution_id=row['contribution_id'], liked=True,
+        ).exclude(id=row['first_id'])
+        extra.filter(Q(comment__isnull=True) | Q(comment='')).delete()
+        extra.update(liked=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visions', '0010_leaderboardentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='engagement',
+            constraint=models.UniqueConstraint(condition=models.Q(('liked', True)), fields=('user', 'contribution'), name='unique_like_per_user'),
+        ),
+    ]
@@ -0,0 +1,118 @@
+import datetime
+
+from django.db import migrations, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+CHUNK_SIZE = 200
+
+BODY_KEYS = ('text', 'comment', 'body', 'message', 'content')
+AUTHOR_KEYS = ('user_id', 'userid', 'author_id', 'user', 'author', 'username')
+TIME_KEYS = ('created_at', 'timestamp', 'date', 'time')
+
+
+def _first(entry, keys):
+    for key in keys:
+        if entry.get(key) not in (None, ''):
+            return entry[key]
+    return None
+
+
+def _author_ref(entry):
+    """ The author as a string id or username, however the entry spelled it. """
+    author = _first(entry, AUTHOR_KEYS) if isinstance(entry, dict) else None
+    if isinstance(author, dict):
+        author = author.get('id') or author.get('username')
+    return None if author is None else str(author)
+
+
+def _parse(entry, fallback_time, user_ids, usernames):
+    """ Turns one legacy JSON comment (a string or a loosely shaped dict) into model fields. """
+    if isinstance(entry, str):
+        return {'body': entry, 'author_id': None, 'created_at': fallback_time}
+    if not isinstance(entry, dict):
+        return None
+    body = _first(entry, BODY_KEYS)
+    if body is None:
+        return None
+
+    author = _author_ref(entry)
+    if author is None:
+        author_id = None
+    elif author.isdigit():
+        author_id = int(author) if int(author) in user_ids else None
+    else:
+        author_id = usernames.get(author)
+
+    created_at = fallback_time
+    raw_time = _first(entry, TIME_KEYS)
+    if isinstance(raw_time, str):
+        parsed = parse_datetime(raw_time)
+        if parsed is not None:
+            created_at = parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, datetime.timezone.utc)
+    return {'body': str(body), 'author_id': author_id, 'created_at': created_at}
+
+
+def backfill_comments(apps, schema_editor):
+    """
+    Copies the JSON comment lists into ContributionComment rows, one committed
+    chunk of contributions at a time so a large table never holds one long lock.
+    A chunk's rows commit together, so contributions that already have rows
+    were done by an earlier, interrupted run and are skipped on a rerun.
+    """
+    Contribution = apps.get_model('visions', 'Contribution')
+    ContributionComment = apps.get_model('visions', 'ContributionComment')
+    User = apps.get_model('custom_user', 'CustomUser')
+
+    last_pk = 0
+    while True:
+        chunk = list(
+            Contribution.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'comments', 'submitted_at')[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        done = set(
+            ContributionComment.objects.filter(contribution_id__in=[pk for pk, _, _ in chunk])
+            .values_list('contribution_id', flat=True).distinct()
+        )
+
+        entries = [
+            (pk, entry, submitted_at) for pk, comments, submitted_at in chunk if pk not in done
+            for entry in (comments or [])
+        ]
+        raw_authors = {_author_ref(entry) for _, entry, _ in entries} - {None}
+        user_ids = set(User.objects.filter(pk__in=[int(a) for a in raw_authors if a.isdigit()]).values_list('pk', flat=True))
+        usernames = dict(User.objects.filter(username__in=raw_authors).values_list('username', 'pk'))
+
+        rows, counts = [], {}
+        for pk, entry, submitted_at in entries:
+            fields = _parse(entry, submitted_at, user_ids, usernames)
+            if fields is None:
+                continue
+            rows.append(ContributionComment(contribution_id=pk, **fields))
+            counts[pk] = counts.get(pk, 0) + 1
+
+        with transaction.atomic():
+            ContributionComment.objects.bulk_create(rows, batch_size=500)
+            for pk, count in counts.items():
+                Contribution.objects.filter(pk=pk).update(comment_count=count)
+
+
+def clear_comments(apps, schema_editor):
+    apps.get_model('visions', 'ContributionComment').objects.all().delete()
+    apps.get_model('visions', 'Contribution').objects.update(comment_count=0)
+
+
+class Migration(migrations.Migration):
+    atomic = False  # Each chunk commits on its own
+
+    dependencies = [
+        ('visions', '0012_contributioncomment'),
+        ('custom_user', '0009_alter_customuser_role'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_comments, clear_comments),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:43
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visions', '0013_backfill_contribution_comments'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='contribution',
+            name='comments',
+        ),
+    ]
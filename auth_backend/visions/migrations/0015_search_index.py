@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from visions.search import BACKENDS
+
+    backend = BACKENDS.get(schema_editor.connection.vendor)
+    if backend is None:
+        return  # No full-text support on this database; the search endpoint reports it
+    with schema_editor.connection.cursor() as cursor:
+        backend().install(cursor)
+        backend().rebuild(cursor)
+
+
+def uninstall_search_index(apps, schema_editor):
+    from visions.search import BACKENDS
+
+    backend = BACKENDS.get(schema_editor.connection.vendor)
+    if backend is not None:
+        with schema_editor.connection.cursor() as cursor:
+            backend().uninstall(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visions', '0014_remove_contribution_comments_json'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_tag_index(apps, schema_editor):
+    from visions.tags import rebuild_tag_index
+
+    Tag = apps.get_model('visions', 'Tag')
+    rebuild_tag_index(apps.get_model('visions', 'AnimationRequest'), apps.get_model('visions', 'AnimationRequestTag'), Tag)
+    rebuild_tag_index(
+        apps.get_model('visions', 'OpenSourceVisionRequest'), apps.get_model('visions', 'OpenSourceVisionRequestTag'), Tag
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visions', '0015_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnimationRequestTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OpenSourceVisionRequestTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='animationrequest',
+            index=models.Index(fields=['category'], name='anim_req_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animationrequest',
+            index=models.Index(fields=['difficulty'], name='anim_req_difficulty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='opensourcevisionrequest',
+            index=models.Index(fields=['visibility', 'category'], name='os_request_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='opensourcevisionrequest',
+            index=models.Index(fields=['visibility', 'difficulty'], name='os_request_difficulty_idx'),
+        ),
+        migrations.AddField(
+            model_name='animationrequesttag',
+            name='request',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='visions.animationrequest'),
+        ),
+        migrations.AddField(
+            model_name='opensourcevisionrequesttag',
+            name='request',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='visions.opensourcevisionrequest'),
+        ),
+        migrations.AddField(
+            model_name='opensourcevisionrequesttag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='os_request_links', to='visions.tag'),
+        ),
+        migrations.AddField(
+            model_name='animationrequesttag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='animation_request_links', to='visions.tag'),
+        ),
+        migrations.AddConstraint(
+            model_name='opensourcevisionrequesttag',
+            constraint=models.UniqueConstraint(fields=('tag', 'request'), name='unique_os_request_tag'),
+        ),
+        migrations.AddConstraint(
+            model_name='animationrequesttag',
+            constraint=models.UniqueConstraint(fields=('tag', 'request'), name='unique_animation_request_tag'),
+        ),
+        migrations.RunPython(build_tag_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_initial_revisions(apps, schema_editor):
+    from visions.revisions import backfill_initial_revisions
+
+    backfill_initial_revisions(apps.get_model('visions', 'CollaborativeCode'), apps.get_model('visions', 'CodeRevision'))
+
+
+def clear_revisions(apps, schema_editor):
+    apps.get_model('visions', 'CodeRevision').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visions', '0016_tag_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collaborativecode',
+            name='head_revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CodeRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('is_snapshot', models.BooleanField(default=False)),
+                ('html_data', models.TextField(blank=True)),
+                ('css_data', models.TextField(blank=True)),
+                ('js_data', models.TextField(blank=True)),
+                ('checksum', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='code_revisions', to=settings.AUTH_USER_MODEL)),
+                ('code', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='visions.collaborativecode')),
+                ('proposal', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='revisions', to='visions.codechangeproposal')),
+            ],
+            options={
+                'ordering': ['code', 'number'],
+                'constraints': [models.UniqueConstraint(fields=('code', 'number'), name='unique_code_revision_number')],
+            },
+        ),
+        migrations.RunPython(record_initial_revisions, clear_revisions),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visions', '0017_coderevision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codechangeproposal',
+            name='base_revision',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visions', '0018_codechangeproposal_base_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodeBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('encoding', models.CharField(choices=[('raw', 'Raw'), ('zlib', 'zlib'), ('zstd', 'Zstandard')], default='raw', max_length=4)),
+                ('size', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='codechangeproposal',
+            name='proposed_css_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='visions.codeblob'),
+        ),
+        migrations.AddField(
+            model_name='codechangeproposal',
+            name='proposed_html_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='visions.codeblob'),
+        ),
+        migrations.AddField(
+            model_name='codechangeproposal',
+            name='proposed_js_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='visions.codeblob'),
+        ),
+        migrations.AddField(
+            model_name='collaborativecode',
+            name='main_css_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='visions.codeblob'),
+        ),
+        migrations.AddField(
+            model_name='collaborativecode',
+            name='main_html_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='visions.codeblob'),
+        ),
+        migrations.AddField(
+            model_name='collaborativecode',
+            name='main_js_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='visions.codeblob'),
+        ),
+    ]
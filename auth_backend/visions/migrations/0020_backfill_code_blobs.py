@@ -0,0 +1,79 @@
+from django.db import migrations, transaction
+
+from visions import blobs
+
+CHUNK_SIZE = 200
+
+# Model -> {inline text field: blob key}
+CONTENT_BLOBS = {
+    'CollaborativeCode': {
+        'main_html_content': 'main_html_blob',
+        'main_css_content': 'main_css_blob',
+        'main_js_content': 'main_js_blob',
+    },
+    'CodeChangeProposal': {
+        'proposed_html_content': 'proposed_html_blob',
+        'proposed_css_content': 'proposed_css_blob',
+        'proposed_js_content': 'proposed_js_blob',
+    },
+}
+
+
+def move_to_blobs(apps, schema_editor):
+    """
+    Stores each inline body as a CodeBlob and points the row at it, one
+    committed chunk of rows at a time. Identical bodies become a single blob.
+    """
+    CodeBlob = apps.get_model('visions', 'CodeBlob')
+    for model_name, fields in CONTENT_BLOBS.items():
+        model = apps.get_model('visions', model_name)
+        last_pk = None
+        while True:
+            rows = model.objects.order_by('pk')
+            if last_pk is not None:
+                rows = rows.filter(pk__gt=last_pk)
+            chunk = list(rows.only('pk', *fields)[:CHUNK_SIZE])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+
+            new_blobs = {}
+            for row in chunk:
+                for text_field, blob_field in fields.items():
+                    text = getattr(row, text_field) or ''
+                    sha256 = blobs.digest(text)
+                    if sha256 not in new_blobs:
+                        encoding, data = blobs.encode(text)
+                        new_blobs[sha256] = CodeBlob(sha256=sha256, encoding=encoding, size=len(text.encode()), data=data)
+                    setattr(row, f'{blob_field}_id', sha256)
+
+            with transaction.atomic():
+                CodeBlob.objects.bulk_create(new_blobs.values(), ignore_conflicts=True)
+                model.objects.bulk_update(chunk, list(fields.values()))
+
+
+def move_to_inline(apps, schema_editor):
+    CodeBlob = apps.get_model('visions', 'CodeBlob')
+    for model_name, fields in CONTENT_BLOBS.items():
+        model = apps.get_model('visions', model_name)
+        for row in model.objects.order_by('pk').iterator(chunk_size=CHUNK_SIZE):
+            for text_field, blob_field in fields.items():
+                blob_id = getattr(row, f'{blob_field}_id')
+                if blob_id is not None:
+                    blob = CodeBlob.objects.get(pk=blob_id)
+                    setattr(row, text_field, blobs.decode(blob.encoding, blob.data))
+                    setattr(row, f'{blob_field}_id', None)
+            row.save(update_fields=[*fields, *fields.values()])
+    CodeBlob.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    atomic = False  # Each chunk commits on its own
+
+    dependencies = [
+        ('visions', '0019_codeblob'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_to_blobs, move_to_inline),
+    ]
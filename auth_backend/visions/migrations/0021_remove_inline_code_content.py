@@ -0,0 +1,53 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visions', '0020_backfill_code_blobs'),
+    ]
+
+    operations = [
+        # A default lets the columns be re-added to existing rows when this is reversed
+        migrations.AlterField(
+            model_name='codechangeproposal',
+            name='proposed_css_content',
+            field=models.TextField(default=''),
+        ),
+        migrations.AlterField(
+            model_name='codechangeproposal',
+            name='proposed_html_content',
+            field=models.TextField(default=''),
+        ),
+        migrations.AlterField(
+            model_name='codechangeproposal',
+            name='proposed_js_content',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='codechangeproposal',
+            name='proposed_css_content',
+        ),
+        migrations.RemoveField(
+            model_name='codechangeproposal',
+            name='proposed_html_content',
+        ),
+        migrations.RemoveField(
+            model_name='codechangeproposal',
+            name='proposed_js_content',
+        ),
+        migrations.RemoveField(
+            model_name='collaborativecode',
+            name='main_css_content',
+        ),
+        migrations.RemoveField(
+            model_name='collaborativecode',
+            name='main_html_content',
+        ),
+        migrations.RemoveField(
+            model_name='collaborativecode',
+            name='main_js_content',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visions', '0021_remove_inline_code_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codechangeproposal',
+            name='diff_stats',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visions', '0022_codechangeproposal_diff_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collaborativecode',
+            name='preview_digest',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visions', '0023_collaborativecode_preview_digest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='opensourcecontribution',
+            index=models.Index(fields=['timestamp'], name='os_contribution_timestamp_idx'),
+        ),
+    ]
@@ -7,6 +7,8 @@ import json
 from django.utils import timezone
 from django.core.serializers.json import DjangoJSONEncoder
 
+from . import blobs
+
 User = get_user_model()
 
 class AnimationRequest(models.Model):
@@ -34,19 +36,77 @@ class AnimationRequest(models.Model):
     payment_id = models.CharField(max_length=255, null=True, blank=True)  # New field
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination: (created_at, id) newest first
+            models.Index(fields=['-created_at', '-id'], name='anim_req_created_idx'),
+            # Facet counts group on these
+            models.Index(fields=['category'], name='anim_req_category_idx'),
+            models.Index(fields=['difficulty'], name='anim_req_difficulty_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+class Tag(models.Model):
+    """ Normalized tag name shared by every request that uses it. """
+    name = models.CharField(max_length=50, unique=True)
+
+    def __str__(self):
+        return self.name
+
+class AnimationRequestTag(models.Model):
+    """ Inverted index row: AnimationRequest.tags mirrored by visions.tags.sync_tags. """
+    request = models.ForeignKey(AnimationRequest, on_delete=models.CASCADE, related_name="tag_links")
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="animation_request_links")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'request'], name='unique_animation_request_tag'),
+        ]
+
 class Contribution(models.Model):
     animation_request = models.ForeignKey(AnimationRequest, on_delete=models.CASCADE, related_name="contributions")
     developer = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="contributions")
     animation_link = models.URLField()  # Link to the hosted animation
     description = models.TextField()
     likes = models.PositiveIntegerField(default=0)
-    comments = models.JSONField(default=list)  # Stores user comments as list of dicts
+    comment_count = models.PositiveIntegerField(default=0)  # Maintained by ContributionComment creation
     submitted_at = models.DateTimeField(auto_now_add=True)
     approved = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-submitted_at', '-id'], name='contribution_submitted_idx'),
+            models.Index(fields=['animation_request', '-submitted_at', '-id'], name='contribution_req_submit_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored counters so the leaderboard signals can work out deltas on save
+        instance._loaded_state = {
+            'likes': instance.__dict__.get('likes'),
+            'approved': instance.__dict__.get('approved'),
+        }
+        return instance
+
+class ContributionComment(models.Model):
+    """ Append-only discussion on a contribution, paged by (created_at, id). """
+    contribution = models.ForeignKey(Contribution, on_delete=models.CASCADE, related_name="comment_entries")
+    author = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name="contribution_comments")
+    body = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['contribution', '-created_at', '-id'], name='contribution_comment_page_idx'),
+        ]
+
+    def __str__(self):
+        author = self.author.username if self.author else 'Unknown'
+        return f"Comment by {author} on contribution {self.contribution_id}"
+
 class Engagement(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     contribution = models.ForeignKey(Contribution, on_delete=models.CASCADE)
@@ -54,17 +114,83 @@ class Engagement(models.Model):
     comment = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='engagement_created_idx'),
+        ]
+        constraints = [
+            # One like per user per contribution; comment-only rows are unrestricted
+            models.UniqueConstraint(
+                fields=['user', 'contribution'], condition=models.Q(liked=True), name='unique_like_per_user',
+            ),
+        ]
+
 class Notification(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     message = models.CharField(max_length=255)
     read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_user_created_idx'),
+        ]
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Materialized leaderboard row for one developer in one window period.
+    Maintained incrementally by visions.leaderboard; rebuildable from Contribution.
+    """
+    WINDOW_CHOICES = [
+        ('all', 'All Time'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+    ]
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="leaderboard_entries")
+    window = models.CharField(max_length=10, choices=WINDOW_CHOICES)
+    period_start = models.DateField()  # Monday of the week, 1st of the month, or a fixed date for all-time
+    total_likes = models.IntegerField(default=0)
+    total_contributions = models.IntegerField(default=0)
+    approved_contributions = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'window', 'period_start'], name='unique_leaderboard_entry'),
+        ]
+        indexes = [
+            # Serves both the top-N scan and the "how many rank above me" count
+            models.Index(
+                fields=['window', 'period_start', '-total_likes', '-total_contributions', 'user'],
+                name='leaderboard_rank_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.window} {self.period_start}: {self.total_likes} likes"
+
 
 
 def get_opensource_attachment_path(instance, filename):
     return f'vision_attachments/opensource/{instance.request.id}/{filename}'
 
+
+class OpenSourceVisionRequestQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Preloads the relations OpenSourceVisionRequestSerializer reads, so a page of
+        projects costs a fixed number of queries however many rows it holds.
+        The viewer's collaboration state is resolved per page by
+        visions.collaboration.resolve_collaboration_status.
+        """
+        return self.select_related('creator').prefetch_related(
+            'attachments',
+            models.Prefetch('collaborators', queryset=CustomUser.objects.only('id', 'username')),
+        )
+
+
 class OpenSourceVisionRequest(models.Model):
     CATEGORY_CHOICES = [
         ('2D', '2D Animation'),
@@ -104,6 +230,8 @@ class OpenSourceVisionRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OpenSourceVisionRequestQuerySet.as_manager()
+
     def __str__(self):
         return f"OS Vision: {self.title} by {self.creator.username}"
 
@@ -111,6 +239,21 @@ class OpenSourceVisionRequest(models.Model):
         ordering = ['-created_at']
         verbose_name = "Open Source Vision Request"
         verbose_name_plural = "Open Source Vision Requests"
+        indexes = [
+            models.Index(fields=['visibility', '-created_at', '-id'], name='os_request_visible_created_idx'),
+            models.Index(fields=['visibility', 'category'], name='os_request_category_idx'),
+            models.Index(fields=['visibility', 'difficulty'], name='os_request_difficulty_idx'),
+        ]
+
+class OpenSourceVisionRequestTag(models.Model):
+    """ Inverted index row: OpenSourceVisionRequest.tags mirrored by visions.tags.sync_tags. """
+    request = models.ForeignKey(OpenSourceVisionRequest, on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='os_request_links')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'request'], name='unique_os_request_tag'),
+        ]
 
 class OpenSourceAttachment(models.Model):
     request = models.ForeignKey(OpenSourceVisionRequest, on_delete=models.CASCADE, related_name='attachments')
@@ -178,21 +321,112 @@ class OpenSourceContribution(models.Model):
         ordering = ['-timestamp']
         verbose_name = "Contribution"
         verbose_name_plural = "OpenSourceContributions"
+        indexes = [
+            # Date-range exports (visions.exports)
+            models.Index(fields=['timestamp'], name='os_contribution_timestamp_idx'),
+        ]
+
+
+
+
+class CodeBlobManager(models.Manager):
+    def store(self, text):
+        """ The blob holding `text`, written only if no identical body is stored yet. """
+        sha256 = blobs.digest(text)
+        encoding, data = blobs.encode(text)
+        blob = self.model(sha256=sha256, encoding=encoding, size=len(text.encode()), data=data)
+        self.bulk_create([blob], ignore_conflicts=True)
+        blob._text = text
+        return blob
+
+
+class CodeBlob(models.Model):
+    """
+    An immutable HTML/CSS/JS body keyed by the SHA-256 of its text, so code
+    and proposals carrying identical files share one row. See visions.blobs.
+    """
+    ENCODING_CHOICES = [('raw', 'Raw'), ('zlib', 'zlib'), ('zstd', 'Zstandard')]
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    encoding = models.CharField(max_length=4, choices=ENCODING_CHOICES, default='raw')
+    size = models.PositiveIntegerField()  # Bytes of UTF-8 text before compression
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = CodeBlobManager()
+
+    def __str__(self):
+        return self.sha256
+
+    @property
+    def text(self):
+        if not hasattr(self, '_text'):
+            self._text = blobs.decode(self.encoding, self.data)
+        return self._text
 
 
+def blob_text(blob_field, default=''):
+    """
+    Text accessor backed by the `blob_field` foreign key. Assigned text is
+    held on the instance until save() stores it as a blob; a model with no
+    blob yet reads as `default`.
+    """
+    pending = f'_pending_{blob_field}'
 
+    def get(instance):
+        if pending in instance.__dict__:
+            return instance.__dict__[pending]
+        if getattr(instance, f'{blob_field}_id') is None:
+            return default
+        return getattr(instance, blob_field).text
 
-class CollaborativeCode(models.Model):
+    def set(instance, value):
+        instance.__dict__[pending] = value
+
+    return property(get, set)
+
+
+class BlobContentMixin:
+    """ Stores text assigned to the blob_text() accessors before saving the row. """
+    CONTENT_BLOBS = {}
+
+    def save(self, *args, update_fields=None, **kwargs):
+        for blob_field in self.CONTENT_BLOBS.values():
+            text = self.__dict__.pop(f'_pending_{blob_field}', None)
+            if text is not None:
+                setattr(self, blob_field, CodeBlob.objects.store(text))
+        if update_fields is not None:
+            # Callers may name the text accessors; the columns are the blob keys behind them
+            update_fields = {self.CONTENT_BLOBS.get(field, field) for field in update_fields}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+class CollaborativeCode(BlobContentMixin, models.Model):
     id = models.UUIDField(default=uuid.uuid4, primary_key=True, editable=False)
     project = models.OneToOneField(
         OpenSourceVisionRequest,
         on_delete=models.CASCADE,
         related_name='collaborative_code'
     )
+    DEFAULT_CONTENT = {
+        'main_html_content': "<html>\n<head>\n</head>\n<body>\n  <h1>Welcome</h1>\n</body>\n</html>",
+        'main_css_content': "/* Approved CSS styles */",
+        'main_js_content': "// Approved JavaScript code",
+    }
+    # Text accessor -> the blob key behind it
+    CONTENT_BLOBS = {
+        'main_html_content': 'main_html_blob',
+        'main_css_content': 'main_css_blob',
+        'main_js_content': 'main_js_blob',
+    }
+
     # Represents the currently approved/merged code
-    main_html_content = models.TextField(blank=True, default="<html>\n<head>\n</head>\n<body>\n  <h1>Welcome</h1>\n</body>\n</html>")
-    main_css_content = models.TextField(blank=True, default="/* Approved CSS styles */")
-    main_js_content = models.TextField(blank=True, default="// Approved JavaScript code")
+    main_html_blob = models.ForeignKey(CodeBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    main_css_blob = models.ForeignKey(CodeBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    main_js_blob = models.ForeignKey(CodeBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    main_html_content = blob_text('main_html_blob', DEFAULT_CONTENT['main_html_content'])
+    main_css_content = blob_text('main_css_blob', DEFAULT_CONTENT['main_css_content'])
+    main_js_content = blob_text('main_js_blob', DEFAULT_CONTENT['main_js_content'])
 
     # Track who made the last APPROVED change
     last_approved_by = models.ForeignKey(
@@ -202,6 +436,10 @@ class CollaborativeCode(models.Model):
         related_name='last_approved_code_changes'
     )
     last_approved_at = models.DateTimeField(default=timezone.now) # Track when last merge happened
+    # Number of the CodeRevision the main_* fields hold; 0 until the first merge
+    head_revision = models.PositiveIntegerField(default=0)
+    # SHA-256 of the rendered preview document of the head (see visions.previews); blank until the first merge
+    preview_digest = models.CharField(max_length=64, blank=True)
 
     def __str__(self):
         return f"Main Code for '{self.project.title}'"
@@ -212,7 +450,7 @@ class CollaborativeCode(models.Model):
 
 
 # NEW MODEL: Represents a proposed change by a collaborator
-class CodeChangeProposal(models.Model):
+class CodeChangeProposal(BlobContentMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending Review'),
         ('approved', 'Approved & Merged'),
@@ -230,13 +468,26 @@ class CodeChangeProposal(models.Model):
         on_delete=models.CASCADE, # If proposer deleted, remove proposal? Or SET_NULL?
         related_name='code_proposals_made'
     )
+    CONTENT_BLOBS = {
+        'proposed_html_content': 'proposed_html_blob',
+        'proposed_css_content': 'proposed_css_blob',
+        'proposed_js_content': 'proposed_js_blob',
+    }
+
     # Store the full proposed content
-    proposed_html_content = models.TextField()
-    proposed_css_content = models.TextField()
-    proposed_js_content = models.TextField()
+    proposed_html_blob = models.ForeignKey(CodeBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    proposed_css_blob = models.ForeignKey(CodeBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    proposed_js_blob = models.ForeignKey(CodeBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    proposed_html_content = blob_text('proposed_html_blob')
+    proposed_css_content = blob_text('proposed_css_blob')
+    proposed_js_content = blob_text('proposed_js_blob')
 
     # Optional: Snapshot of the timestamp of the main code this was based on
     based_on_timestamp = models.DateTimeField(null=True, blank=True)
+    # CollaborativeCode.head_revision the proposal was written against (null for legacy proposals)
+    base_revision = models.PositiveIntegerField(null=True, blank=True)
+    # {file: {'added': n, 'removed': n}} lines against base_revision, computed at submission
+    diff_stats = models.JSONField(null=True, blank=True, editable=False)
 
     message = models.TextField(blank=True, help_text="Describe the changes made.")
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
@@ -258,4 +509,36 @@ class CodeChangeProposal(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Code Change Proposal"
-        verbose_name_plural = "Code Change Proposals"
\ No newline at end of file
+        verbose_name_plural = "Code Change Proposals"
+
+
+class CodeRevision(models.Model):
+    """
+    One immutable step in a CollaborativeCode's history.
+
+    Snapshot revisions hold the full text of each file; the others hold a
+    diff-match-patch patch from the previous revision. See visions.revisions.
+    """
+    code = models.ForeignKey(CollaborativeCode, on_delete=models.CASCADE, related_name='revisions')
+    number = models.PositiveIntegerField()
+    is_snapshot = models.BooleanField(default=False)
+    html_data = models.TextField(blank=True)
+    css_data = models.TextField(blank=True)
+    js_data = models.TextField(blank=True)
+    checksum = models.CharField(max_length=64)  # SHA-256 of the rebuilt content, checked on rebuild
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='code_revisions'
+    )
+    proposal = models.ForeignKey(
+        CodeChangeProposal, on_delete=models.SET_NULL, null=True, blank=True, related_name='revisions'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['code', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['code', 'number'], name='unique_code_revision_number'),
+        ]
+
+    def __str__(self):
+        return f"Revision {self.number} of {self.code_id}"
@@ -1,5 +1,6 @@
 # permissions.py
 from rest_framework import permissions
+from . import membership
 from .models import OpenSourceVisionRequest, CodeChangeProposal
 
 class IsProjectCollaboratorOrOwner(permissions.BasePermission):
@@ -23,13 +24,8 @@ class IsProjectCollaboratorOrOwner(permissions.BasePermission):
         else:
             project = obj
 
-        # Allow owner
-        if project.creator == request.user:
-            return True
-        # Allow collaborators
-        if request.user in project.collaborators.all():
-            return True
-        return False
+        # Owner or collaborator; one indexed lookup, memoized for the rest of the request
+        return membership.is_member(request.user, project, request)
 
 class IsProposalOwner(permissions.BasePermission):
     """ Allows access only if the user is the proposer of the CodeChangeProposal. """
@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .counters import BufferedCounter, CacheCounterBuffer, LocalCounterBuffer
+from .hyperloglog import HyperLogLog
+from .models import AnimationRequest
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _make_buffer(namespace):
+    if _setting('VIEW_COUNTER_BUFFER', 'local') == 'cache':
+        return CacheCounterBuffer(namespace, alias=_setting('VIEW_COUNTER_CACHE_ALIAS', 'default'))
+    return LocalCounterBuffer()
+
+
+class UniqueViewerTracker:
+    """
+    Per-request HyperLogLog sketches of who viewed an AnimationRequest.
+
+    Views are folded into process-local sketches and merged into the shared
+    cache copy every `flush_interval` seconds, so a page view never waits on a
+    read-modify-write of the 4 KiB sketch.
+    """
+    precision = 12
+
+    def __init__(self, alias='default', flush_interval=30):
+        self.alias = alias
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()  # Request threads share the local sketches
+        self._local = {}
+        self._last_flush = time.monotonic()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _key(self, pk):
+        return f"hll:animationrequest:{pk}"
+
+    def add(self, pk, viewer_id):
+        with self._lock:
+            self._local.setdefault(pk, HyperLogLog(self.precision)).add(viewer_id)
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _shared(self, pk):
+        data = self.cache.get(self._key(pk))
+        return HyperLogLog.from_bytes(data) if data else HyperLogLog(self.precision)
+
+    def estimate(self, pk):
+        sketch = self._shared(pk)
+        with self._lock:
+            local = self._local.get(pk)
+            if local is not None:
+                sketch.merge(local)
+        return sketch.count()
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+            local, self._local = self._local, {}
+        for pk, sketch in local.items():
+            # Register-wise max is idempotent, so a lost race only loses precision
+            self.cache.set(self._key(pk), self._shared(pk).merge(sketch).to_bytes(), timeout=None)
+
+
+unique_viewers = UniqueViewerTracker(
+    alias=_setting('VIEW_COUNTER_CACHE_ALIAS', 'default'),
+    flush_interval=_setting('VIEW_COUNTER_FLUSH_INTERVAL', 30),
+)
+
+view_counter = BufferedCounter(
+    AnimationRequest, 'views',
+    buffer=_make_buffer('animationrequest-views'),
+    flush_interval=_setting('VIEW_COUNTER_FLUSH_INTERVAL', 30),
+    flush_threshold=_setting('VIEW_COUNTER_FLUSH_THRESHOLD', 1000),
+)
+
+
+def viewer_identity(request):
+    """ Stable id for unique-viewer estimates: user, anonymous client id, or IP. """
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    anonymous_id = request.headers.get('X-Anonymous-User-Id')
+    if anonymous_id:
+        return f"anon:{anonymous_id}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def record_view(request, animation_request):
+    """ Buffers one view of the request; nothing is written to the database here. """
+    if _setting('VIEW_COUNTER_TRACK_UNIQUE', True):
+        unique_viewers.add(animation_request.pk, viewer_identity(request))
+    view_counter.increment(animation_request.pk)
+
+
+def view_stats(animation_request):
+    """ Stored views plus whatever is still buffered, and the unique viewer estimate. """
+    stats = {'views': animation_request.views + view_counter.pending(animation_request.pk)}
+    if _setting('VIEW_COUNTER_TRACK_UNIQUE', True):
+        stats['unique_viewers'] = unique_viewers.estimate(animation_request.pk)
+    return stats
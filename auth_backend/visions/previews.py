@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+try:
+    import brotli
+except ImportError:  # Optional; without it only the gzip variant is written
+    brotli = None
+
+PREVIEW_DIR = 'previews'
+DOCUMENT = 'index.html'
+
+# Blocks whose whitespace is significant and must pass through the HTML minifier untouched
+_VERBATIM = re.compile(r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL)
+_HTML_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.DOTALL)
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+
+def minify_html(html):
+    """
+    Drops comments and collapses whitespace runs to one space, leaving
+    <pre>, <textarea>, <script> and <style> blocks as written.
+    """
+    parts = _VERBATIM.split(html)
+    out = []
+    # split() yields text, then (whole block, tag name) pairs
+    for n in range(0, len(parts), 3):
+        text = _HTML_COMMENT.sub('', parts[n])
+        out.append(re.sub(r'\s+', ' ', text))
+        if n + 1 < len(parts):
+            out.append(parts[n + 1])
+    return ''.join(out).strip()
+
+
+def minify_css(css):
+    css = _CSS_COMMENT.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    return re.sub(r'\s*([{};,>])\s*', r'\1', css).replace(';}', '}').strip()
+
+
+def _insert(html, tag, snippet, after=False):
+    """ `snippet` placed before </tag> (or after <tag ...>), else appended. """
+    pattern = rf'<{tag}\b[^>]*>' if after else rf'</{tag}\s*>'
+    match = re.search(pattern, html, re.IGNORECASE)
+    if match is None:
+        return html + snippet
+    at = match.end() if after else match.start()
+    return html[:at] + snippet + html[at:]
+
+
+def render(contents):
+    """ The merged HTML, CSS and JS ({'html', 'css', 'js'}) as one minified, self-contained document. """
+    html = minify_html(contents['html'])
+    css = minify_css(contents['css'])
+    # JS is inlined as written: safely minifying it needs a real parser
+    js = re.sub(r'</(script)', r'<\\/\1', contents['js'].strip(), flags=re.IGNORECASE)
+    if css:
+        html = _insert(html, 'head', f'<style>{css}</style>')
+    if js:
+        html = _insert(html, 'body', f'<script>{js}</script>')
+    if not html.lower().startswith('<!doctype'):
+        html = '<!DOCTYPE html>' + html
+    return html.encode()
+
+
+def variants(body):
+    """ {file suffix: bytes} for the document and its precompressed forms. """
+    files = {'': body, '.gz': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        files['.br'] = brotli.compress(body, quality=11)
+    return files
+
+
+def path(digest, suffix=''):
+    return f'{PREVIEW_DIR}/{digest}/{DOCUMENT}{suffix}'
+
+
+def url(digest):
+    """
+    Where viewers load a preview: CODE_PREVIEW_BASE_URL (a CDN or web server
+    in front of the storage) if set, else the fallback view in this app.
+    """
+    if not digest:
+        return None
+    base = getattr(settings, 'CODE_PREVIEW_BASE_URL', '')
+    if base:
+        return f"{base.rstrip('/')}/{path(digest)}"
+    return reverse('code-preview', args=[digest])
+
+
+def open_variant(digest, accept_encoding, storage=None):
+    """ (file, content encoding or None) of the smallest stored variant the client accepts. """
+    storage = storage or default_storage
+    accepted = {part.split(';')[0].strip() for part in accept_encoding.lower().split(',')}
+    for suffix, encoding in (('.br', 'br'), ('.gz', 'gzip'), ('', None)):
+        if encoding is not None and encoding not in accepted:
+            continue
+        name = path(digest, suffix)
+        if storage.exists(name):
+            return storage.open(name), encoding
+    return None, None
+
+
+def publish(contents, storage=None):
+    """
+    Renders and stores the preview of `contents` under the SHA-256 of the
+    document and returns that digest. Artifacts are immutable: identical code
+    maps to the same files, which are written once.
+    """
+    storage = storage or default_storage
+    body = render(contents)
+    digest = hashlib.sha256(body).hexdigest()
+    for suffix, data in variants(body).items():
+        name = path(digest, suffix)
+        if not storage.exists(name):
+            storage.save(name, ContentFile(data))
+    return digest
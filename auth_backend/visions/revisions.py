@@ -0,0 +1,268 @@
+import hashlib
+
+from diff_match_patch import diff_match_patch
+from django.conf import settings
+from django.utils import timezone
+
+from .models import CodeRevision
+
+# File key -> (CollaborativeCode field, CodeRevision field)
+FILES = {
+    'html': ('main_html_content', 'html_data'),
+    'css': ('main_css_content', 'css_data'),
+    'js': ('main_js_content', 'js_data'),
+}
+
+
+class RevisionIntegrityError(Exception):
+    """ A revision could not be rebuilt to the content it was recorded with. """
+
+
+class PatchError(ValueError):
+    """ A submitted patch is malformed or doesn't apply to its base revision. """
+
+
+class MergeConflict(Exception):
+    """ Both sides changed the same region of these files since their common base. """
+
+    def __init__(self, files):
+        super().__init__(f"Conflicting changes in {', '.join(files)}")
+        self.files = files
+
+
+def snapshot_interval():
+    return max(1, getattr(settings, 'CODE_REVISION_SNAPSHOT_INTERVAL', 20))
+
+
+def _dmp(relocate=False):
+    dmp = diff_match_patch()
+    dmp.Diff_Timeout = 2.0  # Seconds; a pathological diff degrades to a coarser patch, not a stall
+    dmp.Patch_DeleteThreshold = 0.0  # Deleted text has to match exactly
+    if relocate:
+        # Merging onto a newer head: the context must still match exactly, but may have moved
+        dmp.Match_Threshold = 0.001
+        dmp.Match_Distance = 10 ** 9
+    else:
+        dmp.Match_Threshold = 0.0  # Patches only ever apply to the exact text they were made from
+    return dmp
+
+
+def checksum(contents):
+    digest = hashlib.sha256()
+    for key in FILES:
+        data = contents[key].encode()
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def make_patch(old, new):
+    dmp = _dmp()
+    return dmp.patch_toText(dmp.patch_make(old, new))
+
+
+def parse_patch(patch_text):
+    try:
+        return _dmp().patch_fromText(patch_text)
+    except (ValueError, IndexError) as e:
+        raise PatchError(f"Malformed patch: {e}")
+
+
+def apply_patch(text, patch_text):
+    if not patch_text:
+        return text
+    dmp = _dmp()
+    result, applied = dmp.patch_apply(parse_patch(patch_text), text)
+    if not all(applied):
+        raise RevisionIntegrityError("Patch does not apply to its base text")
+    return result
+
+
+def head_contents(code):
+    return {key: getattr(code, field) for key, (field, _) in FILES.items()}
+
+
+def append_revision(code, contents, author=None, proposal=None, when=None):
+    """
+    Records `contents` ({'html', 'css', 'js'}) as the next revision of `code`
+    and makes it the head. The caller holds a row lock on `code`.
+
+    Every `CODE_REVISION_SNAPSHOT_INTERVAL`-th revision (starting with the
+    first) stores full text; the rest store patches against the previous head,
+    so their size follows the size of the edit.
+    """
+    number = code.head_revision + 1
+    is_snapshot = number == 1 or (number - 1) % snapshot_interval() == 0
+    previous = head_contents(code)
+    revision = CodeRevision(
+        code=code, number=number, is_snapshot=is_snapshot, checksum=checksum(contents),
+        author=author, proposal=proposal, created_at=when or timezone.now(),
+    )
+    for key, (code_field, data_field) in FILES.items():
+        data = contents[key] if is_snapshot else make_patch(previous[key], contents[key])
+        setattr(revision, data_field, data)
+        setattr(code, code_field, contents[key])
+    revision.save()
+    code.head_revision = number
+    return revision
+
+
+def rebuild(code, number):
+    """
+    Content of revision `number`: the nearest snapshot at or before it with the
+    patches after it applied in order, so at most one snapshot interval of
+    patches is ever replayed.
+    """
+    if code.head_revision and number == code.head_revision:
+        return head_contents(code)
+    chain = list(
+        CodeRevision.objects.filter(
+            code=code, number__lte=number,
+            number__gte=CodeRevision.objects.filter(code=code, number__lte=number, is_snapshot=True)
+            .order_by('-number').values('number')[:1],
+        ).order_by('number')
+    )
+    if not chain or chain[-1].number != number:
+        raise CodeRevision.DoesNotExist(f"Revision {number} of {code.pk} does not exist")
+
+    contents = {key: getattr(chain[0], data_field) for key, (_, data_field) in FILES.items()}
+    for revision in chain[1:]:
+        for key, (_, data_field) in FILES.items():
+            contents[key] = apply_patch(contents[key], getattr(revision, data_field))
+    if checksum(contents) != chain[-1].checksum:
+        raise RevisionIntegrityError(f"Revision {number} of {code.pk} rebuilt to different content")
+    return contents
+
+
+def contents_at(code, number):
+    """ Like rebuild(), but revision 0 is the code as created: the default template. """
+    if number == code.head_revision:
+        return head_contents(code)
+    if number == 0:
+        return {key: code.DEFAULT_CONTENT[field] for key, (field, _) in FILES.items()}
+    return rebuild(code, number)
+
+
+def apply_submission(base, patches):
+    """ Applies the client's {file: patch text} to the base contents; omitted files are unchanged. """
+    dmp = _dmp()
+    contents = dict(base)
+    for key, patch_text in patches.items():
+        if not patch_text:
+            continue
+        result, applied = dmp.patch_apply(parse_patch(patch_text), base[key])
+        if not all(applied):
+            raise PatchError(f"The {key} patch does not apply to the base revision")
+        contents[key] = result
+    return contents
+
+
+def three_way_merge(base, theirs, head):
+    """
+    Carries the edits between `base` and `theirs` over onto `head`, file by
+    file. Raises MergeConflict naming every file where the two sides touched
+    the same region.
+    """
+    dmp = _dmp(relocate=True)
+    merged, conflicts = {}, []
+    for key in FILES:
+        if theirs[key] == base[key] or theirs[key] == head[key]:
+            merged[key] = head[key]
+        elif head[key] == base[key]:
+            merged[key] = theirs[key]
+        else:
+            result, applied = dmp.patch_apply(dmp.patch_make(base[key], theirs[key]), head[key])
+            if all(applied):
+                merged[key] = result
+            else:
+                conflicts.append(key)
+    if conflicts:
+        raise MergeConflict(conflicts)
+    return merged
+
+
+def rebase(code, base_number, contents):
+    """
+    `contents` written against revision `base_number`, carried forward onto
+    the current head (unchanged if the head hasn't moved).
+    """
+    if base_number == code.head_revision:
+        return contents
+    return three_way_merge(contents_at(code, base_number), contents, head_contents(code))
+
+
+def backfill_initial_revisions(code_model, revision_model, batch_size=200):
+    """
+    Records each code's current content as its first (snapshot) revision.
+    Models are passed in so data migrations can use their historical versions.
+    """
+    codes = code_model.objects.filter(head_revision=0).order_by('pk')
+    batch = []
+    for code in codes.iterator(chunk_size=batch_size):
+        contents = {key: getattr(code, field) for key, (field, _) in FILES.items()}
+        batch.append(revision_model(
+            code_id=code.pk, number=1, is_snapshot=True, checksum=checksum(contents),
+            author_id=code.last_approved_by_id, created_at=code.last_approved_at,
+            **{data_field: contents[key] for key, (_, data_field) in FILES.items()},
+        ))
+        if len(batch) >= batch_size:
+            revision_model.objects.bulk_create(batch)
+            batch = []
+    revision_model.objects.bulk_create(batch)
+    codes.update(head_revision=1)
+
+
+def line_diff(old, new):
+    """ [(op, [lines])] turning `old` into `new`, diffed line by line; op is -1, 0 or 1. """
+    dmp = _dmp()
+    old_chars, new_chars, lines = dmp.diff_linesToChars(old, new)
+    diffs = dmp.diff_main(old_chars, new_chars, False)
+    dmp.diff_charsToLines(diffs, lines)
+    return [(op, text.splitlines(keepends=True)) for op, text in diffs]
+
+
+def diff_stats(old, new):
+    """ {file: {'added': n, 'removed': n}} lines changed between two contents dicts. """
+    stats = {}
+    for key in FILES:
+        counts = {-1: 0, 0: 0, 1: 0}
+        for op, lines in line_diff(old[key], new[key]):
+            counts[op] += len(lines)
+        stats[key] = {'added': counts[1], 'removed': counts[-1]}
+    return stats
+
+
+def unified_diff(old, new, name, context=3):
+    """ `old` -> `new` as unified diff text with `context` lines around each change. """
+    rows = []  # (op, line, old line number, new line number) with 1-based numbers of the next line
+    old_no = new_no = 1
+    for op, lines in line_diff(old, new):
+        for line in lines:
+            rows.append((op, line, old_no, new_no))
+            old_no += op != 1
+            new_no += op != -1
+    changed = [n for n, row in enumerate(rows) if row[0]]
+    if not changed:
+        return ''
+
+    # Merge changes whose context windows touch into one hunk
+    hunks, start, end = [], changed[0], changed[0]
+    for n in changed[1:]:
+        if n - end > 2 * context:
+            hunks.append((start, end))
+            start = n
+        end = n
+    hunks.append((start, end))
+
+    out = [f"--- a/{name}\n", f"+++ b/{name}\n"]
+    for start, end in hunks:
+        hunk = rows[max(0, start - context):end + context + 1]
+        old_len = sum(op != 1 for op, *_ in hunk)
+        new_len = sum(op != -1 for op, *_ in hunk)
+        old_start = hunk[0][2] - (old_len == 0)
+        new_start = hunk[0][3] - (new_len == 0)
+        out.append(f"@@ -{old_start},{old_len} +{new_start},{new_len} @@\n")
+        for op, line, *_ in hunk:
+            prefix = {-1: '-', 0: ' ', 1: '+'}[op]
+            out.append(prefix + (line if line.endswith('\n') else line + '\n\\ No newline at end of file\n'))
+    return ''.join(out)
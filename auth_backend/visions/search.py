@@ -0,0 +1,247 @@
+import base64
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+# Each indexed object gets document id = object id * 2 + kind, so both tables share one index
+KINDS = {'animation': 0, 'opensource': 1}
+KIND_NAMES = {value: name for name, value in KINDS.items()}
+INDEX_TABLE = 'visions_search'
+
+SOURCES = (
+    # (kind, source table)
+    (KINDS['animation'], 'visions_animationrequest'),
+    (KINDS['opensource'], 'visions_opensourcevisionrequest'),
+)
+
+
+class SearchHit:
+    __slots__ = ('doc_id', 'kind', 'object_id', 'score')
+
+    def __init__(self, doc_id, score):
+        self.doc_id = doc_id
+        self.kind = KIND_NAMES[doc_id % 2]
+        self.object_id = doc_id // 2
+        self.score = score
+
+
+def encode_cursor(hit):
+    return base64.urlsafe_b64encode(f"{hit.score!r}|{hit.doc_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """ (score, doc_id) of the last hit on the previous page, or None if malformed. """
+    try:
+        score, doc_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return float(score), int(doc_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def tokenize(query):
+    return re.findall(r'\w+', query.lower())[:16]
+
+
+class SQLiteSearchBackend:
+    """
+    FTS5 virtual table kept in sync with the source tables by triggers.
+    Lower bm25 scores are better; title matches weigh most, then tags and category.
+    """
+    weights = (10.0, 1.0, 2.0, 4.0)  # title, description, category, tags
+
+    def _row_sql(self, kind, ref):
+        return (
+            f"{ref}.id * 2 + {kind}, {ref}.title, {ref}.description, {ref}.category, "
+            f"(SELECT group_concat(value, ' ') FROM json_each({ref}.tags)), {ref}.visibility"
+        )
+
+    def install(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+            "title, description, category, tags, visible UNINDEXED, "
+            # Prefix indexes keep the type-ahead last term from scanning every matching term
+            "tokenize = 'porter unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        columns = "rowid, title, description, category, tags, visible"
+        for kind, table in SOURCES:
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_search_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {INDEX_TABLE}({columns}) VALUES ({self._row_sql(kind, 'NEW')}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_search_au AFTER UPDATE ON {table} "
+                "WHEN OLD.title IS NOT NEW.title OR OLD.description IS NOT NEW.description "
+                "OR OLD.category IS NOT NEW.category OR OLD.tags IS NOT NEW.tags "
+                "OR OLD.visibility IS NOT NEW.visibility BEGIN "
+                f"DELETE FROM {INDEX_TABLE} WHERE rowid = OLD.id * 2 + {kind}; "
+                f"INSERT INTO {INDEX_TABLE}({columns}) VALUES ({self._row_sql(kind, 'NEW')}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_search_ad AFTER DELETE ON {table} BEGIN "
+                f"DELETE FROM {INDEX_TABLE} WHERE rowid = OLD.id * 2 + {kind}; END"
+            )
+
+    def uninstall(self, cursor):
+        for _, table in SOURCES:
+            for suffix in ('ai', 'au', 'ad'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {table}_search_{suffix}")
+        cursor.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+
+    def rebuild(self, cursor):
+        cursor.execute(f"DELETE FROM {INDEX_TABLE}")
+        columns = "rowid, title, description, category, tags, visible"
+        for kind, table in SOURCES:
+            cursor.execute(
+                f"INSERT INTO {INDEX_TABLE}({columns}) SELECT {self._row_sql(kind, table)} FROM {table}"
+            )
+        cursor.execute(f"INSERT INTO {INDEX_TABLE}({INDEX_TABLE}) VALUES ('optimize')")
+
+    def match_expression(self, tokens):
+        # Quoted terms can't be parsed as FTS5 operators; the last one matches as a prefix
+        return ' '.join(f'"{token}"' for token in tokens) + '*'
+
+    def search(self, cursor, tokens, kind=None, after=None, limit=20):
+        weights = ', '.join(map(str, self.weights))
+        where, params = [f"{INDEX_TABLE} MATCH %s", "visible = 1"], [self.match_expression(tokens)]
+        if kind is not None:
+            # rowid parity is the kind; rowid range filters are free in FTS5 but parity isn't,
+            # so this is applied to the matched set
+            where.append("rowid %% 2 = %s")
+            params.append(kind)
+        sql = (
+            f"SELECT rowid, score FROM (SELECT rowid, bm25({INDEX_TABLE}, {weights}) AS score "
+            f"FROM {INDEX_TABLE} WHERE {' AND '.join(where)})"
+        )
+        if after is not None:
+            sql += " WHERE score > %s OR (score = %s AND rowid > %s)"
+            params += [after[0], after[0], after[1]]
+        sql += " ORDER BY score, rowid LIMIT %s"
+        cursor.execute(sql, params + [limit])
+        return [SearchHit(doc_id, score) for doc_id, score in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """
+    A side table holding a weighted tsvector per object under a GIN index,
+    kept in sync by row triggers. Scores are negated ts_rank_cd, so lower is
+    better as with bm25 and the cursor logic is shared.
+    """
+    config = 'english'
+
+    def _document_sql(self, ref):
+        tags = (
+            f"(CASE jsonb_typeof({ref}.tags::jsonb) WHEN 'array' THEN "
+            f"(SELECT string_agg(value, ' ') FROM jsonb_array_elements_text({ref}.tags::jsonb)) "
+            f"ELSE {ref}.tags::jsonb #>> '{{}}' END)"
+        )
+        return (
+            f"setweight(to_tsvector('{self.config}', coalesce({ref}.title, '')), 'A') || "
+            f"setweight(to_tsvector('{self.config}', coalesce({tags}, '')), 'B') || "
+            f"setweight(to_tsvector('{self.config}', coalesce({ref}.category, '')), 'B') || "
+            f"setweight(to_tsvector('{self.config}', coalesce({ref}.description, '')), 'C')"
+        )
+
+    def install(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+            "doc_id bigint PRIMARY KEY, visible boolean NOT NULL, document tsvector NOT NULL)"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {INDEX_TABLE}_document_idx ON {INDEX_TABLE} USING GIN (document)"
+        )
+        for kind, table in SOURCES:
+            cursor.execute(
+                f"CREATE OR REPLACE FUNCTION {table}_search_sync() RETURNS trigger AS $$ BEGIN "
+                f"IF TG_OP = 'DELETE' THEN DELETE FROM {INDEX_TABLE} WHERE doc_id = OLD.id * 2 + {kind}; RETURN OLD; END IF; "
+                f"INSERT INTO {INDEX_TABLE} (doc_id, visible, document) "
+                f"VALUES (NEW.id * 2 + {kind}, NEW.visibility, {self._document_sql('NEW')}) "
+                "ON CONFLICT (doc_id) DO UPDATE SET visible = EXCLUDED.visible, document = EXCLUDED.document; "
+                "RETURN NEW; END $$ LANGUAGE plpgsql"
+            )
+            cursor.execute(f"DROP TRIGGER IF EXISTS {table}_search ON {table}")
+            cursor.execute(
+                f"CREATE TRIGGER {table}_search AFTER INSERT OR DELETE OR UPDATE OF "
+                f"title, description, category, tags, visibility ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION {table}_search_sync()"
+            )
+
+    def uninstall(self, cursor):
+        for _, table in SOURCES:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {table}_search ON {table}")
+            cursor.execute(f"DROP FUNCTION IF EXISTS {table}_search_sync()")
+        cursor.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+
+    def rebuild(self, cursor):
+        cursor.execute(f"TRUNCATE {INDEX_TABLE}")
+        for kind, table in SOURCES:
+            cursor.execute(
+                f"INSERT INTO {INDEX_TABLE} (doc_id, visible, document) "
+                f"SELECT {table}.id * 2 + {kind}, {table}.visibility, {self._document_sql(table)} FROM {table}"
+            )
+
+    def match_expression(self, tokens):
+        return ' & '.join(f"{token}:*" if n == len(tokens) - 1 else token for n, token in enumerate(tokens))
+
+    def search(self, cursor, tokens, kind=None, after=None, limit=20):
+        where = ["document @@ q", "visible"]
+        params = [self.match_expression(tokens)]
+        if kind is not None:
+            where.append("doc_id %% 2 = %s")
+            params.append(kind)
+        sql = (
+            "SELECT doc_id, score FROM (SELECT doc_id, -ts_rank_cd(document, q)::float8 AS score "
+            f"FROM {INDEX_TABLE}, to_tsquery('{self.config}', %s) q WHERE {' AND '.join(where)}) hits"
+        )
+        if after is not None:
+            sql += " WHERE score > %s OR (score = %s AND doc_id > %s)"
+            params += [after[0], after[0], after[1]]
+        sql += " ORDER BY score, doc_id LIMIT %s"
+        cursor.execute(sql, params + [limit])
+        return [SearchHit(doc_id, score) for doc_id, score in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(vendor=None):
+    vendor = vendor or connection.vendor
+    if vendor not in BACKENDS:
+        raise ImproperlyConfigured(f"Full-text search is not available on the '{vendor}' backend")
+    return BACKENDS[vendor]()
+
+
+def search(query, kind=None, after=None, limit=20):
+    """
+    Ranked hits for `query`, best first, starting after the (score, doc_id)
+    cursor position `after`. `kind` narrows to 'animation' or 'opensource'.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    with connection.cursor() as cursor:
+        return get_backend().search(cursor, tokens, KINDS.get(kind), after, limit)
+
+
+def hydrate(hits):
+    """ Loads the objects behind the hits (one query per kind), in hit order. """
+    from .models import AnimationRequest, OpenSourceVisionRequest
+
+    models = {'animation': AnimationRequest, 'opensource': OpenSourceVisionRequest}
+    objects = {}
+    for kind, model in models.items():
+        ids = [hit.object_id for hit in hits if hit.kind == kind]
+        if ids:
+            rows = model.objects.filter(pk__in=ids, visibility=True).only(
+                'id', 'title', 'description', 'category', 'tags', 'created_at'
+            )
+            objects.update({(kind, row.pk): row for row in rows})
+    return [(hit, objects[hit.kind, hit.object_id]) for hit in hits if (hit.kind, hit.object_id) in objects]
+
+
+def rebuild_index():
+    with connection.cursor() as cursor:
+        get_backend().rebuild(cursor)
@@ -1,10 +1,13 @@
 from django.contrib.auth import get_user_model
-from rest_framework import serializers
-from .models import AnimationRequest, Contribution, Engagement, Notification
+from rest_framework import exceptions, serializers, status
+from .models import AnimationRequest, Contribution, ContributionComment, Engagement, Notification
 import json
 from .models import OpenSourceVisionRequest, OpenSourceAttachment,OpenSourceContribution,CollaborationRequest
 from decimal import Decimal 
-from .models import CollaborativeCode, CodeChangeProposal, OpenSourceVisionRequest # Import new models
+from .models import CollaborativeCode, CodeChangeProposal, CodeRevision, OpenSourceVisionRequest # Import new models
+from .collaboration import resolve_collaboration_status
+from .tags import normalize_tags
+from . import previews, revisions
 
 User = get_user_model()
 
@@ -30,7 +33,19 @@ class ContributionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contribution
         fields = '__all__'
-        read_only_fields = ['developer', 'likes', 'comments', 'submitted_at', 'approved']
+        read_only_fields = ['developer', 'likes', 'comment_count', 'submitted_at', 'approved']
+
+# Contribution Comment Serializer
+class ContributionCommentSerializer(serializers.ModelSerializer):
+    author = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ContributionComment
+        fields = ['id', 'contribution', 'author', 'body', 'created_at']
+        read_only_fields = ['id', 'contribution', 'author', 'created_at']
+
+    def get_author(self, obj):
+        return SimpleUserSerializer(obj.author).data if obj.author_id else None
 
 # Engagement Serializer
 class EngagementSerializer(serializers.ModelSerializer):
@@ -48,11 +63,15 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['created_at']
 
-# Leaderboard Serializer
-class LeaderboardSerializer(serializers.Serializer):
-    developer = UserSerializer()
-    total_likes = serializers.IntegerField()
-    total_contributions = serializers.IntegerField()
+# Search Result Serializer
+class SearchResultSerializer(serializers.Serializer):
+    type = serializers.CharField()
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    description = serializers.CharField()
+    category = serializers.CharField()
+    tags = serializers.JSONField()
+    created_at = serializers.DateTimeField()
 
 
 class SimpleUserSerializer(serializers.ModelSerializer):
@@ -60,6 +79,15 @@ class SimpleUserSerializer(serializers.ModelSerializer):
         model = User
         fields = ('id', 'username')
 
+
+# Leaderboard Serializer: public and cached, so the developer is shown without email or role
+class LeaderboardSerializer(serializers.Serializer):
+    rank = serializers.IntegerField(allow_null=True)
+    outside_top = serializers.IntegerField(required=False)  # Set when rank is null because the user ranks lower
+    developer = SimpleUserSerializer()
+    total_likes = serializers.IntegerField()
+    total_contributions = serializers.IntegerField()
+
 class OpenSourceAttachmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = OpenSourceAttachment
@@ -74,6 +102,17 @@ class OpenSourceContributionSerializer(serializers.ModelSerializer):
         fields = ['id', 'contributor_username', 'amount', 'razorpay_payment_id', 'timestamp']
         read_only_fields = ['id', 'contributor_username', 'razorpay_payment_id', 'timestamp']
 
+class OpenSourceVisionRequestListSerializer(serializers.ListSerializer):
+    """Resolves the viewer's collaboration state for the whole page up front."""
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        user = request.user if request else None
+        if user and user.is_authenticated:
+            self.context['collaboration_status'] = resolve_collaboration_status(user, [obj.pk for obj in items])
+        return super().to_representation(items)
+
 class OpenSourceVisionRequestSerializer(serializers.ModelSerializer):
     creator = serializers.SlugRelatedField(slug_field='username', read_only=True)
     current_funding = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
@@ -102,6 +141,15 @@ class OpenSourceVisionRequestSerializer(serializers.ModelSerializer):
         read_only_fields = ('creator', 'current_funding',
                             'created_at', 'updated_at', 'attachments', 'contributions',
                             'collaborators', 'current_user_collaboration_status','pending_requests')
+        list_serializer_class = OpenSourceVisionRequestListSerializer
+
+    def get_collaboration_status(self, obj, user):
+        """ Page-wide map set by the list serializer, or a one-off lookup for single objects. """
+        status_map = self.context.get('collaboration_status')
+        if status_map is None or obj.pk not in status_map:
+            status_map = resolve_collaboration_status(user, [obj.pk])
+            self.context['collaboration_status'] = status_map
+        return status_map
 
     def get_current_user_collaboration_status(self, obj):
         request = self.context.get('request')
@@ -109,22 +157,16 @@ class OpenSourceVisionRequestSerializer(serializers.ModelSerializer):
         if not user or not user.is_authenticated:
             return 'anonymous'
 
-        if obj.creator == user:
+        if obj.creator_id == user.pk:
             return 'owner'
-
-        if obj.collaborators.filter(pk=user.pk).exists():
-            return 'approved'
-
-        if CollaborationRequest.objects.filter(project=obj, requester=user, status='pending').exists():
-            return 'pending'
-        return 'none'
+        return self.get_collaboration_status(obj, user).role(obj.pk)
     
     def get_pending_requests(self, obj):
         request = self.context.get('request')
         user = request.user if request else None
 
-        if user and user.is_authenticated and obj.creator == user:
-            pending = CollaborationRequest.objects.filter(project=obj, status='pending').select_related('requester') # Optimization
+        if user and user.is_authenticated and obj.creator_id == user.pk:
+            pending = self.get_collaboration_status(obj, user).pending_requests(obj.pk)
             return CollaborationRequestSerializer(pending, many=True, context=self.context).data
         return None 
 
@@ -132,17 +174,14 @@ class OpenSourceVisionRequestSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         tags_data = validated_data.pop('tags', None)
-        instance = super().update(instance, validated_data)
         if tags_data is not None:
-            instance.tags.set(tags_data)
-        return instance
+            validated_data['tags'] = normalize_tags(tags_data)
+        return super().update(instance, validated_data)
 
     def create(self, validated_data):
-        tags_data = validated_data.pop('tags', [])
+        validated_data['tags'] = normalize_tags(validated_data.pop('tags', []))
         validated_data['creator'] = self.context['request'].user
-        instance = OpenSourceVisionRequest.objects.create(**validated_data)
-        instance.tags.set(tags_data)
-        return instance
+        return OpenSourceVisionRequest.objects.create(**validated_data)
 
 class OpenSourceVisionRequestCreateSerializer(serializers.ModelSerializer):
      tags = serializers.CharField(required=False)
@@ -169,10 +208,9 @@ class OpenSourceVisionRequestCreateSerializer(serializers.ModelSerializer):
              raise serializers.ValidationError(f"Error processing tags: {e}")
 
      def create(self, validated_data):
-        tags_data = validated_data.pop('tags', [])
-        instance = OpenSourceVisionRequest.objects.create(**validated_data)
-        instance.tags.set(tags_data) # Use set() for ManyToMany or JSONField assignment
-        return instance
+        # Stored normalized so the JSON list and the tag index agree
+        validated_data['tags'] = normalize_tags(validated_data.pop('tags', []))
+        return OpenSourceVisionRequest.objects.create(**validated_data)
 
 class OpenSourceContributionCreateSerializer(serializers.Serializer):
     amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('10.00'))
@@ -212,6 +250,12 @@ class ManageCollaborationSerializer(serializers.Serializer):
 
 
 class CollaborativeCodeSerializer(serializers.ModelSerializer):
+    # Stored as content-addressed blobs; these read through the model's accessors
+    main_html_content = serializers.CharField(required=False, allow_blank=True)
+    main_css_content = serializers.CharField(required=False, allow_blank=True)
+    main_js_content = serializers.CharField(required=False, allow_blank=True)
+    # Immutable, precompressed rendering of the head; null until the first merge
+    preview_url = serializers.SerializerMethodField()
     last_approved_by_username = serializers.SlugRelatedField(
         source='last_approved_by',
         slug_field='username',
@@ -226,13 +270,40 @@ class CollaborativeCodeSerializer(serializers.ModelSerializer):
             'main_css_content',
             'main_js_content',
             'last_approved_by_username',
-            'last_approved_at'
+            'last_approved_at',
+            'head_revision',
+            'preview_url',
         ]
         read_only_fields = [ # Typically read-only via this serializer
-            'id', 'project', 'last_approved_by_username', 'last_approved_at'
+            'id', 'project', 'last_approved_by_username', 'last_approved_at', 'head_revision'
             # Content might be read-only here if updates only happen via proposal approval
         ]
 
+    def get_preview_url(self, obj):
+        url = previews.url(obj.preview_digest)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if url and request else url
+
+
+# Serializers for the merge history of the main code
+class CodeRevisionSerializer(serializers.ModelSerializer):
+    author = SimpleUserSerializer(read_only=True)
+
+    class Meta:
+        model = CodeRevision
+        fields = ['number', 'author', 'proposal', 'is_snapshot', 'created_at']
+        read_only_fields = fields
+
+
+class CodeRevisionDetailSerializer(serializers.Serializer):
+    number = serializers.IntegerField()
+    author = SimpleUserSerializer(allow_null=True)
+    proposal = serializers.UUIDField(allow_null=True)
+    created_at = serializers.DateTimeField()
+    html_content = serializers.CharField()
+    css_content = serializers.CharField()
+    js_content = serializers.CharField()
+
 
 # Serializer for LISTING proposals (less detail)
 class CodeChangeProposalListSerializer(serializers.ModelSerializer):
@@ -241,13 +312,28 @@ class CodeChangeProposalListSerializer(serializers.ModelSerializer):
     class Meta:
         model = CodeChangeProposal
         fields = [
-            'id', 'proposer', 'message', 'status', 'created_at', 'project'
+            'id', 'proposer', 'message', 'status', 'created_at', 'project', 'base_revision', 'diff_stats',
         ]
         read_only_fields = fields
 
 
 # Serializer for CREATING a proposal (collaborator perspective)
 class CodeChangeProposalCreateSerializer(serializers.ModelSerializer):
+    """
+    Accepts either the three full documents or `patches`: diff-match-patch
+    text per file ('html', 'css', 'js'; omitted files are unchanged) against
+    `base_revision`. Either way, a proposal based on an older revision is
+    three-way merged onto the current head, or rejected with a 409.
+    Expects the project's CollaborativeCode as context['code'].
+    """
+    content_fields = {'html': 'proposed_html_content', 'css': 'proposed_css_content', 'js': 'proposed_js_content'}
+    # Content is required unless patches are sent (checked in validate)
+    proposed_html_content = serializers.CharField(required=False)
+    proposed_css_content = serializers.CharField(required=False)
+    proposed_js_content = serializers.CharField(required=False)
+    base_revision = serializers.IntegerField(min_value=0, required=False)
+    patches = serializers.DictField(child=serializers.CharField(allow_blank=True), required=False, write_only=True)
+
     # Proposer and project will be set in the view based on context
     class Meta:
         model = CodeChangeProposal
@@ -256,18 +342,62 @@ class CodeChangeProposalCreateSerializer(serializers.ModelSerializer):
             'proposed_css_content',
             'proposed_js_content',
             'message',
-            # 'based_on_timestamp' # Could be set automatically in view
+            'base_revision',
+            'patches',
         ]
-        # Ensure content fields are required for creation
-        extra_kwargs = {
-            'proposed_html_content': {'required': True},
-            'proposed_css_content': {'required': True},
-            'proposed_js_content': {'required': True},
-        }
+
+    def validate(self, attrs):
+        code = self.context['code']
+        patches = attrs.pop('patches', None)  # Form posts yield {} when absent
+        base_number = attrs.get('base_revision', code.head_revision)
+        if base_number > code.head_revision:
+            raise serializers.ValidationError({'base_revision': f"The latest revision is {code.head_revision}."})
+
+        if patches:
+            unknown = set(patches) - set(revisions.FILES)
+            if unknown:
+                raise serializers.ValidationError({'patches': f"Unknown files: {', '.join(sorted(unknown))}."})
+            try:
+                contents = revisions.apply_submission(revisions.contents_at(code, base_number), patches)
+            except CodeRevision.DoesNotExist:
+                raise serializers.ValidationError({'base_revision': "This revision is no longer available."})
+            except revisions.PatchError as e:
+                raise serializers.ValidationError({'patches': str(e)})
+        else:
+            missing = {field: "This field is required." for field in self.content_fields.values() if field not in attrs}
+            if missing:
+                raise serializers.ValidationError(missing)
+            contents = {key: attrs[field] for key, field in self.content_fields.items()}
+
+        try:
+            contents = revisions.rebase(code, base_number, contents)
+        except CodeRevision.DoesNotExist:
+            raise serializers.ValidationError({'base_revision': "This revision is no longer available."})
+        except revisions.MergeConflict as e:
+            raise ProposalConflict({
+                'detail': "The main code has changed in the same places since your base revision.",
+                'conflicts': e.files,
+                'head_revision': code.head_revision,
+            })
+
+        for key, field in self.content_fields.items():
+            attrs[field] = contents[key]
+        attrs['base_revision'] = code.head_revision
+        attrs['diff_stats'] = revisions.diff_stats(revisions.head_contents(code), contents)
+        return attrs
+
+
+class ProposalConflict(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The proposal conflicts with the current main code."
+    default_code = 'conflict'
 
 
 # Serializer for viewing DETAIL of a proposal (includes proposed code)
 class CodeChangeProposalDetailSerializer(serializers.ModelSerializer):
+    proposed_html_content = serializers.CharField(read_only=True)
+    proposed_css_content = serializers.CharField(read_only=True)
+    proposed_js_content = serializers.CharField(read_only=True)
     proposer = SimpleUserSerializer(read_only=True)
     reviewer = SimpleUserSerializer(read_only=True)
     project = serializers.PrimaryKeyRelatedField(read_only=True) # Show project ID
@@ -277,7 +407,7 @@ class CodeChangeProposalDetailSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'project', 'proposer', 'message', 'status',
             'proposed_html_content', 'proposed_css_content', 'proposed_js_content',
-            'created_at', 'reviewed_at', 'reviewer', 'based_on_timestamp',
+            'created_at', 'reviewed_at', 'reviewer', 'based_on_timestamp', 'base_revision', 'diff_stats',
         ]
         read_only_fields = fields
 
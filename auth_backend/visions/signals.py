@@ -0,0 +1,87 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from auth_backend.response_cache import model_tag, response_cache
+from custom_user.models import CustomUser
+from . import leaderboard, membership, tags
+from .models import (
+    AnimationRequest, Contribution, OpenSourceVisionRequest, OpenSourceAttachment,
+    OpenSourceContribution, CollaborationRequest,
+)
+
+
+@receiver(post_save, sender=Contribution)
+def update_leaderboard_on_contribution_save(sender, instance, created, **kwargs):
+    """ Feeds contribution creation, approval and like changes into the leaderboard. """
+    if created:
+        leaderboard.record_contribution(instance)
+    else:
+        loaded = getattr(instance, '_loaded_state', None) or {}
+        if loaded.get('likes') is not None and instance.likes != loaded['likes']:
+            leaderboard.record_likes(instance, instance.likes - loaded['likes'])
+        if loaded.get('approved') is not None and instance.approved != loaded['approved']:
+            leaderboard.record_approval(instance, approved=instance.approved)
+    instance._loaded_state = {'likes': instance.likes, 'approved': instance.approved}
+
+
+@receiver(post_delete, sender=Contribution)
+def update_leaderboard_on_contribution_delete(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, CustomUser) and origin.pk == instance.developer_id:
+        return  # The developer is being deleted; their leaderboard rows go with them
+    leaderboard.record_contribution(instance, sign=-1)
+
+
+@receiver(post_save, sender=AnimationRequest)
+@receiver(post_save, sender=OpenSourceVisionRequest)
+def sync_tag_index(sender, instance, update_fields=None, **kwargs):
+    """ Mirrors the JSON tags list into the tag index whenever it may have changed. """
+    if update_fields is None or 'tags' in update_fields:
+        tags.sync_tags(instance)
+
+
+def invalidate_project(project_id):
+    """ Drops cached list pages and the project's detail response once the transaction commits. """
+    response_cache.invalidate(
+        model_tag(OpenSourceVisionRequest), model_tag(OpenSourceVisionRequest, project_id)
+    )
+
+
+@receiver([post_save, post_delete], sender=OpenSourceVisionRequest)
+def invalidate_cached_project(sender, instance, **kwargs):
+    invalidate_project(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=OpenSourceVisionRequest)
+@receiver(m2m_changed, sender=OpenSourceVisionRequest.collaborators.through)
+def invalidate_project_membership(sender, **kwargs):
+    # Ownership or a collaborator list may have changed; memoized membership answers are stale
+    if kwargs.get('action', 'post_').startswith('post_'):
+        membership.changed()
+
+
+@receiver([post_save, post_delete], sender=OpenSourceAttachment)
+@receiver([post_save, post_delete], sender=OpenSourceContribution)
+@receiver([post_save, post_delete], sender=CollaborationRequest)
+def invalidate_cached_project_children(sender, instance, **kwargs):
+    project_id = getattr(instance, 'request_id', None) or getattr(instance, 'project_id', None)
+    invalidate_project(project_id)
+
+
+@receiver(m2m_changed, sender=OpenSourceVisionRequest.collaborators.through)
+def invalidate_cached_project_collaborators(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate_project(instance.pk)
+        return
+
+    # Changed from the user side (user.collaborating_visions): find every touched project
+    if action == 'pre_clear':
+        instance._cleared_project_ids = list(instance.collaborating_visions.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_project_ids', ())
+    elif not action.startswith('post_'):
+        return
+    response_cache.invalidate(model_tag(OpenSourceVisionRequest))
+    for project_id in pk_set or ():
+        response_cache.invalidate(model_tag(OpenSourceVisionRequest, project_id))
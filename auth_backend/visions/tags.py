@@ -0,0 +1,125 @@
+from django.db.models import Count
+
+from .models import (
+    AnimationRequest, AnimationRequestTag, OpenSourceVisionRequest, OpenSourceVisionRequestTag, Tag,
+)
+
+MAX_TAG_LENGTH = 50
+
+# Source model -> the through model that indexes its JSON tags
+LINK_MODELS = {
+    AnimationRequest: AnimationRequestTag,
+    OpenSourceVisionRequest: OpenSourceVisionRequestTag,
+}
+
+
+def normalize_tags(raw):
+    """ Lower-cased, whitespace-collapsed, de-duplicated tag names in their original order. """
+    if isinstance(raw, str):
+        raw = [raw]
+    names = []
+    for value in raw or ():
+        name = ' '.join(str(value).split()).lower()[:MAX_TAG_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def tag_ids(names, create=False):
+    """ {name: id} for the given names, creating missing Tag rows if asked to. """
+    if create:
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    return dict(Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+
+
+def sync_tags(instance):
+    """ Brings the instance's index rows in line with its JSON tags list. """
+    link_model = LINK_MODELS[type(instance)]
+    wanted = set(normalize_tags(instance.tags))
+    current = dict(
+        link_model.objects.filter(request_id=instance.pk).values_list('tag__name', 'pk')
+    )
+    stale = [link_pk for name, link_pk in current.items() if name not in wanted]
+    if stale:
+        link_model.objects.filter(pk__in=stale).delete()
+    missing = wanted - current.keys()
+    if missing:
+        link_model.objects.bulk_create(
+            [link_model(request_id=instance.pk, tag_id=pk) for pk in tag_ids(missing, create=True).values()],
+            ignore_conflicts=True,
+        )
+
+
+def filter_by_tags(queryset, names, match='any'):
+    """
+    Requests carrying any (or, with match='all', every one) of the tags,
+    resolved on the (tag, request) index instead of decoding JSON per row.
+    """
+    names = normalize_tags(names)
+    if not names:
+        return queryset
+    links = LINK_MODELS[queryset.model].objects.filter(tag__name__in=names)
+    if match == 'all':
+        links = links.values('request_id').annotate(matched=Count('tag_id')).filter(matched=len(names))
+    return queryset.filter(pk__in=links.values('request_id'))
+
+
+def facets(queryset, tag_limit=50):
+    """ Counts per tag, category and difficulty over the filtered queryset. """
+    link_model = LINK_MODELS[queryset.model]
+    ids = queryset.order_by().values('pk')
+    tag_counts = (
+        link_model.objects.filter(request_id__in=ids)
+        .values('tag__name').annotate(count=Count('request_id'))
+        .order_by('-count', 'tag__name')[:tag_limit]
+    )
+
+    def grouped(field):
+        rows = queryset.order_by().values(field).annotate(count=Count('pk')).order_by('-count', field)
+        return [{'value': row[field], 'count': row['count']} for row in rows]
+
+    return {
+        'tags': [{'value': row['tag__name'], 'count': row['count']} for row in tag_counts],
+        'category': grouped('category'),
+        'difficulty': grouped('difficulty'),
+    }
+
+
+def rebuild_tag_index(source_model, link_model, tag_model, batch_size=200):
+    """
+    Re-creates every index row of one source model from its JSON tags.
+    Models are passed in so data migrations can use their historical versions.
+    """
+    link_model.objects.all().delete()
+    rows = source_model.objects.order_by('pk').values_list('pk', 'tags')
+    pending = []
+
+    def flush():
+        names = {name for _, tag_names in pending for name in tag_names}
+        tag_model.objects.bulk_create([tag_model(name=name) for name in names], ignore_conflicts=True)
+        ids = dict(tag_model.objects.filter(name__in=names).values_list('name', 'pk'))
+        link_model.objects.bulk_create(
+            [link_model(request_id=pk, tag_id=ids[name]) for pk, tag_names in pending for name in tag_names],
+            ignore_conflicts=True,
+        )
+        pending.clear()
+
+    for pk, raw in rows.iterator(chunk_size=batch_size):
+        pending.append((pk, normalize_tags(raw)))
+        if len(pending) >= batch_size:
+            flush()
+    if pending:
+        flush()
+
+
+def filter_from_params(queryset, params):
+    """
+    Applies the listing filters shared by the list and facet endpoints:
+    `?tags=a,b` (with `?match=all` to require every tag), `?category=`, `?difficulty=`.
+    """
+    names = [name for value in params.getlist('tags') for name in value.split(',')]
+    queryset = filter_by_tags(queryset, names, match='all' if params.get('match') == 'all' else 'any')
+    for field in ('category', 'difficulty'):
+        if params.get(field):
+            queryset = queryset.filter(**{field: params[field]})
+    return queryset
@@ -1,3 +1,1065 @@
-from django.test import TestCase
+import asyncio
+import csv
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import itertools
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.contrib.auth.models import AnonymousUser
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from auth_backend.response_cache import model_tag, response_cache
+from custom_user.models import CustomUser
+from . import events, funding, leaderboard, likes, membership, popularity, previews, revisions, search, tags
+from .counters import BufferedCounter, CacheCounterBuffer
+from .collaboration import resolve_collaboration_status
+from .models import (
+    OpenSourceVisionRequest, OpenSourceAttachment, OpenSourceContribution, CollaborationRequest, Notification,
+    AnimationRequest, Contribution, LeaderboardEntry, Engagement,
+    OpenSourceVisionRequestTag, CollaborativeCode, CodeChangeProposal, CodeRevision, CodeBlob,
+)
+
+
+def make_user(username):
+    return CustomUser.objects.create_user(username=username, email=f"{username}@example.com")
+
+
+def make_project(creator, title):
+    return OpenSourceVisionRequest.objects.create(
+        creator=creator, title=title, description="desc", category='2D',
+        difficulty='Intermediate', funding_goal=Decimal('1000.00'),
+    )
+
+
+class TemporaryMediaMixin:
+    """ Keeps files written by merges (preview bundles) out of the real MEDIA_ROOT. """
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name, CODE_PREVIEW_BASE_URL='')
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class OpenSourceVisionRequestListQueryTests(TestCase):
+    """The project list must cost the same number of queries for 2 rows as for 20."""
+
+    def setUp(self):
+        self.owner = make_user("owner")
+        self.viewer = make_user("viewer")
+        self.client = APIClient()
+        self.url = reverse('os-request-list-create')
+
+    def add_projects(self, count):
+        with self.captureOnCommitCallbacks(execute=True):  # Cached anonymous pages are dropped on commit
+            self._add_projects(count)
+
+    def _add_projects(self, count):
+        for i in range(count):
+            project = make_project(self.owner, f"Project {i}")
+            OpenSourceAttachment.objects.create(request=project, file=f"vision_attachments/{i}.txt")
+            helper = make_user(f"helper-{project.pk}")
+            project.collaborators.add(helper)
+            CollaborationRequest.objects.create(project=project, requester=make_user(f"asker-{project.pk}"))
+
+    def count_list_queries(self, user):
+        if user is not None:
+            self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_is_flat_for_every_viewer(self):
+        for user in (None, self.owner, self.viewer):
+            with self.subTest(user=user):
+                OpenSourceVisionRequest.objects.all().delete()
+                self.add_projects(2)
+                small, _ = self.count_list_queries(user)
+                self.add_projects(18)
+                large, _ = self.count_list_queries(user)
+                self.assertEqual(small, large)
+
+    def test_owner_sees_prefetched_pending_requests(self):
+        self.add_projects(3)
+        _, response = self.count_list_queries(self.owner)
+        rows = response.json()['results']
+        self.assertEqual(len(rows), 3)
+        for row in rows:
+            self.assertEqual(row['current_user_collaboration_status'], 'owner')
+            self.assertEqual(len(row['pending_requests']), 1)
+            self.assertEqual(len(row['collaborators']), 1)
+            self.assertEqual(len(row['attachments']), 1)
+
+    def test_viewer_statuses(self):
+        approved = make_project(self.owner, "approved")
+        approved.collaborators.add(self.viewer)
+        pending = make_project(self.owner, "pending")
+        CollaborationRequest.objects.create(project=pending, requester=self.viewer)
+        make_project(self.owner, "none")
+
+        _, response = self.count_list_queries(self.viewer)
+        statuses = {row['title']: row['current_user_collaboration_status'] for row in response.json()['results']}
+        self.assertEqual(statuses, {'approved': 'approved', 'pending': 'pending', 'none': 'none'})
+        self.assertTrue(all(row['pending_requests'] is None for row in response.json()['results']))
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = make_user("reader")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        created = Notification.objects.create(user=self.user, message="first").created_at
+        for i in range(1, 25):
+            Notification.objects.create(user=self.user, message=f"n{i}")
+        # Identical timestamps must still page deterministically on the id tiebreak
+        Notification.objects.update(created_at=created)
+
+    def test_walks_forward_and_back_without_gaps(self):
+        url = reverse('notifications-list') + '?page_size=10'
+        first = self.client.get(url).json()
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        third = self.client.get(second['next']).json()
+        self.assertIsNone(third['next'])
+
+        ids = [row['id'] for page in (first, second, third) for row in page['results']]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 25)
+
+        back = self.client.get(third['previous']).json()
+        self.assertEqual(back['results'], second['results'])
+        back = self.client.get(back['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_rejects_garbage_cursor(self):
+        response = self.client.get(reverse('notifications-list') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class CollaborationStatusResolverTests(TestCase):
+    def test_resolves_a_page_in_two_queries(self):
+        owner, viewer = make_user("owner"), make_user("viewer")
+        own = make_project(viewer, "own")
+        approved = make_project(owner, "approved")
+        approved.collaborators.add(viewer)
+        pending = make_project(owner, "pending")
+        CollaborationRequest.objects.create(project=pending, requester=viewer)
+        stranger = make_project(owner, "stranger")
+        asker = make_user("asker")
+        CollaborationRequest.objects.create(project=own, requester=asker)
+
+        ids = [own.pk, approved.pk, pending.pk, stranger.pk]
+        with self.assertNumQueries(2):
+            status_map = resolve_collaboration_status(viewer, ids)
+
+        self.assertEqual(
+            [status_map.role(pk) for pk in ids], ['owner', 'approved', 'pending', 'none']
+        )
+        self.assertEqual([r.requester for r in status_map.pending_requests(own.pk)], [asker])
+        self.assertEqual(status_map.pending_requests(pending.pk), [])
+
+
+
+class ProjectMembershipTests(TestCase):
+    def setUp(self):
+        self.owner, self.collaborator, self.stranger = make_user("owner"), make_user("collab"), make_user("stranger")
+        self.project = make_project(self.owner, "Project")
+        self.project.collaborators.add(self.collaborator)
+        self.request = RequestFactory().get('/')
+
+    def test_one_query_per_request_and_dropped_on_change(self):
+        self.assertTrue(membership.is_member(self.owner, self.project, self.request))  # No query needed
+        with self.assertNumQueries(1):
+            self.assertTrue(membership.is_member(self.collaborator, self.project, self.request))
+            self.assertTrue(membership.is_member(self.collaborator, self.project.pk, self.request))
+        self.assertFalse(membership.is_member(AnonymousUser(), self.project, self.request))
+
+        self.project.collaborators.remove(self.collaborator)
+        with self.assertNumQueries(1):
+            self.assertFalse(membership.is_member(self.collaborator, self.project, self.request))
+
+    def test_bulk_lookup(self):
+        own = make_project(self.collaborator, "Own")
+        other = make_project(self.owner, "Other")
+        with self.assertNumQueries(1):
+            found = membership.member_project_ids(self.collaborator, [self.project.pk, own.pk, other.pk], self.request)
+            self.assertFalse(membership.is_member(self.collaborator, other.pk, self.request))
+        self.assertEqual(found, {self.project.pk, own.pk})
+        self.assertEqual(membership.member_project_ids(self.stranger, [self.project.pk]), set())
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        self.client_user = make_user("client")
+        self.request = AnimationRequest.objects.create(
+            title="Req", description="d", category="c", difficulty='Easy', created_by=self.client_user,
+        )
+
+    def contribute(self, developer, likes=0):
+        return Contribution.objects.create(
+            animation_request=self.request, developer=developer,
+            animation_link="https://example.com", description="d", likes=likes,
+        )
+
+    def snapshot(self):
+        return sorted(LeaderboardEntry.objects.values_list(
+            'user_id', 'window', 'period_start', 'total_likes', 'total_contributions', 'approved_contributions'
+        ))
+
+    def test_deleting_users_with_contributions(self):
+        alice, bob = make_user("alice"), make_user("bob")
+        self.contribute(alice, likes=3)
+        self.contribute(bob, likes=2)
+        alice.delete()
+        self.assertFalse(LeaderboardEntry.objects.filter(user_id=alice.pk).exists())
+
+        # Deleting the client cascades to bob's contribution: his rows are emptied, not re-created
+        self.client_user.delete()
+        self.assertEqual(
+            set(LeaderboardEntry.objects.values_list('user_id', 'total_likes', 'total_contributions')), {(bob.pk, 0, 0)},
+        )
+        connection.check_constraints()
+
+    def test_incremental_updates_match_a_full_rebuild(self):
+        alice, bob = make_user("alice"), make_user("bob")
+        first = self.contribute(alice, likes=3)
+        self.contribute(alice)
+        self.contribute(bob, likes=1)
+
+        first = Contribution.objects.get(pk=first.pk)
+        first.likes = 7
+        first.approved = True
+        first.save()
+        self.contribute(bob).delete()
+
+        incremental = self.snapshot()
+        leaderboard.rebuild_leaderboard()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_top_and_rank(self):
+        alice, bob, carol = make_user("alice"), make_user("bob"), make_user("carol")
+        self.contribute(alice, likes=5)
+        self.contribute(bob, likes=9)
+        self.contribute(carol, likes=5)
+        self.contribute(carol)
+
+        for window in leaderboard.WINDOWS:
+            self.assertEqual([e.user for e in leaderboard.top(window)], [bob, carol, alice])
+            self.assertEqual(leaderboard.rank_of(alice, window)[0], 3)
+            self.assertEqual(leaderboard.rank_of(carol, window, limit=2)[0], 2)
+            self.assertEqual(leaderboard.rank_of(alice, window, limit=2), (None, leaderboard.rank_of(alice, window)[1]))
+
+        response = APIClient().get(reverse('leaderboard') + f'?window=weekly&user={carol.pk}')
+        self.assertEqual(response.json()['rank'], 2)
+        self.assertEqual(response.json()['developer'], {'id': carol.pk, 'username': "carol"})
+        self.assertNotIn('outside_top', response.json())
+        with mock.patch.object(leaderboard, 'RANK_SCAN_LIMIT', 2):
+            response = APIClient().get(reverse('leaderboard') + f'?window=monthly&user={alice.pk}')
+        self.assertEqual((response.json()['rank'], response.json()['outside_top']), (None, 2))
+
+    def test_bad_query_parameters(self):
+        self.contribute(make_user("alice"))
+        url = reverse('leaderboard')
+        client = APIClient()
+        for limit in ('-1', '0', 'ten'):
+            response = client.get(url, {'limit': limit})
+            self.assertEqual((response.status_code, len(response.json())), (200, 1))
+        for user in ('abc', '-1', '9' * 40):
+            self.assertEqual(client.get(url, {'user': user}).status_code, 400)
+        self.assertEqual(client.get(url, {'user': '999'}).status_code, 404)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user("owner")
+        self.project = make_project(self.owner, "cached")
+        self.client = APIClient()
+
+    def test_anonymous_reads_hit_until_a_tagged_model_changes(self):
+        list_url = reverse('os-request-list-create')
+        detail_url = reverse('os-request-detail', args=[self.project.pk])
+        other = make_project(self.owner, "other")
+        other_url = reverse('os-request-detail', args=[other.pk])
+
+        for url in (list_url, detail_url, other_url):
+            self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(detail_url)
+        self.assertEqual(response_cache.stats()['hits'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.collaborators.add(make_user("helper"))
+            # Invalidation waits for the commit: until then readers still get the cached page
+            with self.assertNumQueries(0):
+                self.client.get(detail_url)
+
+        # Only the changed project and the list are evicted
+        with self.assertNumQueries(0):
+            self.client.get(other_url)
+        response = self.client.get(detail_url)
+        self.assertEqual(len(response.json()['collaborators']), 1)
+        self.assertEqual(response_cache.stats(), {'hits': 3, 'misses': 4, 'hit_ratio': 0.4286})
+
+    def test_data_built_during_an_invalidation_is_not_served(self):
+        request = RequestFactory().get('/cached/')
+        tags = [model_tag(OpenSourceVisionRequest)]
+        key, _ = response_cache.get(request, tags)
+        # A write commits while the view is still building its (now stale) data
+        with self.captureOnCommitCallbacks(execute=True):
+            response_cache.invalidate(*tags)
+        response_cache.set(key, {'stale': True})
+        self.assertIsNone(response_cache.get(request, tags)[1])
+
+    def test_authenticated_users_bypass_the_cache(self):
+        url = reverse('os-request-detail', args=[self.project.pk])
+        self.client.get(url)
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(url)
+        self.assertEqual(response.json()['current_user_collaboration_status'], 'owner')
+
+
+class BufferedViewCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user("owner")
+        self.request = AnimationRequest.objects.create(
+            title="Req", description="d", category="c", difficulty='Easy', created_by=self.owner,
+        )
+        popularity.view_counter.flush()
+        popularity.unique_viewers.flush()
+
+    def test_detail_reads_do_not_write_until_flush(self):
+        url = reverse('requests-detail', args=[self.request.pk])
+        viewers = [make_user(f"viewer-{i}") for i in range(3)]
+        client = APIClient()
+        for viewer in viewers * 2:
+            client.force_authenticate(viewer)
+            response = client.get(url)
+
+        self.assertEqual(response.json()['views'], 6)
+        self.assertEqual(response.json()['unique_viewers'], 3)
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.views, 0)
+
+        popularity.view_counter.flush()
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.views, 6)
+
+    def test_cache_buffer_drains_into_one_update(self):
+        counter = BufferedCounter(
+            AnimationRequest, 'views', buffer=CacheCounterBuffer('test-views'), flush_interval=3600,
+        )
+        for _ in range(4):
+            counter.increment(self.request.pk)
+        counter.buffer.add(self.request.pk, 2)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(counter.flush(), 1)
+        self.assertEqual(sum(q['sql'].startswith('UPDATE') for q in ctx.captured_queries), 1)
+        counter.increment(self.request.pk)
+        counter.flush()
+
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.views, 7)
+        self.assertEqual(counter.pending(self.request.pk), 0)
+
+    def test_flush_commands_refuse_local_buffers(self):
+        popularity.view_counter.increment(self.request.pk)
+        with self.assertRaisesMessage(CommandError, "VIEW_COUNTER_BUFFER is 'local'"):
+            call_command('flush_view_counts', stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, "LIKE_COUNTER_BUFFER is 'local'"):
+            call_command('flush_like_counts', stdout=StringIO())
+
+        shared = BufferedCounter(AnimationRequest, 'views', buffer=CacheCounterBuffer('test-views'), flush_interval=3600)
+        shared.increment(self.request.pk, 2)
+        with mock.patch('visions.management.commands.flush_view_counts.view_counter', shared):
+            call_command('flush_view_counts', stdout=StringIO())
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.views, 2)
+
+    def test_failed_flush_on_the_request_path_is_kept_for_later(self):
+        counter = BufferedCounter(AnimationRequest, 'views', flush_interval=0)
+        with mock.patch.object(AnimationRequest.objects, 'filter', side_effect=DatabaseError("down")), \
+                self.assertLogs('visions.counters', 'ERROR'):
+            counter.increment(self.request.pk, 3)
+        self.assertEqual(counter.pending(self.request.pk), 3)
+        counter.increment(self.request.pk)
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.views, 4)
+
+    def test_unique_viewers_survive_concurrent_flushes(self):
+        tracker = popularity.UniqueViewerTracker(flush_interval=3600)
+
+        def view(worker):
+            for i in range(2000):
+                tracker.add(i % 50, f"{worker}-{i}")
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            views = [pool.submit(view, worker) for worker in range(4)]
+            while not all(f.done() for f in views):
+                tracker.flush()
+        for f in views:
+            f.result()
+        tracker.flush()
+        self.assertAlmostEqual(tracker.estimate(0), 160, delta=16)
+
+
+class LikePipelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        likes.like_counter.flush()
+        owner, self.developer = make_user("owner"), make_user("dev")
+        request = AnimationRequest.objects.create(
+            title="Req", description="d", category="c", difficulty='Easy', created_by=owner,
+        )
+        self.contribution = Contribution.objects.create(
+            animation_request=request, developer=self.developer, animation_link="https://example.com", description="d",
+        )
+        self.url = reverse('contributions-like', args=[self.contribution.pk])
+
+    def test_like_is_idempotent_and_flushed_in_batches(self):
+        fans = [make_user(f"fan-{i}") for i in range(3)]
+        client = APIClient()
+        for fan in fans:
+            client.force_authenticate(fan)
+            self.assertTrue(client.post(self.url).json()['changed'])
+            self.assertFalse(client.post(self.url).json()['changed'])
+        response = client.delete(self.url)
+        self.assertEqual(response.json(), {'liked': False, 'changed': True, 'likes': 2})
+        self.assertFalse(client.delete(self.url).json()['changed'])
+
+        self.contribution.refresh_from_db()
+        self.assertEqual(self.contribution.likes, 0)
+        likes.like_counter.flush()
+        self.contribution.refresh_from_db()
+        self.assertEqual(self.contribution.likes, 2)
+        self.assertEqual(leaderboard.rank_of(self.developer)[1].total_likes, 2)
+
+    def test_reconcile_recomputes_drifted_counters(self):
+        Engagement.objects.create(user=make_user("fan"), contribution=self.contribution, liked=True)
+        Contribution.objects.filter(pk=self.contribution.pk).update(likes=40)
+        self.assertEqual(likes.reconcile_likes(chunk_size=1), 1)
+        self.contribution.refresh_from_db()
+        self.assertEqual(self.contribution.likes, 1)
+
+
+class FundingTests(TestCase):
+    def setUp(self):
+        self.project = make_project(make_user("owner"), "Project")
+        self.url = reverse('os-request-contribute', args=[self.project.pk])
+
+    def test_conditional_increment_caps_at_goal(self):
+        self.assertTrue(funding.add_funding(self.project.pk, Decimal('600.00')))
+        self.assertFalse(funding.add_funding(self.project.pk, Decimal('400.01')))
+        self.assertTrue(funding.add_funding(self.project.pk, Decimal('400.00')))
+        self.assertFalse(funding.add_funding(self.project.pk, Decimal('0.01')))
+        self.assertEqual(funding.remaining(self.project.pk), (Decimal('1000.00'), Decimal('1000.00'), Decimal('0.00')))
+
+    def test_view_rejects_what_a_stale_read_would_accept(self):
+        client = APIClient()
+        client.force_authenticate(make_user("backer"))
+        self.assertEqual(client.post(self.url, {'amount': '700.00', 'payment_id': 'pay_1'}).status_code, 201)
+        # Another worker's contribution lands between this request's read and its write
+        stale = OpenSourceVisionRequest.objects.get(pk=self.project.pk)
+        stale.current_funding = Decimal('0.00')
+        with mock.patch('visions.views.ContributionCreateView.get_project', return_value=stale):
+            response = client.post(self.url, {'amount': '400.00', 'payment_id': 'pay_2'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("₹300.00", response.json()['amount'])
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.current_funding, Decimal('700.00'))
+        self.assertEqual(OpenSourceContribution.objects.count(), 1)
+
+
+class ContributionExportTests(TestCase):
+    def setUp(self):
+        project = make_project(make_user("owner"), "Rig, \"v2\"")
+        backer = make_user("backer")
+        for n, day in enumerate(('2025-01-31', '2025-02-01', '2025-02-28')):
+            contribution = OpenSourceContribution.objects.create(
+                contributor=backer, request=project, amount=Decimal('10.50'), razorpay_payment_id=f'pay_{n}',
+            )
+            OpenSourceContribution.objects.filter(pk=contribution.pk).update(timestamp=f'{day}T12:00:00Z')
+        self.client = APIClient()
+        admin = make_user("admin")
+        admin.is_staff = True
+        self.client.force_authenticate(admin)
+        self.url = reverse('os-contribution-export')
+
+    def test_date_range_ndjson(self):
+        response = self.client.get(self.url, {'type': 'ndjson', 'since': '2025-02-01', 'until': '2025-03-01'})
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['razorpay_payment_id'] for row in rows], ['pay_1', 'pay_2'])
+        self.assertEqual((rows[0]['project_title'], rows[0]['amount'], rows[0]['contributor']),
+                         ('Rig, "v2"', '10.50', 'backer'))
+
+    def test_csv_quotes_and_admin_only(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="contributions.csv"')
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:3], ['id', 'project_id', 'project_title'])
+        self.assertEqual([(row[2], row[6]) for row in rows[1:]], [('Rig, "v2"', f'pay_{n}') for n in range(3)])
+        self.client.force_authenticate(make_user("someone"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class ContributionCommentTests(TestCase):
+    def setUp(self):
+        owner, self.developer = make_user("owner"), make_user("dev")
+        request = AnimationRequest.objects.create(
+            title="Req", description="d", category="c", difficulty='Easy', created_by=owner,
+        )
+        self.contribution = Contribution.objects.create(
+            animation_request=request, developer=self.developer, animation_link="https://example.com", description="d",
+        )
+        self.url = reverse('contribution-comments', args=[self.contribution.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(owner)
+
+    def test_comments_are_paginated_and_counted(self):
+        for n in range(3):
+            self.assertEqual(self.client.post(self.url, {'body': f"comment {n}"}).status_code, 201)
+        self.contribution.refresh_from_db()
+        self.assertEqual(self.contribution.comment_count, 3)
+
+        first = self.client.get(self.url, {'page_size': 2}).json()
+        self.assertEqual([c['body'] for c in first['results']], ["comment 2", "comment 1"])
+        rest = self.client.get(first['next']).json()
+        self.assertEqual([c['body'] for c in rest['results']], ["comment 0"])
+
+        listed = self.client.get(reverse('contributions-detail', args=[self.contribution.pk])).json()
+        self.assertEqual(listed['comment_count'], 3)
+        self.assertNotIn('comments', listed)
+
+    def test_backfill_parses_legacy_json_shapes(self):
+        from importlib import import_module
+        backfill = import_module('visions.migrations.0013_backfill_contribution_comments')
+        fallback = self.contribution.submitted_at
+        ids, names = {self.developer.pk}, {'dev': self.developer.pk}
+
+        self.assertEqual(backfill._parse("plain", fallback, ids, names)['body'], "plain")
+        parsed = backfill._parse(
+            {'user': 'dev', 'text': 'hi', 'timestamp': '2024-01-02T03:04:05'}, fallback, ids, names
+        )
+        self.assertEqual(parsed['author_id'], self.developer.pk)
+        self.assertEqual(parsed['created_at'].year, 2024)
+        self.assertIsNone(backfill._parse({'user_id': 999, 'comment': 'x'}, fallback, ids, names)['author_id'])
+        self.assertIsNone(backfill._parse({'likes': 1}, fallback, ids, names))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.owner = make_user("owner")
+        self.hidden = make_project(self.owner, "Hidden dragon flight")
+        OpenSourceVisionRequest.objects.filter(pk=self.hidden.pk).update(visibility=False)
+        self.project = make_project(self.owner, "Dragon flight cycle")
+        self.project.tags = ["wings", "loop"]
+        self.project.save()
+        self.animation = AnimationRequest.objects.create(
+            title="Walk cycle", description="A dragon walking", category="2D", difficulty='Easy',
+            created_by=self.owner, tags=["dragon"],
+        )
+        self.url = reverse('search')
+
+    def test_ranked_results_follow_triggers(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        results = client.get(self.url, {'q': 'dragon'}).json()['results']
+        # The title match outranks the description match; the hidden project never shows up
+        self.assertEqual([(r['type'], r['id']) for r in results], [
+            ('opensource', self.project.pk), ('animation', self.animation.pk),
+        ])
+        self.assertEqual(client.get(self.url, {'q': 'wing'}).json()['results'][0]['id'], self.project.pk)
+
+        self.project.title = "Phoenix flight"
+        self.project.save()
+        self.project.refresh_from_db()
+        results = client.get(self.url, {'q': 'dragon'}).json()['results']
+        self.assertEqual([r['type'] for r in results], ['animation'])
+        self.animation.delete()
+        self.assertEqual(client.get(self.url, {'q': 'dragon'}).json()['results'], [])
+
+    def test_cursor_pages_and_anonymous_scope(self):
+        for n in range(3):
+            make_project(self.owner, f"Dragon sequel {n}")
+        first = APIClient().get(self.url, {'q': 'dragon', 'page_size': 2}).json()
+        second = APIClient().get(first['next']).json()
+        ids = [r['id'] for r in first['results'] + second['results']]
+        self.assertEqual(len(ids), 4)
+        self.assertEqual(len(set(ids)), 4)
+        self.assertIsNone(second['next'])
+        self.assertTrue(all(r['type'] == 'opensource' for r in first['results'] + second['results']))
+
+    def test_bad_page_sizes_fall_back_to_the_default(self):
+        for page_size in ('-3', '0', 'many'):
+            response = APIClient().get(self.url, {'q': 'dragon', 'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), 1)
+
+
+
+class TagIndexTests(TestCase):
+    def setUp(self):
+        self.owner = make_user("owner")
+        self.projects = []
+        for title, project_tags, category in [
+            ("One", ["Blender", "rigging"], '3D'), ("Two", ["blender "], '3D'), ("Three", ["rigging"], '2D'),
+        ]:
+            project = make_project(self.owner, title)
+            project.tags, project.category = project_tags, category
+            project.save()
+            self.projects.append(project)
+
+    def test_index_follows_json_tags(self):
+        one = self.projects[0]
+        self.assertEqual(
+            set(OpenSourceVisionRequestTag.objects.filter(request=one).values_list('tag__name', flat=True)),
+            {'blender', 'rigging'},
+        )
+        one.tags = ["Rigging", "lighting"]
+        one.save()
+        self.assertEqual(
+            set(OpenSourceVisionRequestTag.objects.filter(request=one).values_list('tag__name', flat=True)),
+            {'rigging', 'lighting'},
+        )
+
+    def test_any_all_filters_and_facets(self):
+        queryset = OpenSourceVisionRequest.objects.all()
+        one, two, three = self.projects
+        self.assertEqual(set(tags.filter_by_tags(queryset, ['blender', 'rigging'])), {one, two, three})
+        self.assertEqual(list(tags.filter_by_tags(queryset, ['blender', 'rigging'], match='all')), [one])
+
+        response = APIClient().get(reverse('facets'), {'tags': 'blender'})
+        self.assertEqual(response.json(), {
+            'tags': [{'value': 'blender', 'count': 2}, {'value': 'rigging', 'count': 1}],
+            'category': [{'value': '3D', 'count': 2}],
+            'difficulty': [{'value': 'Intermediate', 'count': 2}],
+        })
+        listed = APIClient().get(reverse('os-request-list-create'), {'tags': 'rigging,blender', 'match': 'all'}).json()
+        self.assertEqual([p['id'] for p in listed['results']], [one.pk])
+
+    def test_create_serializer_stores_normalized_tags(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.post(reverse('os-request-list-create'), {
+            'title': "New", 'description': "d", 'category': '2D', 'difficulty': 'Advanced',
+            'funding_goal': '10.00', 'tags': '["Motion ", "motion"]',
+        })
+        self.assertEqual(response.status_code, 201)
+        project = OpenSourceVisionRequest.objects.get(title="New")
+        self.assertEqual(project.tags, ['motion'])
+        self.assertEqual(list(project.tag_links.values_list('tag__name', flat=True)), ['motion'])
+
+
+@override_settings(CODE_REVISION_SNAPSHOT_INTERVAL=3)
+class CodeRevisionTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner, self.collaborator = make_user("owner"), make_user("collab")
+        self.project = make_project(self.owner, "Project")
+        self.project.collaborators.add(self.collaborator)
+        self.code = CollaborativeCode.objects.create(project=self.project)
+
+    def test_chain_rebuilds_every_revision(self):
+        body = "\n".join(f"<p>line {n}</p>" for n in range(500))
+        history = []
+        for n in range(7):
+            body = body.replace(f"<p>line {n * 10}</p>", f"<p>edited {n}</p>")
+            contents = {'html': body, 'css': f"p {{ margin: {n}px }}", 'js': "// js"}
+            revisions.append_revision(self.code, contents, author=self.owner)
+            self.code.save()
+            history.append(contents)
+
+        stored = list(CodeRevision.objects.filter(code=self.code).order_by('number'))
+        self.assertEqual([r.is_snapshot for r in stored], [True, False, False, True, False, False, True])
+        # Patches follow the edit, not the document
+        self.assertLess(len(stored[1].html_data), len(body) // 20)
+        self.code.refresh_from_db()
+        for number, contents in enumerate(history, start=1):
+            self.assertEqual(revisions.rebuild(self.code, number), contents)
+
+    def test_approving_a_proposal_appends_a_revision(self):
+        client = APIClient()
+        client.force_authenticate(self.collaborator)
+        response = client.post(reverse('os-request-proposal-list-create', args=[self.project.pk]), {
+            'proposed_html_content': "<h1>Hi</h1>", 'proposed_css_content': "h1 {}", 'proposed_js_content': "//", 'message': "m",
+        })
+        self.assertEqual(response.status_code, 201)
+        proposal = CodeChangeProposal.objects.get(project=self.project)
+
+        client.force_authenticate(self.owner)
+        response = client.post(reverse('os-request-proposal-manage', args=[proposal.pk]), {'action': 'approve'})
+        self.assertEqual(response.status_code, 200)
+        self.code.refresh_from_db()
+        self.assertEqual(self.code.head_revision, 1)
+
+        history = client.get(reverse('os-request-code-revisions', args=[self.project.pk])).json()
+        self.assertEqual([(r['number'], r['proposal']) for r in history], [(1, str(proposal.pk))])
+        detail = client.get(reverse('os-request-code-revision-detail', args=[self.project.pk, 1])).json()
+        self.assertEqual(detail['html_content'], "<h1>Hi</h1>")
+
+
+class PatchProposalTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner, self.collaborator = make_user("owner"), make_user("collab")
+        self.project = make_project(self.owner, "Project")
+        self.project.collaborators.add(self.collaborator)
+        self.code = CollaborativeCode.objects.create(project=self.project)
+        self.lines = [f"<p>line {n}</p>" for n in range(50)]
+        revisions.append_revision(self.code, {'html': "\n".join(self.lines), 'css': "p {}", 'js': "//"})
+        self.code.save()
+        self.url = reverse('os-request-proposal-list-create', args=[self.project.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(self.collaborator)
+
+    def edit(self, line, text):
+        lines = list(self.lines)
+        lines[line] = text
+        return "\n".join(lines)
+
+    def merge(self, html):
+        revisions.append_revision(self.code, {'html': html, 'css': "p {}", 'js': "//"})
+        self.code.save()
+        self.lines = html.split("\n")
+
+    def test_patch_against_head(self):
+        patch = revisions.make_patch(self.code.main_html_content, self.edit(3, "<p>three</p>"))
+        response = self.client.post(self.url, {'base_revision': 1, 'patches': {'html': patch}, 'message': "fix"}, format='json')
+        self.assertEqual(response.status_code, 201)
+        proposal = CodeChangeProposal.objects.get()
+        self.assertEqual(proposal.proposed_html_content, self.edit(3, "<p>three</p>"))
+        self.assertEqual((proposal.proposed_css_content, proposal.base_revision), ("p {}", 1))
+
+        bad = self.client.post(self.url, {'base_revision': 1, 'patches': {'html': "@@ nonsense"}}, format='json')
+        self.assertEqual(bad.status_code, 400)
+
+    def test_stale_base_merges_or_conflicts(self):
+        base = self.code.main_html_content
+        self.merge(self.edit(40, "<p>forty</p>"))
+
+        clean = revisions.make_patch(base, base.replace("<p>line 3</p>", "<p>three</p>"))
+        response = self.client.post(self.url, {'base_revision': 1, 'patches': {'html': clean}}, format='json')
+        self.assertEqual(response.status_code, 201)
+        merged = CodeChangeProposal.objects.get().proposed_html_content
+        self.assertIn("<p>three</p>", merged)
+        self.assertIn("<p>forty</p>", merged)
+        self.assertEqual(response.json()['base_revision'], 2)
+
+        clash = revisions.make_patch(base, base.replace("<p>line 40</p>", "<p>40!</p>"))
+        response = self.client.post(self.url, {'base_revision': 1, 'patches': {'html': clash}}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['conflicts'], ['html'])
+
+    def test_approval_rebases_onto_newer_head(self):
+        patch = revisions.make_patch(self.code.main_html_content, self.edit(3, "<p>three</p>"))
+        self.client.post(self.url, {'base_revision': 1, 'patches': {'html': patch}}, format='json')
+        proposal = CodeChangeProposal.objects.get()
+        self.merge(self.edit(40, "<p>forty</p>"))
+
+        self.client.force_authenticate(self.owner)
+        response = self.client.post(reverse('os-request-proposal-manage', args=[proposal.pk]), {'action': 'approve'})
+        self.assertEqual(response.status_code, 200)
+        self.code.refresh_from_db()
+        self.assertEqual(self.code.head_revision, 3)
+        self.assertIn("<p>three</p>", self.code.main_html_content)
+        self.assertIn("<p>forty</p>", self.code.main_html_content)
+
+
+    def test_listing_shows_stored_stats_and_diff_is_cached(self):
+        html = self.edit(3, "<p>three</p>") + "\n<p>new</p>"
+        self.client.post(self.url, {'base_revision': 1, 'patches': {'html': revisions.make_patch(self.code.main_html_content, html)}}, format='json')
+        proposal = CodeChangeProposal.objects.get()
+        # The old last line gains a newline, so it counts as changed too, as in git
+        self.assertEqual(proposal.diff_stats['html'], {'added': 3, 'removed': 2})
+        self.assertEqual(proposal.diff_stats['css'], {'added': 0, 'removed': 0})
+
+        self.client.force_authenticate(self.owner)
+        with CaptureQueriesContext(connection) as queries:
+            listing = self.client.get(self.url)
+        self.assertEqual(listing.json()[0]['diff_stats'], proposal.diff_stats)
+        self.assertFalse(any('visions_codeblob' in q['sql'] for q in queries.captured_queries))
+
+        cache.clear()
+        url = reverse('os-request-proposal-diff', args=[proposal.pk])
+        diff = self.client.get(url).json()
+        self.assertIn("-<p>line 3</p>\n+<p>three</p>\n", diff['files']['html'])
+        self.assertEqual(diff['files']['css'], '')
+        with mock.patch.object(revisions, 'unified_diff', side_effect=AssertionError("re-rendered")):
+            self.assertEqual(self.client.get(url).json(), diff)
+
+
+
+class CodePreviewTests(TemporaryMediaMixin, TestCase):
+    def test_render_inlines_and_minifies(self):
+        body = previews.render({
+            'html': "<html>\n<head>\n</head>\n<body>\n  <!-- note -->\n  <pre>  keep\n me</pre>\n</body>\n</html>",
+            'css': "/* c */\nh1 {\n  color: red;\n}\n",
+            'js': "console.log('</script>');",
+        }).decode()
+        self.assertEqual(body, (
+            "<!DOCTYPE html><html> <head> <style>h1{color: red}</style></head> <body> "
+            "<pre>  keep\n me</pre> <script>console.log('<\\/script>');</script></body> </html>"
+        ))
+        self.assertEqual(
+            previews.minify_html("<pre><b>x</b>\n    <i>y</i></pre>\n  <p>z</p>"), "<pre><b>x</b>\n    <i>y</i></pre> <p>z</p>",
+        )
+
+    def test_render_escapes_script_end_tags_in_any_case(self):
+        body = previews.render({'html': "", 'css': "", 'js': "x = '</SCRIPT><img src=x>' + '</Script >';"}).decode()
+        self.assertEqual(body, "<!DOCTYPE html><script>x = '<\\/SCRIPT><img src=x>' + '<\\/Script >';</script>")
+
+    def test_merge_publishes_an_immutable_bundle(self):
+        owner, collaborator = make_user("owner"), make_user("collab")
+        project = make_project(owner, "Project")
+        project.collaborators.add(collaborator)
+        proposal = CodeChangeProposal.objects.create(
+            project=project, proposer=collaborator,
+            proposed_html_content="<body><h1>Hi</h1></body>", proposed_css_content="h1 {}", proposed_js_content="",
+        )
+        client = APIClient()
+        client.force_authenticate(owner)
+        client.post(reverse('os-request-proposal-manage', args=[proposal.pk]), {'action': 'approve'})
+        code = CollaborativeCode.objects.get(project=project)
+        self.assertEqual(len(code.preview_digest), 64)
+
+        preview_url = client.get(reverse('os-request-code-detail', args=[project.pk])).json()['preview_url']
+        self.assertTrue(preview_url.endswith(reverse('code-preview', args=[code.preview_digest])))
+        response = Client().get(previews.url(code.preview_digest), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertIn(b"<h1>Hi</h1>", gzip.decompress(response.content))
+        self.assertEqual(Client().get(reverse('code-preview', args=['0' * 64])).status_code, 404)
+
+
+class CollaborativeCodeConditionalGetTests(TestCase):
+    def setUp(self):
+        self.owner = make_user("owner")
+        self.project = make_project(self.owner, "Project")
+        self.url = reverse('os-request-code-detail', args=[self.project.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_default_template_is_virtual_until_first_merge(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Welcome", response.json()['main_html_content'])
+        self.assertEqual(response.json()['head_revision'], 0)
+        self.assertFalse(CollaborativeCode.objects.exists())
+
+    def test_if_none_match_returns_304_until_a_merge(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any('visions_codeblob' in q['sql'] for q in queries.captured_queries))
+
+        code = CollaborativeCode.objects.create(project=self.project)
+        revisions.append_revision(code, {'html': "<p>new</p>", 'css': "", 'js': ""})
+        code.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['main_html_content'], "<p>new</p>")
+
+
+class CodeBlobTests(TestCase):
+    def setUp(self):
+        self.owner = make_user("owner")
+        self.project = make_project(self.owner, "Project")
+
+    def test_identical_bodies_are_stored_once(self):
+        body = "<div>shared</div>\n" * 100
+        code = CollaborativeCode.objects.create(project=self.project, main_html_content=body)
+        proposal = CodeChangeProposal.objects.create(
+            project=self.project, proposer=self.owner,
+            proposed_html_content=body, proposed_css_content="/* Approved CSS styles */", proposed_js_content="",
+        )
+        self.assertEqual(code.main_html_blob_id, proposal.proposed_html_blob_id)
+        # The untouched CSS default and the proposal's copy of it share a blob as well
+        code.main_css_content = "/* Approved CSS styles */"
+        code.save(update_fields=['main_css_content'])
+        self.assertEqual(code.main_css_blob_id, proposal.proposed_css_blob_id)
+        self.assertEqual(CodeBlob.objects.count(), 3)
+
+        blob = CodeBlob.objects.get(pk=code.main_html_blob_id)
+        self.assertEqual(blob.encoding, 'zlib')
+        self.assertLess(len(bytes(blob.data)), blob.size)
+        self.assertEqual(CollaborativeCode.objects.get(pk=code.pk).main_html_content, body)
+
+    def test_small_bodies_stay_raw_and_unset_content_reads_as_default(self):
+        code = CollaborativeCode.objects.create(project=self.project)
+        self.assertIsNone(code.main_js_blob_id)
+        self.assertEqual(code.main_js_content, "// Approved JavaScript code")
+        code.main_js_content = "let x = 1;"
+        code.save()
+        blob = CodeBlob.objects.get(pk=code.main_js_blob_id)
+        self.assertEqual((blob.encoding, blob.text), ('raw', "let x = 1;"))
+
+
+class ProjectEventStreamTests(TestCase):
+    def setUp(self):
+        self.owner, self.outsider = make_user("owner"), make_user("outsider")
+        self.project = make_project(self.owner, "Project")
+        self.url = reverse('os-request-events', args=[self.project.pk])
+        self.broker = events.EventBroker(events.LocalBackend())
+        patcher = mock.patch.object(events, '_broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def read_event(self, stream):
+        while True:
+            chunk = await asyncio.wait_for(anext(stream), timeout=2)
+            chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if chunk.startswith('id:'):
+                return chunk
+
+    async def drain(self, stream):
+        return [chunk async for chunk in stream]
+
+    async def test_members_get_every_event_and_others_only_public_ones(self):
+        token = await Token.objects.acreate(user=self.owner)
+        member = await self.async_client.get(self.url, {'token': token.key})
+        public = await self.async_client.get(self.url)
+        self.assertEqual(member['Content-Type'], 'text/event-stream')
+        member_stream, public_stream = member.streaming_content, public.streaming_content
+        await asyncio.wait_for(anext(member_stream), timeout=2)  # retry: line, subscribes the stream
+        await asyncio.wait_for(anext(public_stream), timeout=2)
+
+        self.broker.publish(self.project.pk, 'proposal.created', {'id': 'p1'})
+        self.broker.publish(self.project.pk, 'funding.updated', {'current_funding': '10.00'})
+        self.assertIn("event: proposal.created", await self.read_event(member_stream))
+        self.assertIn("event: funding.updated", await self.read_event(member_stream))
+        self.assertIn("event: funding.updated", await self.read_event(public_stream))
+        await member_stream.aclose()
+        await public_stream.aclose()
+
+    @override_settings(PROJECT_EVENTS_MAX_STREAM_SECONDS=0.05)
+    async def test_streams_end_after_their_lifetime(self):
+        response = await self.async_client.get(self.url)
+        stream = response.streaming_content
+        # A keepalive at most, then the stream ends
+        chunks = await asyncio.wait_for(self.drain(stream), timeout=2)
+        self.assertLessEqual(len(chunks), 2)
+
+    async def test_private_project_needs_membership(self):
+        await OpenSourceVisionRequest.objects.filter(pk=self.project.pk).aupdate(visibility=False)
+        await self.async_client.aforce_login(self.outsider)
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_events_are_published_on_commit(self):
+        delivered = []
+        self.broker.deliver = delivered.append
+        self.broker.backend.attach(self.broker.deliver)
+        requester = make_user("requester")
+        client = APIClient()
+        client.force_authenticate(requester)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(reverse('os-request-collaboration', args=[self.project.pk]))
+            self.assertEqual(delivered, [])
+        self.assertEqual([(e['type'], e['data']['requester']) for e in delivered], [('collaboration.requested', 'requester')])
+
+@skipUnless(os.environ.get('VISORA_BENCHMARKS'), "Set VISORA_BENCHMARKS=1 to run benchmarks")
+class SearchBenchmark(TestCase):
+    """ Query latency over a seeded corpus (VISORA_BENCHMARK_ROWS, 1M by default). """
+
+    def test_query_latency(self):
+        rows = int(os.environ.get('VISORA_BENCHMARK_ROWS', 1_000_000))
+        rng = random.Random(7)
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+        words = sorted({''.join(rng.choices(letters, k=rng.randint(4, 9))) for _ in range(30_000)})
+        rng.shuffle(words)
+        # Zipf-like: a few very common words, a long tail of rare ones
+        weights = list(itertools.accumulate(1 / (rank + 10) for rank in range(len(words))))
+        backend = search.get_backend()
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA cache_size = -200000")
+            for start in range(0, rows, 50_000):
+                cursor.executemany(
+                    f"INSERT INTO {search.INDEX_TABLE}(rowid, title, description, category, tags, visible) "
+                    "VALUES (%s, %s, %s, %s, %s, 1)",
+                    [
+                        (doc_id, ' '.join(rng.choices(words, cum_weights=weights, k=5)), ' '.join(rng.choices(words, cum_weights=weights, k=40)),
+                         rng.choice(['2D', '3D', 'Other']), ' '.join(rng.choices(words, cum_weights=weights, k=3)))
+                        for doc_id in range(start * 2, min(start + 50_000, rows) * 2, 2)
+                    ],
+                )
+            cursor.execute(f"INSERT INTO {search.INDEX_TABLE}({search.INDEX_TABLE}) VALUES ('optimize')")
+
+            timings = []
+            for _ in range(200):
+                tokens = rng.sample(words[:5000], rng.choice([1, 2]))
+                began = time.perf_counter()
+                hits = backend.search(cursor, tokens, limit=21)
+                if len(hits) == 21:
+                    backend.search(cursor, tokens, after=(hits[-1].score, hits[-1].doc_id), limit=21)
+                timings.append((time.perf_counter() - began) * 1000)
+
+        timings.sort()
+        p50, p95 = statistics.median(timings), timings[int(len(timings) * 0.95)]
+        print(f"\nsearch over {rows} rows: p50 {p50:.1f} ms, p95 {p95:.1f} ms (first page + next page)")
+        # Terms in a large share of the corpus have to score every match, hence the looser tail bound
+        self.assertLess(p50, 50)
+        self.assertLess(p95, 250)
+
+
+@skipUnless(os.environ.get('VISORA_BENCHMARKS'), "Set VISORA_BENCHMARKS=1 to run benchmarks")
+class FundingConcurrencyBenchmark(TransactionTestCase):
+    """ Hundreds of contributions racing for one project's remaining goal. """
+
+    def test_parallel_contributions(self):
+        contributions = int(os.environ.get('VISORA_BENCHMARK_CONTRIBUTIONS', 400))
+        project = make_project(make_user("owner"), "Project")
+        backers = [make_user(f"backer{n}") for n in range(contributions)]
+        OpenSourceVisionRequest.objects.filter(pk=project.pk).update(funding_goal=Decimal(contributions * 10 // 2))
+        url = reverse('os-request-contribute', args=[project.pk])
+
+        def contribute(n):
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(backers[n])
+            try:
+                for attempt in range(50):
+                    response = client.post(url, {'amount': '10.00', 'payment_id': f'pay_{n}'})
+                    if response.status_code != 500:  # SQLite reports writer contention as an error; retry
+                        return response.status_code
+                    time.sleep(0.01 * (attempt + 1))
+                return 500
+            finally:
+                connection.close()
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            codes = list(pool.map(contribute, range(contributions)))
+        elapsed = time.perf_counter() - began
+
+        project.refresh_from_db()
+        accepted = codes.count(201)
+        print(f"\n{contributions} parallel contributions: {contributions / elapsed:.0f}/s, "
+              f"{accepted} accepted, {codes.count(400)} rejected at the goal")
+        self.assertEqual(codes.count(500), 0)
+        # SQLite serializes every writer (and retries here); a server database does far better
+        self.assertGreater(contributions / elapsed, 10)
+        self.assertEqual(accepted, contributions // 2)
+        self.assertEqual(project.current_funding, project.funding_goal)
+        self.assertEqual(OpenSourceContribution.objects.count(), accepted)
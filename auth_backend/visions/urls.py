@@ -2,10 +2,16 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     AnimationRequestViewSet, ContributionViewSet, 
-    EngagementViewSet, NotificationViewSet, LeaderboardView,OpenSourceVisionRequestListCreateView,OpenSourceVisionRequestDetailView,ContributionCreateView,manage_collaboration,request_collaboration_view
+    EngagementViewSet, NotificationViewSet, LeaderboardView, ContributionCommentListCreateView, SearchView, FacetView,OpenSourceVisionRequestListCreateView,OpenSourceVisionRequestDetailView,ContributionCreateView,manage_collaboration,request_collaboration_view,
+    ContributionExportView,
 )
 from .views import (
     CollaborativeCodeAPIView, # View main code
+    project_event_stream, # Server-sent project events
+    CodeRevisionListView, # Merge history of the main code
+    CodeRevisionDetailView, # Content of one past revision
+    code_preview, # Precompiled preview of the merged code
+    CodeChangeProposalDiffView, # Rendered diff of a proposal
     CodeChangeProposalListCreateView, # List/Create proposals
     CodeChangeProposalDetailView, # View proposal detail
     ManageCodeChangeProposalView, # Approve/Reject proposal
@@ -18,21 +24,39 @@ router.register('engagements', EngagementViewSet, basename='engagements')
 router.register('notifications', NotificationViewSet, basename='notifications')
 
 urlpatterns = [
+    path('contributions/<int:pk>/comments/', ContributionCommentListCreateView.as_view(), name='contribution-comments'),
     path('', include(router.urls)),
     path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('facets/', FacetView.as_view(), name='facets'),
     path('api/visions/opensource-requests/', OpenSourceVisionRequestListCreateView.as_view(), name='os-request-list-create'),
     path('api/visions/opensource-requests/<int:pk>/', OpenSourceVisionRequestDetailView.as_view(), name='os-request-detail'),
     path('api/visions/opensource-requests/<int:pk>/contribute/', ContributionCreateView.as_view(), name='os-request-contribute'),
+    path('api/visions/contributions/export/', ContributionExportView.as_view(), name='os-contribution-export'),
     # --- URL for OWNER to MANAGE (approve/reject) requests ---
     path('api/visions/opensource-requests/<int:pk>/manage-collaboration/', manage_collaboration, name='os-manage-collaboration'),
 
     # --- CORRECT URL for USER to REQUEST collaboration ---
     path('api/visions/opensource-requests/<int:pk>/request-collaboration/', request_collaboration_view, name='os-request-collaboration'),
     
+    # Server-sent events for the project (proposals, merges, collaboration, funding)
+    path('api/visions/opensource-requests/<int:pk>/events/', project_event_stream, name='os-request-events'),
+
     path('api/visions/opensource-requests/<int:pk>/code/',
          CollaborativeCodeAPIView.as_view(),
          name='os-request-code-detail'),
 
+    path('api/visions/opensource-requests/<int:pk>/code/revisions/',
+         CodeRevisionListView.as_view(),
+         name='os-request-code-revisions'),
+    path('api/visions/opensource-requests/<int:pk>/code/revisions/<int:number>/',
+         CodeRevisionDetailView.as_view(),
+         name='os-request-code-revision-detail'),
+
+    path('api/visions/previews/<str:digest>/',
+         code_preview,
+         name='code-preview'),
+
     # List proposals (owner) or Create a new proposal (collaborator)
     path('api/visions/opensource-requests/<int:pk>/proposals/',
          CodeChangeProposalListCreateView.as_view(),
@@ -43,6 +67,11 @@ urlpatterns = [
          CodeChangeProposalDetailView.as_view(),
          name='os-request-proposal-detail'),
 
+    # Rendered diff of a proposal against its base revision
+    path('api/visions/opensource-requests/proposals/<uuid:proposal_pk>/diff/',
+         CodeChangeProposalDiffView.as_view(),
+         name='os-request-proposal-diff'),
+
     # Approve/Reject a specific proposal (Owner action)
     path('api/visions/opensource-requests/proposals/<uuid:proposal_pk>/manage/', # Use proposal UUID
          ManageCodeChangeProposalView.as_view(),
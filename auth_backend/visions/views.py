@@ -4,10 +4,11 @@ from rest_framework.decorators import action,api_view, permission_classes
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from .models import AnimationRequest, Contribution, Engagement, Notification
+from .models import AnimationRequest, Contribution, ContributionComment, Engagement, Notification
 from .serializers import (
     UserSerializer, AnimationRequestSerializer, ContributionSerializer, 
-    EngagementSerializer, NotificationSerializer, LeaderboardSerializer
+    EngagementSerializer, NotificationSerializer, LeaderboardSerializer,
+    ContributionCommentSerializer, SearchResultSerializer
 )
 from .models import OpenSourceVisionRequest, OpenSourceAttachment,OpenSourceContribution,CollaborationRequest
 from .serializers import (
@@ -17,9 +18,25 @@ from .serializers import (
 User = get_user_model()
 
 import logging
+import re
+import time
 from decimal import Decimal 
-from django.db import transaction 
+from django.db import IntegrityError, transaction 
+from django.db.models import F
+from django.utils.http import parse_etags, quote_etag
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from rest_framework.authtoken.models import Token
+from wallet import ledger
 from wallet.models import UserWallet
+from auth_backend.pagination import CreatedAtPagination, SubmittedAtPagination, clamp_size
+from rest_framework.utils.urls import replace_query_param
+from auth_backend.exports import ExportView
+from auth_backend.response_cache import cache_response, model_tag
+from . import events, funding, likes, popularity, previews, revisions, search, tags
+from .exports import CONTRIBUTIONS
+from .signals import invalidate_project
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +48,13 @@ class AnimationRequestViewSet(viewsets.ModelViewSet):
     queryset = AnimationRequest.objects.all().order_by('-created_at')
     serializer_class = AnimationRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = tags.filter_from_params(queryset, self.request.query_params)
+        return queryset
 
     def perform_create(self, serializer):
         """Assign logged-in user as request creator and return the created object"""
@@ -38,6 +62,14 @@ class AnimationRequestViewSet(viewsets.ModelViewSet):
         print("let see the created animation id ",animation_request.id)
         return Response(animation_request.id)
 
+    def retrieve(self, request, *args, **kwargs):
+        """Count the view in the write-behind buffer and report buffered totals"""
+        instance = self.get_object()
+        popularity.record_view(request, instance)
+        data = self.get_serializer(instance).data
+        data.update(popularity.view_stats(instance))
+        return Response(data)
+
     def destroy(self, request, *args, **kwargs):
         """Allow only request creators or admins to delete"""
         instance = self.get_object()
@@ -50,11 +82,12 @@ class ContributionViewSet(viewsets.ModelViewSet):
     """View to handle developer contributions"""
     serializer_class = ContributionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SubmittedAtPagination
 
     def get_queryset(self):
         """Filter contributions based on animation_request ID"""
         animation_request_id = self.request.query_params.get("request")
-        queryset = Contribution.objects.all().order_by("-submitted_at")
+        queryset = Contribution.objects.select_related("developer").order_by("-submitted_at")
 
         if animation_request_id:
             queryset = queryset.filter(animation_request_id=animation_request_id)
@@ -117,13 +150,13 @@ class ContributionViewSet(viewsets.ModelViewSet):
                 # --- Wallet Update Logic (if applicable) ---
                 if can_pay_budget:
                     try:
-                        # Get the developer's wallet, locking the row for update to prevent race conditions
-                        wallet = UserWallet.objects.select_for_update().get(user=developer)
-
-                        # Add the budget to the withdrawable balance
+                        # Credit the budget through the ledger: one guarded UPDATE plus an entry insert
                         # Convert budget (potentially float) to Decimal for precision
-                        wallet.withdrawable_balance += Decimal(str(budget))
-                        wallet.save()
+                        wallet_id = UserWallet.objects.values_list('pk', flat=True).get(user=developer)
+                        ledger.post(
+                            wallet_id, ledger.Kind.EARNING, Decimal(str(budget)).quantize(Decimal('0.01')),
+                            reference=f"contribution:{contribution.pk}",
+                        )
                         payment_success = True
                         logger.info(f"Successfully added budget {budget} to wallet for user {developer.id} for request {animation_request.id}")
 
@@ -141,7 +174,8 @@ class ContributionViewSet(viewsets.ModelViewSet):
 
                 # --- Update Contribution Status ---
                 contribution.approved = True
-                contribution.save()
+                # Only write the flag: likes are maintained by the buffered like counter
+                contribution.save(update_fields=['approved'])
 
                 # --- Update Animation Request Status (Only if budget was successfully paid) ---
                 if can_pay_budget and payment_success:
@@ -181,15 +215,75 @@ class ContributionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=True, methods=["post", "delete"], permission_classes=[permissions.IsAuthenticated])
+    def like(self, request, pk=None):
+        """
+        POST likes the contribution, DELETE removes the like. Both are idempotent;
+        `changed` tells whether this call did anything.
+        """
+        contribution = self.get_object()
+        if request.method == 'POST':
+            changed = likes.like(request.user, contribution)
+        else:
+            changed = likes.unlike(request.user, contribution)
+        return Response(
+            {"liked": request.method == 'POST', "changed": changed, "likes": likes.like_count(contribution)},
+            status=status.HTTP_200_OK
+        )
+
+class ContributionCommentListCreateView(generics.ListCreateAPIView):
+    """
+    Comments on one contribution, newest first and cursor-paginated.
+    Comments are append-only; posting one bumps Contribution.comment_count in the same transaction.
+    """
+    serializer_class = ContributionCommentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtPagination
+
+    def get_queryset(self):
+        return ContributionComment.objects.filter(contribution_id=self.kwargs['pk']).select_related('author')
+
+    def perform_create(self, serializer):
+        contribution = get_object_or_404(Contribution, pk=self.kwargs['pk'])
+        with transaction.atomic():
+            serializer.save(contribution=contribution, author=self.request.user)
+            Contribution.objects.filter(pk=contribution.pk).update(comment_count=F('comment_count') + 1)
+
 class EngagementViewSet(viewsets.ModelViewSet):
     """View to manage likes and comments"""
     queryset = Engagement.objects.all().order_by('-created_at')
     serializer_class = EngagementSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtPagination
 
     def perform_create(self, serializer):
-        """Set user automatically on engagement"""
-        serializer.save(user=self.request.user)
+        """Set user automatically on engagement; likes go through the like pipeline"""
+        try:
+            with transaction.atomic():
+                engagement = serializer.save(user=self.request.user)
+        except IntegrityError:
+            raise serializers.ValidationError({"detail": "You have already liked this contribution."})
+        if engagement.liked:
+            likes.like_counter.increment(engagement.contribution_id, 1)
+
+    def perform_update(self, serializer):
+        was_liked, old_contribution_id = serializer.instance.liked, serializer.instance.contribution_id
+        try:
+            with transaction.atomic():
+                engagement = serializer.save()
+        except IntegrityError:
+            raise serializers.ValidationError({"detail": "You have already liked this contribution."})
+        if (was_liked, old_contribution_id) != (engagement.liked, engagement.contribution_id):
+            if was_liked:
+                likes.like_counter.increment(old_contribution_id, -1)
+            if engagement.liked:
+                likes.like_counter.increment(engagement.contribution_id, 1)
+
+    def perform_destroy(self, instance):
+        liked, contribution_id = instance.liked, instance.contribution_id
+        instance.delete()
+        if liked:
+            likes.like_counter.increment(contribution_id, -1)
 
 
 
@@ -198,6 +292,7 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Notification.objects.all().order_by('-created_at')
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtPagination
 
     def get_queryset(self):
         """Return notifications for the logged-in user"""
@@ -205,31 +300,134 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 
-from django.db.models import Count, Sum
 from rest_framework.views import APIView
+from . import leaderboard
+from .models import LeaderboardEntry
 
 class LeaderboardView(APIView):
-    """Leaderboard API showing top contributors"""
+    """
+    Leaderboard API showing top contributors, served from the materialized
+    LeaderboardEntry table. `?window=all|weekly|monthly` picks the period,
+    `?user=<id>` returns that user's rank instead of the top list (null, with
+    `outside_top`, below the top leaderboard.RANK_SCAN_LIMIT).
+    """
     permission_classes = [permissions.AllowAny]
+    max_limit = 100
 
+    @cache_response(tags=[model_tag(LeaderboardEntry)])
     def get(self, request):
-        top_devs = (
-            User.objects.annotate(
-                total_likes=Sum('contributions__likes'),
-                total_contributions=Count('contributions')
-            ).order_by('-total_likes', '-total_contributions')[:10]  # Top 10
-        )
-        serializer = LeaderboardSerializer(top_devs, many=True)
+        window = request.query_params.get('window', 'all')
+        if window not in leaderboard.WINDOWS:
+            return Response({"detail": f"Unknown window '{window}'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        user_id = request.query_params.get('user')
+        if user_id:
+            if not user_id.isdecimal() or len(user_id) > 18:  # Anything longer overflows a 64-bit key
+                return Response({"detail": "'user' must be a user id."}, status=status.HTTP_400_BAD_REQUEST)
+            developer = get_object_or_404(User, pk=int(user_id))
+            rank, entry = leaderboard.rank_of(developer, window)
+            row = {
+                'rank': rank,
+                'developer': developer,
+                'total_likes': entry.total_likes if entry else 0,
+                'total_contributions': entry.total_contributions if entry else 0,
+            }
+            if entry is not None and rank is None:
+                row['outside_top'] = leaderboard.RANK_SCAN_LIMIT
+            serializer = LeaderboardSerializer(row)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        limit = clamp_size(request.query_params.get('limit'), 10, self.max_limit)
+        rows = [
+            {
+                'rank': position,
+                'developer': entry.user,
+                'total_likes': entry.total_likes,
+                'total_contributions': entry.total_contributions,
+            }
+            for position, entry in enumerate(leaderboard.top(window, limit), start=1)
+        ]
+        serializer = LeaderboardSerializer(rows, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 
+class SearchView(APIView):
+    """
+    Ranked full-text search over animation and open-source requests.
+    `?q=` is the query, `?type=animation|opensource` narrows it, and `?cursor=`
+    continues from the previous page. Animation requests need a signed-in user.
+    """
+    permission_classes = [permissions.AllowAny]
+    page_size = 20
+    max_page_size = 100
+
+    def get(self, request):
+        kind = request.query_params.get('type')
+        if kind is not None and kind not in search.KINDS:
+            return Response({"detail": f"Unknown type '{kind}'."}, status=status.HTTP_400_BAD_REQUEST)
+        if kind is None and not request.user.is_authenticated:
+            kind = 'opensource'
+        elif kind == 'animation' and not request.user.is_authenticated:
+            return Response({"detail": "Sign in to search animation requests."}, status=status.HTTP_401_UNAUTHORIZED)
+
+        after = None
+        if request.query_params.get('cursor'):
+            after = search.decode_cursor(request.query_params['cursor'])
+            if after is None:
+                return Response({"detail": "Invalid cursor"}, status=status.HTTP_404_NOT_FOUND)
+        page_size = clamp_size(request.query_params.get('page_size'), self.page_size, self.max_page_size)
+
+        hits = search.search(request.query_params.get('q', ''), kind=kind, after=after, limit=page_size + 1)
+        next_url = None
+        if len(hits) > page_size:
+            hits = hits[:page_size]
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', search.encode_cursor(hits[-1]))
+
+        results = [
+            {'type': hit.kind, 'id': obj.pk, 'title': obj.title, 'description': obj.description,
+             'category': obj.category, 'tags': obj.tags, 'created_at': obj.created_at}
+            for hit, obj in search.hydrate(hits)
+        ]
+        return Response({'next': next_url, 'previous': None, 'results': SearchResultSerializer(results, many=True).data})
+
+
+class FacetView(APIView):
+    """
+    Tag, category and difficulty counts for the requests matching the current
+    listing filters. `?type=animation` counts animation requests (signed-in
+    users only); the default is visible open-source requests.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    @cache_response(tags=[model_tag(OpenSourceVisionRequest)])
+    def get(self, request):
+        kind = request.query_params.get('type', 'opensource')
+        if kind == 'animation':
+            if not request.user.is_authenticated:
+                return Response({"detail": "Sign in to browse animation requests."}, status=status.HTTP_401_UNAUTHORIZED)
+            queryset = AnimationRequest.objects.all()
+        elif kind == 'opensource':
+            queryset = OpenSourceVisionRequest.objects.filter(visibility=True)
+        else:
+            return Response({"detail": f"Unknown type '{kind}'."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(tags.facets(tags.filter_from_params(queryset, request.query_params)))
+
+
 class OpenSourceVisionRequestListCreateView(generics.ListCreateAPIView):
     """
     List all Open Source Vision Requests (GET) or create a new one (POST).
     """
-    queryset = OpenSourceVisionRequest.objects.filter(visibility=True).order_by('-created_at')
     permission_classes = [permissions.IsAuthenticatedOrReadOnly] # Allow anyone to list, only auth users to create
+    pagination_class = CreatedAtPagination
+
+    @cache_response(tags=[model_tag(OpenSourceVisionRequest)])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = OpenSourceVisionRequest.objects.filter(visibility=True)
+        return tags.filter_from_params(queryset, self.request.query_params).for_listing().order_by('-created_at')
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -245,10 +443,16 @@ class OpenSourceVisionRequestListCreateView(generics.ListCreateAPIView):
 
 # Optional: View for retrieving/updating/deleting a specific request
 class OpenSourceVisionRequestDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = OpenSourceVisionRequest.objects.all()
     serializer_class = OpenSourceVisionRequestSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly] # Basic permissions example
 
+    def get_queryset(self):
+        return OpenSourceVisionRequest.objects.for_listing()
+
+    @cache_response(tags=lambda request, *args, **kwargs: [model_tag(OpenSourceVisionRequest, kwargs['pk'])])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     # Example permission: Allow only creator to update/delete
     # def get_permissions(self):
     #     if self.request.method in ['PUT', 'PATCH', 'DELETE']:
@@ -270,6 +474,10 @@ import logging
 logger = logging.getLogger(__name__) # Setup logging in your settings.py
 from django.utils import timezone
 
+class FundingRejected(Exception):
+    """ The conditional funding update found the contribution would exceed the goal. """
+
+
 # --- View to handle creating a contribution ---
 class ContributionCreateView(APIView):
     """
@@ -332,19 +540,29 @@ class ContributionCreateView(APIView):
             contributor_log_name = contributor_user.username if contributor_user else "Anonymous"
 
             with transaction.atomic():
+                # The goal check that counts: concurrent contributions can't overshoot or lose updates
+                if not funding.add_funding(pk, amount_contributed):
+                    raise FundingRejected()
                 contribution = OpenSourceContribution.objects.create(
                     contributor=contributor_user, # Can be None
                     request=vision_request,
                     amount=amount_contributed, # Use the validated Decimal amount
                     razorpay_payment_id=payment_id
                 )
-
-                opersourcevis=OpenSourceVisionRequest.objects.filter(pk=pk).first()
-                opersourcevis.current_funding = opersourcevis.current_funding + amount_contributed
-                opersourcevis.save()
+                current, goal, _ = funding.remaining(pk)
+                # The update bypassed save(), so drop the cached project pages here
+                invalidate_project(pk)
+                events.publish(pk, 'funding.updated', {'current_funding': current, 'funding_goal': goal})
 
                 logger.info(f"Contribution {contribution.id} created for request {pk} by user '{contributor_log_name}'. Payment ID: {payment_id}, Amount: {amount_contributed}")
 
+        except FundingRejected:
+            _, _, needed = funding.remaining(pk)
+            logger.warning(f"Contribution amount {amount_contributed} exceeds needed {needed} for request {pk}")
+            return Response(
+                {"amount": f"Contribution amount (₹{amount_contributed:.2f}) cannot exceed the amount still needed (₹{needed:.2f})."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             logger.exception(f"Database error during contribution save/update for request {pk}, payment {payment_id}: {e}")
             return Response(
@@ -360,6 +578,12 @@ class ContributionCreateView(APIView):
             status=status.HTTP_201_CREATED
         )
 
+
+class ContributionExportView(ExportView):
+    """ All open-source contributions as CSV or NDJSON for accounting (admins only), streamed. """
+    dataset = CONTRIBUTIONS
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 @csrf_exempt 
@@ -396,12 +620,14 @@ def manage_collaboration(request, pk=None):
                 collab_request.responded_at = timezone.now()
                 collab_request.save(update_fields=['status', 'responded_at'])
                 project.collaborators.add(requester_user)
+                events.publish(project.pk, 'collaboration.approved', {'request_id': collab_request.pk, 'requester': requester_user.username})
             elif action_type == 'reject':
                 collab_request.status = 'rejected'
                 collab_request.responded_at = timezone.now()
                 collab_request.save(update_fields=['status', 'responded_at'])
                 # Optionally remove collaborator if they were somehow added before rejection
                 project.collaborators.remove(requester_user)
+                events.publish(project.pk, 'collaboration.rejected', {'request_id': collab_request.pk, 'requester': requester_user.username})
 
         return Response({'detail': f'Request {action_type}d successfully.'}, status=status.HTTP_200_OK)
 
@@ -411,7 +637,6 @@ def manage_collaboration(request, pk=None):
 
 
    
-from django.db import IntegrityError, transaction
 from rest_framework.permissions import IsAuthenticated
 
 @api_view(['POST'])
@@ -449,6 +674,7 @@ def request_collaboration_view(request, pk=None):
                 requester=user,
                 status='pending' # Default status
             )
+            events.publish(project.pk, 'collaboration.requested', {'request_id': collab_request.pk, 'requester': user.username})
         logger.info(f"Collaboration request created: User '{user.username}' for project '{project.title}' (ID: {project.id})")
         # You can serialize the created request if needed in the response
         return Response({'detail': 'Collaboration request submitted successfully.', 'request_id': collab_request.id}, status=status.HTTP_201_CREATED)
@@ -472,9 +698,11 @@ def list_collaboration_requests(self, request, pk=None):
 
 
 
-from .models import OpenSourceVisionRequest, CollaborativeCode, CodeChangeProposal
+from .models import OpenSourceVisionRequest, CollaborativeCode, CodeChangeProposal, CodeRevision
 from .serializers import (
     CollaborativeCodeSerializer,
+    CodeRevisionSerializer,
+    CodeRevisionDetailSerializer,
     CodeChangeProposalListSerializer,
     CodeChangeProposalCreateSerializer,
     CodeChangeProposalDetailSerializer,
@@ -484,21 +712,181 @@ from visions.permissions import IsProjectCollaboratorOrOwner, IsProposalOwner, I
 
 
 class CollaborativeCodeAPIView(generics.RetrieveAPIView): # Use RetrieveAPIView for GET
+    """
+    The project's merged code, with a strong ETag on the head revision.
+    Pollers sending If-None-Match get a 304 decided from two small columns,
+    and a project nobody has merged into yet is served the default template
+    without creating its row.
+    """
     serializer_class = CollaborativeCodeSerializer
     permission_classes = [IsAuthenticated, IsProjectCollaboratorOrOwner]
     lookup_url_kwarg = 'pk' # Project PK from URL
 
-    def get_object(self):
-        """ Gets the CollaborativeCode instance for the project, creating if needed. """
-        project_pk = self.kwargs.get(self.lookup_url_kwarg)
-        project = get_object_or_404(OpenSourceVisionRequest, pk=project_pk)
+    def get_project(self):
+        project = get_object_or_404(OpenSourceVisionRequest, pk=self.kwargs.get(self.lookup_url_kwarg))
         # Check permissions against the project itself first
         self.check_object_permissions(self.request, project)
-        # Get or create the code instance
-        code_instance, created = CollaborativeCode.objects.get_or_create(project=project)
-        if created:
-            logger.info(f"Created CollaborativeCode for project {project_pk}")
-        return code_instance
+        return project
+
+    @staticmethod
+    def make_etag(project_pk, head_revision, last_approved_at):
+        approved = int(last_approved_at.timestamp() * 1_000_000) if last_approved_at else 0
+        return quote_etag(f"code-{project_pk}-r{head_revision}-{approved}")
+
+    def get_object(self):
+        """ The stored code, or an unsaved default instance until the first merge. """
+        project = self.get_project()
+        return self.load_code(project)
+
+    @staticmethod
+    def load_code(project):
+        code = (
+            CollaborativeCode.objects.select_related('last_approved_by', *CollaborativeCode.CONTENT_BLOBS.values())
+            .filter(project=project).first()
+        )
+        return code or CollaborativeCode(id=None, project=project, last_approved_at=None)
+
+    def retrieve(self, request, *args, **kwargs):
+        project = self.get_project()
+        version = CollaborativeCode.objects.filter(project=project).values('head_revision', 'last_approved_at').first()
+        etag = self.make_etag(project.pk, **(version or {'head_revision': 0, 'last_approved_at': None}))
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            code = self.load_code(project)
+            etag = self.make_etag(project.pk, code.head_revision, code.last_approved_at)
+            response = Response(self.get_serializer(code).data)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+async def _stream_user(request):
+    """ Session user, or the DRF token from the Authorization header or ?token= (EventSource can't set headers). """
+    header = request.headers.get('Authorization', '')
+    key = header.split(' ', 1)[1].strip() if header.lower().startswith('token ') else request.GET.get('token')
+    if key:
+        token = await Token.objects.select_related('user').filter(key=key).afirst()
+        return token.user if token and token.user.is_active else None
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+async def project_event_stream(request, pk):
+    """
+    Server-sent events for one project: proposals, merges, collaboration
+    requests and funding changes, replacing per-tab polling of those endpoints.
+    Owners and collaborators get every event; anyone who can see the project
+    gets merges and funding updates. Reconnects resume from Last-Event-ID.
+    Under the ASGI app (auth_backend.asgi, e.g. `uvicorn auth_backend.asgi:application`)
+    an open stream holds no thread. Under WSGI, which the vercel.json deploy
+    uses, each stream ties up a worker thread, so streams end after
+    PROJECT_EVENTS_MAX_STREAM_SECONDS and the browser reconnects.
+    """
+    project = await OpenSourceVisionRequest.objects.filter(pk=pk).values('creator_id', 'visibility').afirst()
+    if project is None:
+        return JsonResponse({"detail": "Not found."}, status=404)
+    user = await _stream_user(request)
+    members = user is not None and (
+        project['creator_id'] == user.pk
+        or await OpenSourceVisionRequest.collaborators.through.objects.filter(
+            opensourcevisionrequest_id=pk, customuser_id=user.pk
+        ).aexists()
+    )
+    if not members and not project['visibility']:
+        return JsonResponse({"detail": "You do not have permission to follow this project."}, status=403)
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+    heartbeat = getattr(settings, 'PROJECT_EVENTS_HEARTBEAT', 15)
+    lifetime = getattr(settings, 'PROJECT_EVENTS_MAX_STREAM_SECONDS', 300)
+
+    async def stream():
+        broker = events.get_broker()
+        subscription = broker.subscribe(pk, members=members, last_event_id=last_event_id)
+        try:
+            yield "retry: 5000\n\n"
+            for event in subscription.backlog:
+                yield events.format_sse(event)
+            deadline = time.monotonic() + lifetime
+            while (remaining := deadline - time.monotonic()) > 0:
+                event = await subscription.get(timeout=min(heartbeat, remaining))
+                if event is events.CLOSED:
+                    break
+                # A comment line keeps proxies from timing out an idle stream
+                yield events.format_sse(event) if event is not None else ": keepalive\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def code_preview(request, digest):
+    """
+    Fallback server for preview documents when no CDN or web server sits in
+    front of the storage. The URL names the content, so it is cached forever.
+    The sandbox policy keeps the user-written page out of this site's origin.
+    """
+    if not re.fullmatch(r'[0-9a-f]{64}', digest):
+        raise Http404
+    document, encoding = previews.open_variant(digest, request.headers.get('Accept-Encoding', ''))
+    if document is None:
+        raise Http404
+    with document:
+        response = HttpResponse(document.read(), content_type='text/html; charset=utf-8')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response['Content-Security-Policy'] = 'sandbox allow-scripts'
+    return response
+
+
+class CodeRevisionListView(generics.ListAPIView):
+    """ Merge history of a project's collaborative code, newest first. """
+    serializer_class = CodeRevisionSerializer
+    permission_classes = [IsAuthenticated, IsProjectCollaboratorOrOwner]
+
+    def get_queryset(self):
+        project = get_object_or_404(OpenSourceVisionRequest, pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, project)
+        return (
+            CodeRevision.objects.filter(code__project=project)
+            .select_related('author')
+            .only('id', 'number', 'is_snapshot', 'proposal_id', 'created_at', 'author__id', 'author__username')
+            .order_by('-number')
+        )
+
+
+class CodeRevisionDetailView(APIView):
+    """ Full HTML/CSS/JS of one past revision, rebuilt from the nearest snapshot. """
+    permission_classes = [IsAuthenticated, IsProjectCollaboratorOrOwner]
+
+    def get(self, request, pk, number):
+        project = get_object_or_404(OpenSourceVisionRequest, pk=pk)
+        self.check_object_permissions(request, project)
+        code = get_object_or_404(
+            CollaborativeCode.objects.select_related(*CollaborativeCode.CONTENT_BLOBS.values()), project=project
+        )
+        revision = get_object_or_404(CodeRevision.objects.select_related('author'), code=code, number=number)
+        contents = revisions.rebuild(code, number)
+        serializer = CodeRevisionDetailSerializer({
+            'number': revision.number,
+            'author': revision.author,
+            'proposal': revision.proposal_id,
+            'created_at': revision.created_at,
+            'html_content': contents['html'],
+            'css_content': contents['css'],
+            'js_content': contents['js'],
+        })
+        return Response(serializer.data)
 
 
 # --- Views for Code Change Proposals ---
@@ -525,40 +913,50 @@ class CodeChangeProposalListCreateView(generics.ListCreateAPIView):
         user = self.request.user
         if project.creator == user:
             # Owner sees all pending proposals for this project
-             return CodeChangeProposal.objects.filter(project=project, status='pending')
+             return CodeChangeProposal.objects.select_related('proposer').filter(project=project, status='pending')
         else:
             # Collaborator sees only their own pending proposals
-             return CodeChangeProposal.objects.filter(project=project, proposer=user, status='pending')
+             return CodeChangeProposal.objects.select_related('proposer').filter(project=project, proposer=user, status='pending')
             # Alternatively, return all their proposals:
             # return CodeChangeProposal.objects.filter(project=project, proposer=user)
 
 
+    def get_serializer_context(self):
+        """ Proposals are validated (and rebased) against the project's main code. """
+        context = super().get_serializer_context()
+        if self.request.method == 'POST':
+            project = get_object_or_404(OpenSourceVisionRequest, pk=self.kwargs.get(self.lookup_url_kwarg))
+            context['project'] = project
+            context['code'], _ = CollaborativeCode.objects.get_or_create(project=project)
+        return context
+
     def perform_create(self, serializer):
         """ Set proposer, project, and based_on_timestamp automatically. """
-        project_pk = self.kwargs.get(self.lookup_url_kwarg)
-        project = get_object_or_404(OpenSourceVisionRequest, pk=project_pk)
+        project = serializer.context['project']
 
         # Ensure only collaborators (not owner) can create proposals via this view
         if project.creator == self.request.user:
              raise serializers.ValidationError("Project owner cannot submit proposals via this endpoint.")
         # Permission class already checks if user is collaborator or owner, but extra check is fine
 
-        # Get the current timestamp of the main code
-        main_code, _ = CollaborativeCode.objects.get_or_create(project=project)
-
-        serializer.save(
+        proposal = serializer.save(
             proposer=self.request.user,
             project=project,
-            based_on_timestamp=main_code.last_approved_at # Record what version it's based on
+            based_on_timestamp=serializer.context['code'].last_approved_at # Record what version it's based on
         )
-        logger.info(f"User {self.request.user.username} created proposal for project {project_pk}")
+        events.publish(project.pk, 'proposal.created', {
+            'id': proposal.pk, 'proposer': self.request.user.username, 'base_revision': proposal.base_revision,
+        })
+        logger.info(f"User {self.request.user.username} created proposal for project {project.pk}")
 
 
 # Retrieve details of a specific proposal
 class CodeChangeProposalDetailView(generics.RetrieveAPIView):
     serializer_class = CodeChangeProposalDetailSerializer
     permission_classes = [IsAuthenticated, IsProjectCollaboratorOrOwner] # Owner or Collaborator can view
-    queryset = CodeChangeProposal.objects.select_related('proposer', 'reviewer', 'project').all()
+    queryset = CodeChangeProposal.objects.select_related(
+        'proposer', 'reviewer', 'project', *CodeChangeProposal.CONTENT_BLOBS.values()
+    )
     lookup_url_kwarg = 'proposal_pk' # Use proposal's PK from URL
 
     def get_object(self):
@@ -568,6 +966,49 @@ class CodeChangeProposalDetailView(generics.RetrieveAPIView):
         self.check_object_permissions(self.request, proposal.project)
         return proposal
 
+class CodeChangeProposalDiffView(APIView):
+    """
+    Unified diff of a proposal against the revision it was based on, plus its
+    line stats. Both sides are immutable, so the rendering is cached per
+    (base revision, proposal). Legacy proposals without a base revision are
+    diffed against the current head.
+    """
+    permission_classes = [IsAuthenticated, IsProjectCollaboratorOrOwner]
+
+    def get(self, request, proposal_pk):
+        proposal = get_object_or_404(
+            CodeChangeProposal.objects.select_related('project', *CodeChangeProposal.CONTENT_BLOBS.values()),
+            pk=proposal_pk,
+        )
+        self.check_object_permissions(request, proposal.project)
+        code = CollaborativeCode.objects.filter(project=proposal.project).first()
+        if code is None:
+            code = CollaborativeCode(id=None, project=proposal.project)
+        base_number = code.head_revision if proposal.base_revision is None else proposal.base_revision
+
+        cache_key = f"proposal-diff:{proposal.pk}:{base_number}"
+        data = cache.get(cache_key)
+        if data is None:
+            try:
+                base = revisions.contents_at(code, base_number)
+            except CodeRevision.DoesNotExist:
+                return Response({"detail": "The base revision is no longer available."}, status=status.HTTP_410_GONE)
+            proposed = {
+                'html': proposal.proposed_html_content,
+                'css': proposal.proposed_css_content,
+                'js': proposal.proposed_js_content,
+            }
+            names = {'html': 'index.html', 'css': 'style.css', 'js': 'script.js'}
+            data = {
+                'proposal': str(proposal.pk),
+                'base_revision': base_number,
+                'stats': proposal.diff_stats or revisions.diff_stats(base, proposed),
+                'files': {key: revisions.unified_diff(base[key], proposed[key], names[key]) for key in revisions.FILES},
+            }
+            cache.set(cache_key, data, getattr(settings, 'PROPOSAL_DIFF_CACHE_TIMEOUT', 86400))
+        return Response(data)
+
+
 # Manage (Approve/Reject) a specific proposal (Owner action)
 class ManageCodeChangeProposalView(APIView):
     permission_classes = [IsAuthenticated, IsProjectOwnerForProposal] # Only project owner
@@ -575,7 +1016,9 @@ class ManageCodeChangeProposalView(APIView):
 
     def get_proposal(self, proposal_pk):
         """ Helper to get the proposal object. """
-        proposal = get_object_or_404(CodeChangeProposal, pk=proposal_pk)
+        proposal = get_object_or_404(
+            CodeChangeProposal.objects.select_related(*CodeChangeProposal.CONTENT_BLOBS.values()), pk=proposal_pk
+        )
         # Check owner has permission for the project linked to this proposal
         self.check_object_permissions(self.request, proposal) # Checks IsProjectOwnerForProposal
         return proposal
@@ -607,26 +1050,44 @@ class ManageCodeChangeProposalView(APIView):
                     # --- Merge the changes into the main CollaborativeCode ---
                     main_code, _ = CollaborativeCode.objects.select_for_update().get_or_create(project=proposal.project)
 
-                    # --- Conflict Check (Simple: Check if main code changed since proposal) ---
-                    # if proposal.based_on_timestamp and main_code.last_approved_at > proposal.based_on_timestamp:
-                    #     logger.warning(f"Potential conflict approving proposal {proposal.pk}. Main code updated since proposal.")
-                        # Raise error or allow overwrite? For now, allow overwrite ("last merge wins").
-                        # return Response({"detail": "Conflict detected. The main code has been updated since this proposal was submitted."}, status=status.HTTP_409_CONFLICT)
-
-                    main_code.main_html_content = proposal.proposed_html_content
-                    main_code.main_css_content = proposal.proposed_css_content
-                    main_code.main_js_content = proposal.proposed_js_content
+                    # --- Conflict Check: carry the proposal over any merges made since its base revision ---
+                    # Legacy proposals without a base revision keep "last merge wins".
+                    contents = {
+                        'html': proposal.proposed_html_content,
+                        'css': proposal.proposed_css_content,
+                        'js': proposal.proposed_js_content,
+                    }
+                    if proposal.base_revision is not None:
+                        try:
+                            contents = revisions.rebase(main_code, proposal.base_revision, contents)
+                        except revisions.MergeConflict as e:
+                            return Response(
+                                {"detail": "The main code has changed in the same places since this proposal was submitted.",
+                                 "conflicts": e.files, "head_revision": main_code.head_revision},
+                                status=status.HTTP_409_CONFLICT
+                            )
+
+                    revisions.append_revision(
+                        main_code, contents, author=proposal.proposer, proposal=proposal, when=proposal.reviewed_at
+                    )
                     main_code.last_approved_by = proposal.proposer
                     main_code.last_approved_at = proposal.reviewed_at # Match review time
+                    main_code.preview_digest = previews.publish(contents)
                     main_code.save()
                     # --- End Merge ---
 
                     proposal.save()
+                    events.publish(proposal.project_id, 'proposal.approved', {'id': proposal.pk})
+                    events.publish(proposal.project_id, 'code.merged', {
+                        'head_revision': main_code.head_revision, 'proposal': proposal.pk,
+                        'preview_url': previews.url(main_code.preview_digest),
+                    })
                     logger.info(f"Owner {request.user.username} approved proposal {proposal.pk} by {proposal.proposer.username} for project {proposal.project.pk}")
 
                 elif action == 'reject':
                     proposal.status = 'rejected'
                     proposal.save()
+                    events.publish(proposal.project_id, 'proposal.rejected', {'id': proposal.pk})
                     logger.info(f"Owner {request.user.username} rejected proposal {proposal.pk} by {proposal.proposer.username} for project {proposal.project.pk}")
 
                 # Return detail of the updated proposal
@@ -0,0 +1,17 @@
+# wallet/accounts.py
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+
+def deactivate(users):
+    """
+    Archives accounts instead of deleting them. The ledger is the record of
+    money owed and paid, so LedgerEntry.wallet is PROTECT: a user with any
+    ledger entry can't be deleted (user.delete() raises ProtectedError and
+    the admin lists the entries as protected). Deactivating keeps the user,
+    wallet and ledger while stopping sign-ins and revoking API tokens.
+    Returns how many users were deactivated.
+    """
+    with transaction.atomic():
+        Token.objects.filter(user__in=users).delete()
+        return users.filter(is_active=True).update(is_active=False)
@@ -1,18 +1,15 @@
 # wallet/admin.py
 import logging
 from django.contrib import admin, messages
-from django.db import transaction
-from django.db.models import F
 from django.utils.html import format_html
 from django.urls import reverse, NoReverseMatch
-from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
 
-from .models import WithdrawalRequest, UserWallet
-# --- Import the service and exception ---
-# Service function name is kept the same for compatibility, but its implementation is now simulation
-from .services import initiate_razorpay_payout, PayoutServiceError
+from . import bulk, payouts
+from .models import (
+    LedgerEntry, LockedBalanceDiscrepancy, PayoutJob, ReconciliationRun, WithdrawalRequest, UserWallet,
+)
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -48,6 +45,64 @@ class UserWalletAdmin(admin.ModelAdmin):
          return obj.total_balance
     total_balance_display.short_description = _('Total Balance')
 
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    """ Read-only: the ledger is append-only and only written through wallet.ledger. """
+    list_display = ('wallet', 'sequence', 'kind', 'amount', 'debit_account', 'credit_account', 'withdrawable_after', 'locked_after', 'created_at')
+    list_filter = ('kind', 'created_at')
+    search_fields = ('wallet__user__username', 'reference__iexact')
+    list_select_related = ('wallet__user',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+class ReadOnlyReportAdmin(admin.ModelAdmin):
+    """ Reports are written by the reconcile_locked_balances command only. """
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ReconciliationRun)
+class ReconciliationRunAdmin(ReadOnlyReportAdmin):
+    list_display = ('pk', 'started_at', 'finished_at', 'wallets_checked', 'discrepancy_count', 'last_wallet_id')
+
+@admin.register(LockedBalanceDiscrepancy)
+class LockedBalanceDiscrepancyAdmin(ReadOnlyReportAdmin):
+    list_display = ('run', 'wallet', 'locked_balance', 'expected_locked', 'difference', 'open_withdrawals', 'found_at')
+    list_filter = ('run',)
+    search_fields = ('wallet__user__username',)
+    list_select_related = ('run', 'wallet__user')
+
+@admin.register(PayoutJob)
+class PayoutJobAdmin(admin.ModelAdmin):
+    """ Jobs are written by wallet.payouts; the only manual step is re-queueing failed ones. """
+    list_display = ('withdrawal', 'status', 'attempts', 'next_attempt_at', 'leased_by', 'leased_until', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('withdrawal__request_id__iexact', 'withdrawal__user__username')
+    list_select_related = ('withdrawal__user',)
+    readonly_fields = [field.name for field in PayoutJob._meta.fields]
+    actions = ['retry_selected_jobs']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description=_('Retry selected failed payouts'))
+    def retry_selected_jobs(self, request, queryset):
+        retried = payouts.retry(queryset.values_list('pk', flat=True))
+        self.message_user(request, _("{} payout(s) queued again.").format(retried), messages.SUCCESS)
+
 @admin.register(WithdrawalRequest)
 class WithdrawalRequestAdmin(admin.ModelAdmin):
     # ... (most of WithdrawalRequestAdmin remains unchanged - display, filters, fields, etc.) ...
@@ -133,154 +188,38 @@ class WithdrawalRequestAdmin(admin.ModelAdmin):
 
 
     # --- Admin Actions ---
-    @admin.action(description=_('Approve selected pending requests (Mark as Completed - DEMO)')) # Modified Description
-    def approve_selected_requests(self, request, queryset):
-        """Admin action to mark pending requests as completed (DEMO)."""
-        approved_count = 0
-        # failed_initiation removed as we are not initiating external payout
-        failed_db = 0
-        already_processed = 0
-        admin_user = request.user
-
-        pending_requests = queryset.filter(status=WithdrawalRequest.StatusChoices.PENDING)
-        total_selected = queryset.count()
-        total_pending = pending_requests.count()
-
-        if not pending_requests.exists():
-            msg = _("No PENDING requests selected.")
-            if total_selected > 0: msg += _(" ({}) non-pending requests were ignored.").format(total_selected)
-            self.message_user(request, msg, messages.WARNING)
+    def _report(self, request, result, done_message):
+        """ Summarizes a bulk result: successes, then each kind of skipped row with a few request ids. """
+        done = result.counts.get(bulk.APPROVED, 0) + result.counts.get(bulk.REJECTED, 0)
+        if done:
+            self.message_user(request, done_message.format(done), messages.SUCCESS)
+        failed = result.failed()
+        if not failed:
             return
+        request_ids = dict(WithdrawalRequest.objects.filter(pk__in=list(failed)[:1000]).values_list('pk', 'request_id'))
+        reasons = {
+            bulk.NOT_PENDING: (_("{} request(s) were not pending and were ignored"), messages.WARNING),
+            bulk.NO_WALLET: (_("{} request(s) have no wallet"), messages.ERROR),
+            bulk.INSUFFICIENT_LOCKED: (_("{} request(s) exceed the user's locked balance"), messages.ERROR),
+        }
+        for outcome, (text, level) in reasons.items():
+            pks = [pk for pk, value in failed.items() if value == outcome]
+            if pks:
+                sample = ', '.join(str(request_ids[pk]) for pk in pks[:5] if pk in request_ids)
+                self.message_user(request, text.format(len(pks)) + (f": {sample}" if sample else "") + ('…' if len(pks) > 5 else ''), level)
 
-        for req in pending_requests:
-            logger.info(f"Admin {admin_user.username} attempting to approve request {req.request_id} (DEMO)")
-            try:
-                with transaction.atomic():
-                    req_locked = WithdrawalRequest.objects.select_for_update().get(pk=req.pk)
-                    wallet_locked = UserWallet.objects.select_for_update().get(user=req_locked.user)
-                    amount_decimal = req_locked.amount
-
-                    if req_locked.status != WithdrawalRequest.StatusChoices.PENDING:
-                        logger.warning(f"Request {req_locked.request_id} was already processed before lock.")
-                        already_processed += 1
-                        continue
-
-                    # 1. Set intermediate "APPROVED" status before calling service
-                    # This helps track intent if service fails unexpectedly later
-                    req_locked.status = WithdrawalRequest.StatusChoices.APPROVED
-                    req_locked.processed_by = admin_user
-                    req_locked.processed_at = timezone.now() # Mark approval time
-                    req_locked.rejection_reason = None
-                    req_locked.save(update_fields=['status', 'processed_by', 'processed_at', 'rejection_reason']) # Save approved state
-
-                    # 2. Call the simplified "payout" service (which now just marks COMPLETED)
-                    try:
-                        # Service now directly marks as COMPLETED and saves
-                        simulation_successful = initiate_razorpay_payout(req_locked)
-
-                        if simulation_successful:
-                            logger.info(f"Simulated completion successful for {req_locked.request_id}.")
-                            # 3. Update Wallet: Deduct from locked balance
-                            wallet_locked.locked_balance = F('locked_balance') - amount_decimal
-                            wallet_locked.save()
-                            approved_count += 1
-                        else:
-                             # Should not happen with the simplified service unless DB error occurs inside it
-                             logger.error(f"Simulated completion service returned False unexpectedly for {req_locked.request_id}.")
-                             # Wallet remains locked, status remains APPROVED (or whatever service set before failing)
-                             failed_db += 1 # Count as DB/system error
-
-                    # Catch PayoutServiceError (though less likely now) or other exceptions from service
-                    except (PayoutServiceError, Exception) as service_err:
-                         logger.exception(f"Error during payout simulation service call for {req_locked.request_id}: {service_err}")
-                         # Don't roll back wallet - funds are still locked, status is APPROVED (or FAILED if service set it)
-                         # Just report the failure
-                         failed_db += 1
-                         messages.error(request, f"Error processing {req_locked.request_id}: {service_err}")
-
-            # Handle errors finding the DB records or transaction issues
-            except (UserWallet.DoesNotExist, WithdrawalRequest.DoesNotExist):
-                 logger.error(f"DB Error: Could not find Wallet or Request for pk={req.pk} during approval.")
-                 failed_db += 1
-            except Exception as e:
-                 logger.exception(f"Unexpected transaction/DB error during approval for {req.request_id}: {e}")
-                 failed_db += 1
-
-        # --- Report summary results to the admin ---
-        if approved_count:
-             # Modified success message for Demo
-             self.message_user(request, _("{} request(s) approved and marked as completed (DEMO).").format(approved_count), messages.SUCCESS)
-        if failed_db:
-             self.message_user(request, _("{} request(s) failed processing due to database/system errors.").format(failed_db), messages.ERROR)
-
-        processed_in_loop = approved_count + failed_db
-        ignored_count = total_pending - processed_in_loop + already_processed
-        if ignored_count > 0 :
-             self.message_user(request, _("{} selected pending request(s) were not processed or already handled.").format(ignored_count), messages.WARNING)
-        elif already_processed > 0:
-             self.message_user(request, _("{} request(s) were already processed before action started.").format(already_processed), messages.WARNING)
-
+    @admin.action(description=_('Approve selected pending requests (queue payouts)'))
+    def approve_selected_requests(self, request, queryset):
+        """Admin action to approve pending requests in one bulk transaction; payout workers pay them out."""
+        logger.info(f"Admin {request.user.username} approving {queryset.count()} selected request(s)")
+        result = bulk.approve_requests(queryset.values_list('pk', flat=True), request.user)
+        self._report(request, result, _("{} request(s) approved. Payouts are queued."))
 
     @admin.action(description=_('Reject selected pending requests'))
     def reject_selected_requests(self, request, queryset):
-        """Admin action to reject pending requests and unlock funds."""
-        # --- This action remains unchanged as it doesn't call external services ---
-        rejection_reason = _("Rejected via admin bulk action.")
-        rejected_count = 0
-        failed_db = 0
-        already_processed = 0
-        admin_user = request.user
-
-        pending_requests = queryset.filter(status=WithdrawalRequest.StatusChoices.PENDING)
-        total_selected = queryset.count()
-
-        if not pending_requests.exists():
-            msg = _("No PENDING requests selected.")
-            if total_selected > 0: msg += _(" ({}) non-pending requests were ignored.").format(total_selected)
-            self.message_user(request, msg, messages.WARNING)
-            return
-
-        for req in pending_requests:
-            logger.info(f"Admin {admin_user.username} attempting to reject request {req.request_id}")
-            try:
-                with transaction.atomic():
-                    req_locked = WithdrawalRequest.objects.select_for_update().get(pk=req.pk)
-                    wallet_locked = UserWallet.objects.select_for_update().get(user=req_locked.user)
-                    amount_decimal = req_locked.amount
-
-                    if req_locked.status != WithdrawalRequest.StatusChoices.PENDING:
-                        logger.warning(f"Request {req_locked.request_id} was already processed before reject lock.")
-                        already_processed += 1
-                        continue
-
-                    req_locked.status = WithdrawalRequest.StatusChoices.REJECTED
-                    req_locked.rejection_reason = rejection_reason
-                    req_locked.processed_by = admin_user
-                    req_locked.processed_at = timezone.now()
-                    req_locked.save()
-
-                    wallet_locked.locked_balance = F('locked_balance') - amount_decimal
-                    wallet_locked.withdrawable_balance = F('withdrawable_balance') + amount_decimal
-                    wallet_locked.save()
-
-                    rejected_count += 1
-                    logger.info(f"Request {req_locked.request_id} rejected successfully.")
-
-            except (UserWallet.DoesNotExist, WithdrawalRequest.DoesNotExist):
-                 logger.error(f"DB Error: Could not find Wallet or Request for pk={req.pk} during rejection.")
-                 failed_db += 1
-            except Exception as e:
-                 logger.exception(f"Unexpected transaction/DB error during rejection for {req.request_id}: {e}")
-                 failed_db += 1
-
-        if rejected_count:
-            self.message_user(request, _("{} request(s) rejected successfully. Funds unlocked.").format(rejected_count), messages.SUCCESS)
-        if failed_db:
-             self.message_user(request, _("{} request(s) failed rejection due to database/system errors.").format(failed_db), messages.ERROR)
-
-        processed_in_loop = rejected_count + failed_db
-        ignored_count = pending_requests.count() - processed_in_loop + already_processed
-        if ignored_count > 0:
-             self.message_user(request, _("{} selected pending request(s) were not processed or already handled.").format(ignored_count), messages.WARNING)
-        elif already_processed > 0:
-             self.message_user(request, _("{} request(s) were already processed before action started.").format(already_processed), messages.WARNING)
\ No newline at end of file
+        """Admin action to reject pending requests and unlock funds, in one bulk transaction."""
+        logger.info(f"Admin {request.user.username} rejecting {queryset.count()} selected request(s)")
+        result = bulk.reject_requests(
+            queryset.values_list('pk', flat=True), request.user, _("Rejected via admin bulk action.")
+        )
+        self._report(request, result, _("{} request(s) rejected successfully. Funds unlocked."))
@@ -0,0 +1,113 @@
+# wallet/bulk.py
+import logging
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import ledger, payouts, summaries
+from .models import UserWallet, WithdrawalRequest
+
+logger = logging.getLogger(__name__)
+
+Status = WithdrawalRequest.StatusChoices
+
+# Per-row outcomes
+APPROVED = 'approved'
+REJECTED = 'rejected'
+NOT_PENDING = 'not_pending'  # Already handled, possibly by someone else since it was selected
+NO_WALLET = 'no_wallet'
+INSUFFICIENT_LOCKED = 'insufficient_locked'  # The wallet's locked balance doesn't cover the request
+
+
+class BulkResult:
+    """ What happened to each selected request, keyed by primary key. """
+
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.counts = Counter(outcomes.values())
+
+    def failed(self):
+        return {pk: outcome for pk, outcome in self.outcomes.items() if outcome not in (APPROVED, REJECTED)}
+
+
+def _process(request_ids, admin_user, kind, new_status, outcome, rejection_reason=None, batch_size=1000,
+             on_changed=None):
+    """
+    Moves every PENDING request among `request_ids` to `new_status` and
+    posts its ledger entry of `kind` (if any), in one transaction: wallets
+    are locked in id order before the requests (the order the single-request
+    paths use), each wallet's deltas are applied as one F() update, entries
+    are bulk-inserted and the requests are updated a chunk per statement. `on_changed` gets
+    the primary keys of the updated requests, inside the transaction.
+    """
+    request_ids = sorted(set(request_ids))
+    outcomes = {}
+    with transaction.atomic():
+        owners = {}
+        for start in range(0, len(request_ids), batch_size):
+            owners.update(WithdrawalRequest.objects.filter(pk__in=request_ids[start:start + batch_size]).values_list('pk', 'user_id'))
+        user_ids = sorted(set(owners.values()))
+        wallet_of = {}
+        for start in range(0, len(user_ids), batch_size):
+            # Locking here, before the requests, is what keeps the lock order deterministic
+            wallet_of.update(
+                UserWallet.objects.select_for_update().filter(user_id__in=user_ids[start:start + batch_size])
+                .order_by('pk').values_list('user_id', 'pk')
+            )
+
+        requests = []
+        for start in range(0, len(request_ids), batch_size):
+            requests += WithdrawalRequest.objects.select_for_update().filter(
+                pk__in=request_ids[start:start + batch_size]
+            ).order_by('pk').only('pk', 'user_id', 'amount', 'status', 'request_id')
+        for pk in request_ids:
+            outcomes.setdefault(pk, NOT_PENDING)  # Deleted since it was selected
+
+        postable = []
+        for req in requests:
+            if req.status != Status.PENDING:
+                outcomes[req.pk] = NOT_PENDING
+            elif req.user_id not in wallet_of:
+                outcomes[req.pk] = NO_WALLET
+            else:
+                postable.append(req)
+
+        if kind is None:
+            entries = [True] * len(postable)
+        else:
+            entries = ledger.post_many(
+                ((wallet_of[req.user_id], kind, req.amount, req.request_id) for req in postable), batch_size=batch_size
+            )
+        changed, left_pending = [], defaultdict(lambda: [0, 0])
+        for req, entry in zip(postable, entries):
+            outcomes[req.pk] = INSUFFICIENT_LOCKED if entry is None else outcome
+            if entry is not None:
+                changed.append(req.pk)
+                left_pending[req.user_id][0] += 1
+                left_pending[req.user_id][1] += req.amount
+        # Every row gets the same values, so a plain UPDATE per chunk beats bulk_update()'s CASE per row
+        now = timezone.now()
+        for start in range(0, len(changed), batch_size):
+            WithdrawalRequest.objects.filter(pk__in=changed[start:start + batch_size]).update(
+                status=new_status, processed_by=admin_user, processed_at=now, rejection_reason=rejection_reason,
+            )
+        for user_id, (count, amount) in left_pending.items():
+            summaries.apply(user_id, pending=-count, pending_amount=-amount)
+        if on_changed is not None:
+            on_changed(changed)
+    result = BulkResult(outcomes)
+    logger.info(f"Bulk {outcome} by {admin_user}: {dict(result.counts)}")
+    return result
+
+
+def approve_requests(request_ids, admin_user, batch_size=1000):
+    """ Approves the pending requests and queues their payouts; the funds stay locked until a payout settles. """
+    return _process(request_ids, admin_user, None, Status.APPROVED, APPROVED, batch_size=batch_size,
+                    on_changed=payouts.enqueue)
+
+
+def reject_requests(request_ids, admin_user, rejection_reason, batch_size=1000):
+    """ Rejects the pending requests and returns their locked funds to the withdrawable balance. """
+    return _process(request_ids, admin_user, ledger.Kind.WITHDRAWAL_RELEASE, Status.REJECTED, REJECTED,
+                    rejection_reason=rejection_reason, batch_size=batch_size)
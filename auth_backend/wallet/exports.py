@@ -0,0 +1,24 @@
+# wallet/exports.py
+from auth_backend.exports import Dataset
+
+from .models import WithdrawalRequest
+
+WITHDRAWALS = Dataset(
+    'withdrawals',
+    lambda: WithdrawalRequest.objects.all(),
+    {
+        'request_id': 'request_id',
+        'user_id': 'user_id',
+        'username': 'user__username',
+        'amount': 'amount',
+        'method': 'method',
+        'status': 'status',
+        'requested_at': 'requested_at',
+        'processed_at': 'processed_at',
+        'processed_by': 'processed_by__username',
+        'rejection_reason': 'rejection_reason',
+        'razorpay_payout_id': 'razorpay_payout_id',
+        'razorpay_payout_status': 'razorpay_payout_status',
+    },
+    date_field='requested_at',
+)
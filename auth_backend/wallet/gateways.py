@@ -0,0 +1,148 @@
+# wallet/gateways.py
+import hashlib
+import hmac
+import json
+import time
+from collections import namedtuple
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# What a gateway answered for a payout, and what a callback reported
+Payout = namedtuple('Payout', 'reference status')
+Callback = namedtuple('Callback', 'reference status')
+
+# Gateway payout statuses that end a payout; anything else is still in flight
+PROCESSED = 'processed'
+FAILED_STATUSES = {'reversed', 'failed', 'rejected', 'cancelled'}
+
+
+class GatewayError(Exception):
+    """ Temporary failure (network, timeout, 5xx, rate limit): the payout is retried with backoff. """
+
+
+class PayoutRejected(Exception):
+    """ The gateway refused the payout for good; retrying won't help. """
+
+
+class InvalidCallback(Exception):
+    """ A callback that isn't signed by the gateway or can't be parsed. """
+
+
+def _signature(secret, body):
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _verify(secret, body, signature):
+    if not secret or not signature or not hmac.compare_digest(_signature(secret, body), signature):
+        raise InvalidCallback("Bad signature")
+
+
+class PayoutGateway:
+    """
+    What wallet.payouts needs from a payout provider. create_payout() must be
+    idempotent per key: the same withdrawal may be submitted again after a
+    timeout or a worker crash.
+    """
+
+    def create_payout(self, withdrawal, idempotency_key):
+        """ Submits the payout; returns a Payout or raises GatewayError / PayoutRejected. """
+        raise NotImplementedError
+
+    def parse_callback(self, body, headers):
+        """ Verifies and parses a status callback; returns a Callback or raises InvalidCallback. """
+        raise NotImplementedError
+
+
+class FakeGateway(PayoutGateway):
+    """
+    Local stand-in for development and tests. Pays every payout out at once
+    ('processed', as the old simulated payout did) under a reference derived
+    from the idempotency key. With pending=True payouts stay 'processing'
+    until a callback signed with SECRET_KEY settles them; build one with
+    callback().
+    """
+    SIGNATURE_HEADER = 'X-Fake-Signature'
+
+    def __init__(self, latency=0, fail_times=0, reject=False, pending=False):
+        self.latency = latency
+        self.fail_times = fail_times  # Raise GatewayError this many times first
+        self.reject = reject
+        self.pending = pending
+        self.calls = 0
+
+    def create_payout(self, withdrawal, idempotency_key):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.reject:
+            raise PayoutRejected("Rejected by the fake gateway")
+        if self.fail_times:
+            self.fail_times -= 1
+            raise GatewayError("Fake gateway timeout")
+        return Payout(f"fake_pout_{idempotency_key.replace('-', '')[:24]}", 'processing' if self.pending else PROCESSED)
+
+    @classmethod
+    def callback(cls, reference, status):
+        """ (body, headers) of a signed callback reporting `status` for `reference`. """
+        body = json.dumps({'reference': reference, 'status': status}).encode()
+        return body, {cls.SIGNATURE_HEADER: _signature(settings.SECRET_KEY, body)}
+
+    def parse_callback(self, body, headers):
+        _verify(settings.SECRET_KEY, body, headers.get(self.SIGNATURE_HEADER))
+        try:
+            data = json.loads(body)
+            return Callback(data['reference'], data['status'])
+        except (ValueError, KeyError, TypeError) as e:
+            raise InvalidCallback(str(e))
+
+
+class RazorpayXGateway(PayoutGateway):
+    """ RazorpayX Payouts API; status changes arrive as payout.* webhooks. """
+    API_URL = 'https://api.razorpay.com/v1/payouts'
+    SIGNATURE_HEADER = 'X-Razorpay-Signature'
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self.auth = (settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
+        self.account_number = settings.RAZORPAYX_ACCOUNT_NUMBER
+        self.webhook_secret = settings.RAZORPAYX_WEBHOOK_SECRET
+
+    def create_payout(self, withdrawal, idempotency_key):
+        if not withdrawal.razorpay_fund_account_id:
+            raise PayoutRejected("Withdrawal has no Razorpay fund account")
+        try:
+            response = requests.post(self.API_URL, auth=self.auth, timeout=self.timeout, headers={
+                'X-Payout-Idempotency': idempotency_key,
+            }, json={
+                'account_number': self.account_number,
+                'fund_account_id': withdrawal.razorpay_fund_account_id,
+                'amount': int(withdrawal.amount * 100),  # Paise
+                'currency': 'INR',
+                'mode': 'UPI' if withdrawal.method == withdrawal.MethodChoices.UPI else 'IMPS',
+                'purpose': 'payout',
+                'queue_if_low_balance': True,
+                'reference_id': str(withdrawal.request_id),
+            })
+        except requests.RequestException as e:
+            raise GatewayError(str(e))
+        if response.status_code == 429 or response.status_code >= 500:
+            raise GatewayError(f"RazorpayX answered {response.status_code}")
+        if response.status_code >= 400:
+            raise PayoutRejected(response.text[:500])
+        data = response.json()
+        return Payout(data['id'], data['status'])
+
+    def parse_callback(self, body, headers):
+        _verify(self.webhook_secret, body, headers.get(self.SIGNATURE_HEADER))
+        try:
+            entity = json.loads(body)['payload']['payout']['entity']
+            return Callback(entity['id'], entity['status'])
+        except (ValueError, KeyError, TypeError) as e:
+            raise InvalidCallback(str(e))
+
+
+def get_gateway():
+    """ An instance of the WALLET_PAYOUT_GATEWAY class. """
+    return import_string(getattr(settings, 'WALLET_PAYOUT_GATEWAY', 'wallet.gateways.FakeGateway'))()
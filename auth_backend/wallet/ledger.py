@@ -0,0 +1,267 @@
+# wallet/ledger.py
+import logging
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import summaries
+from .models import LedgerEntry, UserWallet
+
+logger = logging.getLogger(__name__)
+
+Account = LedgerEntry.Account
+Kind = LedgerEntry.Kind
+
+# Wallet-owned account -> the UserWallet column holding its balance
+BALANCE_FIELDS = {
+    Account.WITHDRAWABLE: 'withdrawable_balance',
+    Account.LOCKED: 'locked_balance',
+}
+
+# The accounts each kind of entry moves money between: (debit, credit)
+MOVEMENTS = {
+    Kind.EARNING: (Account.EXTERNAL, Account.WITHDRAWABLE),
+    Kind.WITHDRAWAL_LOCK: (Account.WITHDRAWABLE, Account.LOCKED),
+    Kind.WITHDRAWAL_RELEASE: (Account.LOCKED, Account.WITHDRAWABLE),
+    Kind.WITHDRAWAL_PAYOUT: (Account.LOCKED, Account.EXTERNAL),
+}
+
+
+class LedgerError(Exception):
+    pass
+
+
+class InsufficientFunds(LedgerError):
+    """ The debited wallet account holds less than the amount. """
+
+
+class DuplicateEntry(LedgerError):
+    """ An entry of this kind was already posted for this reference. """
+
+
+def post(wallet_id, kind, amount, reference='', debit=None, credit=None):
+    """
+    Appends one entry moving `amount` from the debit to the credit account
+    and advances the wallet snapshot to match, in a single guarded UPDATE
+    (no read-then-write under a row lock), then the owner's WalletSummary.
+    The accounts default to the ones MOVEMENTS lists for `kind`.
+
+    Raises InsufficientFunds if a wallet account would go negative,
+    DuplicateEntry if `reference` was already posted for `kind`, and
+    UserWallet.DoesNotExist for an unknown wallet.
+    """
+    amount = Decimal(amount)
+    if amount <= 0:
+        raise ValueError("Ledger amounts must be positive")
+    if debit is None or credit is None:
+        debit, credit = MOVEMENTS[kind]
+
+    changes = {'ledger_sequence': F('ledger_sequence') + 1, 'last_updated': timezone.now()}
+    guard = Q(pk=wallet_id)
+    if debit in BALANCE_FIELDS:
+        changes[BALANCE_FIELDS[debit]] = F(BALANCE_FIELDS[debit]) - amount
+        guard &= Q(**{f'{BALANCE_FIELDS[debit]}__gte': amount})
+    if credit in BALANCE_FIELDS:
+        changes[BALANCE_FIELDS[credit]] = F(BALANCE_FIELDS[credit]) + amount
+
+    try:
+        with transaction.atomic():
+            if not UserWallet.objects.filter(guard).update(**changes):
+                if not UserWallet.objects.filter(pk=wallet_id).exists():
+                    raise UserWallet.DoesNotExist(f"Wallet {wallet_id} does not exist")
+                raise InsufficientFunds(f"Wallet {wallet_id} has less than {amount} {debit}")
+            # The UPDATE holds the row until commit, so this reads the snapshot it produced
+            user_id, sequence, withdrawable, locked = UserWallet.objects.filter(pk=wallet_id).values_list(
+                'user_id', 'ledger_sequence', 'withdrawable_balance', 'locked_balance'
+            ).get()
+            entry = LedgerEntry.objects.create(
+                wallet_id=wallet_id, sequence=sequence, kind=kind, debit_account=debit, credit_account=credit,
+                amount=amount, withdrawable_after=withdrawable, locked_after=locked, reference=str(reference),
+            )
+            _summarize(user_id, debit, credit, amount)
+            return entry
+    except IntegrityError:
+        if reference and LedgerEntry.objects.filter(kind=kind, reference=str(reference)).exists():
+            raise DuplicateEntry(f"{kind} was already posted for {reference}")
+        raise
+
+
+def _moved(balances, debit, credit, amount):
+    """ (withdrawable, locked) after moving `amount` from the debit to the credit account. """
+    withdrawable, locked = balances
+    for account, sign in ((debit, -1), (credit, 1)):
+        if account == Account.WITHDRAWABLE:
+            withdrawable += sign * amount
+        elif account == Account.LOCKED:
+            locked += sign * amount
+    return withdrawable, locked
+
+
+def _summarize(user_id, debit, credit, amount):
+    """ Mirrors a movement in the owner's WalletSummary. """
+    withdrawable, locked = _moved((0, 0), debit, credit, amount)
+    summaries.apply(user_id, withdrawable, locked, earned=amount if debit == Account.EXTERNAL else 0)
+
+
+def _apply(balances, debit, credit, amount):
+    """ Like _moved(), but None if the debited wallet account would go negative (as post() refuses). """
+    after = _moved(balances, debit, credit, amount)
+    if debit in BALANCE_FIELDS and after[list(BALANCE_FIELDS).index(debit)] < 0:
+        return None
+    return after
+
+
+def post_many(postings, batch_size=1000):
+    """
+    Posts many (wallet_id, kind, amount, reference) entries at once: the
+    wallets are locked in id order (so concurrent batches can't deadlock),
+    each wallet (and its summary) gets one UPDATE carrying its summed
+    deltas, and the entries are bulk-inserted. Returns, in posting order,
+    the entry or None where the wallet is missing or would go negative;
+    those postings are skipped.
+    """
+    postings = list(postings)
+    wallet_ids = sorted({wallet_id for wallet_id, *_ in postings})
+    with transaction.atomic():
+        state, owners = {}, {}
+        for start in range(0, len(wallet_ids), batch_size):
+            for pk, user_id, sequence, withdrawable, locked in (
+                UserWallet.objects.select_for_update().filter(pk__in=wallet_ids[start:start + batch_size])
+                .order_by('pk').values_list('pk', 'user_id', 'ledger_sequence', 'withdrawable_balance', 'locked_balance')
+            ):
+                state[pk] = [sequence, (withdrawable, locked)]
+                owners[pk] = user_id
+        opening = {pk: (sequence, balances) for pk, (sequence, balances) in state.items()}
+        earned = dict.fromkeys(state, 0)
+
+        results, entries = [], []
+        for wallet_id, kind, amount, reference in postings:
+            amount = Decimal(amount)
+            debit, credit = MOVEMENTS[kind]
+            after = _apply(state[wallet_id][1], debit, credit, amount) if wallet_id in state else None
+            if after is None:
+                results.append(None)
+                continue
+            state[wallet_id][0] += 1
+            state[wallet_id][1] = after
+            if debit == Account.EXTERNAL:
+                earned[wallet_id] += amount
+            entry = LedgerEntry(
+                wallet_id=wallet_id, sequence=state[wallet_id][0], kind=kind, debit_account=debit,
+                credit_account=credit, amount=amount, withdrawable_after=after[0], locked_after=after[1],
+                reference=str(reference),
+            )
+            entries.append(entry)
+            results.append(entry)
+
+        LedgerEntry.objects.bulk_create(entries, batch_size=batch_size)
+        now = timezone.now()
+        for wallet_id, (sequence, (withdrawable, locked)) in state.items():
+            old_sequence, (old_withdrawable, old_locked) = opening[wallet_id]
+            if sequence != old_sequence:
+                UserWallet.objects.filter(pk=wallet_id).update(
+                    withdrawable_balance=F('withdrawable_balance') + (withdrawable - old_withdrawable),
+                    locked_balance=F('locked_balance') + (locked - old_locked),
+                    ledger_sequence=F('ledger_sequence') + (sequence - old_sequence),
+                    last_updated=now,
+                )
+                summaries.apply(
+                    owners[wallet_id], withdrawable - old_withdrawable, locked - old_locked, earned=earned[wallet_id],
+                )
+    return results
+
+
+def open_balances(wallet_model, entry_model, batch_size=500):
+    """
+    Records each wallet's balances from before the ledger existed as opening
+    entries, so replaying the ledger reproduces them. Models are passed in so
+    data migrations can use their historical versions.
+    """
+    last_pk = 0
+    while True:
+        wallets = list(
+            wallet_model.objects.filter(pk__gt=last_pk, ledger_sequence=0).order_by('pk')
+            .values_list('pk', 'withdrawable_balance', 'locked_balance')[:batch_size]
+        )
+        if not wallets:
+            break
+        last_pk = wallets[-1][0]
+        entries, sequences = [], {}
+        for pk, withdrawable, locked in wallets:
+            for account, balance in ((Account.WITHDRAWABLE, withdrawable), (Account.LOCKED, locked)):
+                if balance > 0:
+                    sequences[pk] = sequences.get(pk, 0) + 1
+                    # Withdrawable is opened first, so only the locked entry carries the locked balance
+                    entries.append(entry_model(
+                        wallet_id=pk, sequence=sequences[pk], kind=Kind.OPENING,
+                        debit_account=Account.EXTERNAL, credit_account=account, amount=balance,
+                        withdrawable_after=withdrawable,
+                        locked_after=locked if account == Account.LOCKED else Decimal('0.00'),
+                    ))
+        with transaction.atomic():
+            entry_model.objects.bulk_create(entries)
+            for pk, sequence in sequences.items():
+                wallet_model.objects.filter(pk=pk).update(ledger_sequence=sequence)
+
+
+Discrepancy = namedtuple('Discrepancy', 'wallet_id sequence problem')
+
+
+def audit(chunk_size=5000):
+    """
+    Replays every entry in (wallet, sequence) order and yields a Discrepancy
+    for each gap in the sequence, each entry whose recorded balances differ
+    from the replayed ones, and each wallet snapshot that differs from the
+    replay. Entries are streamed in keyset-paginated chunks, so memory stays
+    flat however long the ledger is.
+    """
+    zero = Decimal('0.00')
+
+    def snapshot_problems(wallet_id, sequence, balances, snapshots):
+        snapshot = snapshots.get(wallet_id)
+        # A wallet that moved on since its entries were read is checked on the next run
+        if snapshot is not None and snapshot[0] == sequence and (snapshot[1], snapshot[2]) != balances:
+            yield Discrepancy(wallet_id, sequence, f"snapshot {snapshot[1:]} != replayed {balances}")
+
+    wallet_id, sequence, balances, snapshots = None, 0, (zero, zero), {}
+    after = (0, 0)
+    while True:
+        rows = list(
+            LedgerEntry.objects.filter(Q(wallet_id__gt=after[0]) | Q(wallet_id=after[0], sequence__gt=after[1]))
+            .order_by('wallet_id', 'sequence')
+            .values_list('wallet_id', 'sequence', 'debit_account', 'credit_account', 'amount',
+                         'withdrawable_after', 'locked_after')[:chunk_size]
+        )
+        if not rows:
+            break
+        after = rows[-1][:2]
+        snapshots.update({
+            pk: rest for pk, *rest in UserWallet.objects.filter(pk__in={row[0] for row in rows}).values_list(
+                'pk', 'ledger_sequence', 'withdrawable_balance', 'locked_balance'
+            )
+        })
+        for row_wallet, row_sequence, debit, credit, amount, withdrawable_after, locked_after in rows:
+            if row_wallet != wallet_id:
+                if wallet_id is not None:
+                    yield from snapshot_problems(wallet_id, sequence, balances, snapshots)
+                    snapshots.pop(wallet_id, None)
+                wallet_id, sequence, balances = row_wallet, 0, (zero, zero)
+            if row_sequence != sequence + 1:
+                yield Discrepancy(wallet_id, row_sequence, f"expected sequence {sequence + 1}")
+            sequence = row_sequence
+
+            balances = _moved(balances, debit, credit, amount)
+            if balances != (withdrawable_after, locked_after):
+                yield Discrepancy(
+                    wallet_id, sequence, f"recorded {(withdrawable_after, locked_after)} != replayed {balances}"
+                )
+    if wallet_id is not None:
+        yield from snapshot_problems(wallet_id, sequence, balances, snapshots)
+
+    # Wallets with money but no entries at all
+    unbacked = UserWallet.objects.filter(ledger_sequence=0).exclude(withdrawable_balance=0, locked_balance=0)
+    for pk in unbacked.values_list('pk', flat=True).iterator(chunk_size=chunk_size):
+        yield Discrepancy(pk, 0, "balance without ledger entries")
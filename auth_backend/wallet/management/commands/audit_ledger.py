@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wallet.ledger import audit
+
+
+class Command(BaseCommand):
+    help = "Replays the wallet ledger in streaming chunks and reports entries or snapshots that don't add up."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--limit', type=int, default=100, help="Stop listing after this many problems.")
+
+    def handle(self, *args, **options):
+        found = 0
+        for discrepancy in audit(chunk_size=options['chunk_size']):
+            found += 1
+            if found <= options['limit']:
+                self.stdout.write(
+                    f"wallet {discrepancy.wallet_id} entry {discrepancy.sequence}: {discrepancy.problem}"
+                )
+        if found:
+            raise CommandError(f"Ledger audit found {found} discrepancies.")
+        self.stdout.write(self.style.SUCCESS("Ledger audit passed."))
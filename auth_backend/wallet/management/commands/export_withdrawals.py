@@ -0,0 +1,7 @@
+from auth_backend.exports import ExportCommand
+from wallet.exports import WITHDRAWALS
+
+
+class Command(ExportCommand):
+    help = "Streams withdrawal requests as CSV or NDJSON, optionally within a requested_at range."
+    dataset = WITHDRAWALS
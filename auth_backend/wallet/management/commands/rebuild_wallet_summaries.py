@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from wallet.summaries import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recomputes every WalletSummary from the wallets, the ledger and the pending withdrawal requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS("Wallet summaries rebuilt."))
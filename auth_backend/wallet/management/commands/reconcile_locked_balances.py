@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wallet.models import ReconciliationRun
+from wallet.reconcile import run
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks every wallet's locked balance against its open withdrawal requests and records mismatches "
+        "as LockedBalanceDiscrepancy rows. Resumes the last unfinished run unless --fresh is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--fresh', action='store_true', help="Start a new run even if one is unfinished.")
+        parser.add_argument('--limit', type=int, default=100, help="Stop listing after this many discrepancies.")
+
+    def handle(self, *args, **options):
+        unfinished = None if options['fresh'] else ReconciliationRun.objects.filter(finished_at__isnull=True).first()
+        if unfinished is not None:
+            self.stdout.write(f"Resuming reconciliation {unfinished.pk} after wallet {unfinished.last_wallet_id}.")
+        reconciliation = run(unfinished, chunk_size=options['chunk_size'])
+
+        for discrepancy in reconciliation.discrepancies.all()[:options['limit']]:
+            self.stdout.write(
+                f"wallet {discrepancy.wallet_id}: locked {discrepancy.locked_balance}, open withdrawals "
+                f"{discrepancy.open_withdrawals} totalling {discrepancy.expected_locked}"
+            )
+        if reconciliation.discrepancy_count:
+            raise CommandError(
+                f"Reconciliation {reconciliation.pk} found {reconciliation.discrepancy_count} discrepancies "
+                f"in {reconciliation.wallets_checked} wallets."
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciliation {reconciliation.pk} checked {reconciliation.wallets_checked} wallets: all balanced."
+        ))
@@ -0,0 +1,42 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from wallet import payouts
+from wallet.gateways import get_gateway
+
+
+class Command(BaseCommand):
+    help = (
+        "Claims queued withdrawal payouts and submits them to the payout gateway with bounded concurrency. "
+        "Run as many workers as needed; each job is leased to one of them at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help="Gateway calls in flight at once.")
+        parser.add_argument('--batch-size', type=int, default=50, help="Jobs claimed per round.")
+        parser.add_argument('--lease', type=int, default=300, help="Seconds a claimed batch stays leased.")
+        parser.add_argument('--poll-interval', type=float, default=5, help="Seconds to wait when no job is due.")
+        parser.add_argument('--once', action='store_true', help="Process one round and exit.")
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        gateway = get_gateway()
+        self.stdout.write(f"Payout worker {worker} using {type(gateway).__name__}")
+        try:
+            while True:
+                claimed = payouts.process(
+                    gateway, worker, limit=options['batch_size'], concurrency=options['concurrency'],
+                    lease_seconds=options['lease'],
+                )
+                if claimed:
+                    self.stdout.write(f"Processed {claimed} payout job(s).")
+                if options['once']:
+                    break
+                if not claimed:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Payout worker stopped."))
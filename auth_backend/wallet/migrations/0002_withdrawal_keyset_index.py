@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='withdrawalrequest',
+            index=models.Index(fields=['user', '-requested_at', '-id'], name='withdrawal_user_requested_idx'),
+        ),
+    ]
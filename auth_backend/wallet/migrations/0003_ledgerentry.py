@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:24
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0002_withdrawal_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userwallet',
+            name='ledger_sequence',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveBigIntegerField()),
+                ('kind', models.CharField(choices=[('opening', 'Opening Balance'), ('earning', 'Earning'), ('withdrawal_lock', 'Withdrawal Requested'), ('withdrawal_release', 'Withdrawal Rejected'), ('withdrawal_payout', 'Withdrawal Paid Out'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('debit_account', models.CharField(choices=[('withdrawable', 'Withdrawable'), ('locked', 'Locked'), ('external', 'External')], max_length=12)),
+                ('credit_account', models.CharField(choices=[('withdrawable', 'Withdrawable'), ('locked', 'Locked'), ('external', 'External')], max_length=12)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('withdrawable_after', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('locked_after', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('reference', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='wallet.userwallet')),
+            ],
+            options={
+                'verbose_name': 'Ledger Entry',
+                'verbose_name_plural': 'Ledger Entries',
+                'ordering': ['wallet', 'sequence'],
+                'constraints': [models.UniqueConstraint(fields=('wallet', 'sequence'), name='ledger_wallet_sequence'), models.UniqueConstraint(condition=models.Q(('reference', ''), _negated=True), fields=('kind', 'reference'), name='ledger_kind_reference'), models.CheckConstraint(condition=models.Q(('amount__gt', 0)), name='ledger_amount_positive'), models.CheckConstraint(condition=models.Q(('debit_account', models.F('credit_account')), _negated=True), name='ledger_distinct_accounts')],
+            },
+        ),
+    ]
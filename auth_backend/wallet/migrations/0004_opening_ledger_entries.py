@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from wallet.ledger import open_balances
+
+
+def open_ledger(apps, schema_editor):
+    open_balances(apps.get_model('wallet', 'UserWallet'), apps.get_model('wallet', 'LedgerEntry'))
+
+
+def close_ledger(apps, schema_editor):
+    apps.get_model('wallet', 'LedgerEntry').objects.filter(kind='opening').delete()
+    apps.get_model('wallet', 'UserWallet').objects.update(ledger_sequence=0)
+
+
+class Migration(migrations.Migration):
+    atomic = False  # Each chunk of wallets commits on its own
+
+    dependencies = [
+        ('wallet', '0003_ledgerentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(open_ledger, close_ledger),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0004_opening_ledger_entries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('submitted', 'Submitted'), ('settled', 'Settled'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField()),
+                ('leased_by', models.CharField(blank=True, max_length=64)),
+                ('leased_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('withdrawal', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='payout_job', to='wallet.withdrawalrequest')),
+            ],
+            options={
+                'verbose_name': 'Payout Job',
+                'verbose_name_plural': 'Payout Jobs',
+                'ordering': ['next_attempt_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='payout_job_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_user', '0009_alter_customuser_role'),
+        ('wallet', '0005_payoutjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='wallet_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('withdrawable_balance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('locked_balance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('pending_withdrawals', models.PositiveIntegerField(default=0)),
+                ('pending_withdrawal_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('lifetime_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Wallet Summary',
+                'verbose_name_plural': 'Wallet Summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import migrations
+
+from wallet.summaries import build
+
+
+def open_missing_wallets(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserWallet = apps.get_model('wallet', 'UserWallet')
+    # Balance reads no longer create wallets, so users from before signup-time creation get one now
+    missing = User.objects.filter(userwallet__isnull=True).values_list('pk', flat=True)
+    UserWallet.objects.bulk_create((UserWallet(user_id=pk) for pk in missing.iterator()), batch_size=500)
+    build(
+        apps.get_model('wallet', 'WalletSummary'), UserWallet,
+        apps.get_model('wallet', 'LedgerEntry'), apps.get_model('wallet', 'WithdrawalRequest'),
+    )
+
+
+class Migration(migrations.Migration):
+    atomic = False  # Each chunk of summaries commits on its own
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('wallet', '0006_walletsummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(open_missing_wallets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0007_build_wallet_summaries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('last_wallet_id', models.PositiveBigIntegerField(default=0)),
+                ('wallets_checked', models.PositiveBigIntegerField(default=0)),
+                ('discrepancy_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Reconciliation Run',
+                'verbose_name_plural': 'Reconciliation Runs',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LockedBalanceDiscrepancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('locked_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('expected_locked', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('open_withdrawals', models.PositiveIntegerField()),
+                ('found_at', models.DateTimeField(auto_now_add=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wallet.userwallet')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='discrepancies', to='wallet.reconciliationrun')),
+            ],
+            options={
+                'verbose_name': 'Locked Balance Discrepancy',
+                'verbose_name_plural': 'Locked Balance Discrepancies',
+                'ordering': ['run', 'wallet'],
+                'constraints': [models.UniqueConstraint(fields=('run', 'wallet'), name='discrepancy_run_wallet')],
+            },
+        ),
+    ]
@@ -8,7 +8,10 @@ from django.utils.translation import gettext_lazy as _
 
 class UserWallet(models.Model):
     """
-    Stores user balance information.
+    Stores user balance information. The wallet goes with its user, but
+    ledger entries are PROTECT: a user with money history can't be deleted
+    and is deactivated instead (wallet.accounts.deactivate, or the user
+    admin's "Deactivate" action).
     """
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -30,6 +33,8 @@ class UserWallet(models.Model):
         default=0.00
     )
     last_updated = models.DateTimeField(auto_now=True)
+    # Sequence number of the last LedgerEntry applied; the balances above are the snapshot after it
+    ledger_sequence = models.PositiveBigIntegerField(default=0)
 
     class Meta:
         verbose_name = _("User Wallet")
@@ -42,6 +47,35 @@ class UserWallet(models.Model):
     def total_balance(self):
         return self.withdrawable_balance + self.locked_balance
 
+class WalletSummary(models.Model):
+    """
+    Read model behind the balance endpoint: everything the wallet screen
+    shows, in one row keyed by the user's id, so a poll is a single
+    primary-key SELECT. Written only alongside the ledger and withdrawal
+    status changes (see wallet.summaries); never edit it directly.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='wallet_summary'
+    )
+    withdrawable_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    locked_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Withdrawal requests awaiting admin approval
+    pending_withdrawals = models.PositiveIntegerField(default=0)
+    pending_withdrawal_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Everything ever credited to the wallet from outside (earnings and opening balances)
+    lifetime_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Wallet Summary")
+        verbose_name_plural = _("Wallet Summaries")
+
+    def __str__(self):
+        return f"Wallet summary of user {self.user_id}"
+
 class WithdrawalRequest(models.Model):
     """
     Tracks user withdrawal requests, admin approval, and Razorpay payout status.
@@ -134,6 +168,10 @@ class WithdrawalRequest(models.Model):
         ordering = ['-requested_at']
         verbose_name = _("Withdrawal Request")
         verbose_name_plural = _("Withdrawal Requests")
+        indexes = [
+            # Keyset pagination of a user's history: (requested_at, id) newest first
+            models.Index(fields=['user', '-requested_at', '-id'], name='withdrawal_user_requested_idx'),
+        ]
 
     def __str__(self):
         return f"Withdrawal {self.request_id} by {self.user.username} for {self.amount} ({self.get_status_display()})"
@@ -143,4 +181,137 @@ class WithdrawalRequest(models.Model):
         # Requires fetching the actual Fund Account details from Razorpay if needed,
         # or store minimal masked details during request if absolutely necessary.
         # For now, just return the method.
-        return self.get_method_display()
\ No newline at end of file
+        return self.get_method_display()
+
+class LedgerEntry(models.Model):
+    """
+    One immutable movement of money between two accounts, at least one of
+    them in the wallet. Entries are never updated or deleted: a wallet's
+    balances are the sum of its entries, and UserWallet holds the running
+    snapshot after its latest one. See wallet.ledger.
+    """
+    class Account(models.TextChoices):
+        WITHDRAWABLE = 'withdrawable', _('Withdrawable')
+        LOCKED = 'locked', _('Locked')
+        EXTERNAL = 'external', _('External')  # Money entering or leaving the platform
+
+    class Kind(models.TextChoices):
+        OPENING = 'opening', _('Opening Balance')
+        EARNING = 'earning', _('Earning')
+        WITHDRAWAL_LOCK = 'withdrawal_lock', _('Withdrawal Requested')
+        WITHDRAWAL_RELEASE = 'withdrawal_release', _('Withdrawal Rejected')
+        WITHDRAWAL_PAYOUT = 'withdrawal_payout', _('Withdrawal Paid Out')
+        ADJUSTMENT = 'adjustment', _('Adjustment')
+
+    # PROTECT: the ledger outlives account closure, so its users are deactivated, not deleted (wallet.accounts)
+    wallet = models.ForeignKey(UserWallet, on_delete=models.PROTECT, related_name='ledger_entries')
+    sequence = models.PositiveBigIntegerField()  # 1, 2, 3... per wallet
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    debit_account = models.CharField(max_length=12, choices=Account.choices)  # Money leaves this account
+    credit_account = models.CharField(max_length=12, choices=Account.choices)  # and enters this one
+    amount = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(decimal.Decimal('0.01'))])
+    # Wallet balances right after this entry
+    withdrawable_after = models.DecimalField(max_digits=12, decimal_places=2)
+    locked_after = models.DecimalField(max_digits=12, decimal_places=2)
+    # What caused the entry, e.g. a withdrawal request_id; one entry per (kind, reference)
+    reference = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['wallet', 'sequence']
+        verbose_name = _("Ledger Entry")
+        verbose_name_plural = _("Ledger Entries")
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'sequence'], name='ledger_wallet_sequence'),
+            models.UniqueConstraint(
+                fields=['kind', 'reference'], condition=~models.Q(reference=''), name='ledger_kind_reference',
+            ),
+            models.CheckConstraint(condition=models.Q(amount__gt=0), name='ledger_amount_positive'),
+            models.CheckConstraint(
+                condition=~models.Q(debit_account=models.F('credit_account')), name='ledger_distinct_accounts',
+            ),
+        ]
+
+    def __str__(self):
+        return f"#{self.sequence} {self.kind} {self.amount} ({self.debit_account} -> {self.credit_account})"
+
+class PayoutJob(models.Model):
+    """
+    The queued payout of an approved WithdrawalRequest. Workers claim jobs
+    with a lease, call the payout gateway outside any transaction and retry
+    with backoff; the final outcome arrives through the gateway's callback.
+    See wallet.payouts.
+    """
+    class StatusChoices(models.TextChoices):
+        QUEUED = 'queued', _('Queued')
+        RUNNING = 'running', _('Running')  # Leased by a worker until leased_until
+        SUBMITTED = 'submitted', _('Submitted')  # Accepted by the gateway, awaiting its callback
+        SETTLED = 'settled', _('Settled')
+        FAILED = 'failed', _('Failed')
+
+    withdrawal = models.OneToOneField(WithdrawalRequest, on_delete=models.PROTECT, related_name='payout_job')
+    status = models.CharField(max_length=10, choices=StatusChoices.choices, default=StatusChoices.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    leased_by = models.CharField(max_length=64, blank=True)
+    leased_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        verbose_name = _("Payout Job")
+        verbose_name_plural = _("Payout Jobs")
+        indexes = [
+            # Claiming: due jobs of one status, oldest first
+            models.Index(fields=['status', 'next_attempt_at'], name='payout_job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Payout of {self.withdrawal_id} ({self.status}, {self.attempts} attempt(s))"
+
+class ReconciliationRun(models.Model):
+    """
+    One pass of the locked-balance reconciliation (wallet.reconcile). The
+    checkpoint is the last wallet id fully checked, so an interrupted run
+    resumes where it stopped.
+    """
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_wallet_id = models.PositiveBigIntegerField(default=0)
+    wallets_checked = models.PositiveBigIntegerField(default=0)
+    discrepancy_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-started_at']
+        verbose_name = _("Reconciliation Run")
+        verbose_name_plural = _("Reconciliation Runs")
+
+    def __str__(self):
+        state = 'finished' if self.finished_at else f'at wallet {self.last_wallet_id}'
+        return f"Reconciliation {self.pk} ({state}, {self.discrepancy_count} discrepancies)"
+
+class LockedBalanceDiscrepancy(models.Model):
+    """ A wallet whose locked balance differs from the sum of its open withdrawal requests. """
+    run = models.ForeignKey(ReconciliationRun, on_delete=models.CASCADE, related_name='discrepancies')
+    wallet = models.ForeignKey(UserWallet, on_delete=models.CASCADE, related_name='+')
+    locked_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    expected_locked = models.DecimalField(max_digits=12, decimal_places=2)
+    open_withdrawals = models.PositiveIntegerField()
+    found_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['run', 'wallet']
+        verbose_name = _("Locked Balance Discrepancy")
+        verbose_name_plural = _("Locked Balance Discrepancies")
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'wallet'], name='discrepancy_run_wallet'),
+        ]
+
+    @property
+    def difference(self):
+        return self.locked_balance - self.expected_locked
+
+    def __str__(self):
+        return f"Wallet {self.wallet_id}: locked {self.locked_balance}, expected {self.expected_locked}"
@@ -0,0 +1,192 @@
+# wallet/payouts.py
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import gateways, ledger
+from .models import PayoutJob, UserWallet, WithdrawalRequest
+
+logger = logging.getLogger(__name__)
+
+Job = PayoutJob.StatusChoices
+Status = WithdrawalRequest.StatusChoices
+
+
+def enqueue(withdrawal_ids):
+    """ Queues a payout job for each approved withdrawal; already queued ones are left alone. """
+    now = timezone.now()
+    PayoutJob.objects.bulk_create(
+        (PayoutJob(withdrawal_id=pk, next_attempt_at=now) for pk in withdrawal_ids), ignore_conflicts=True,
+    )
+
+
+def retry(job_ids):
+    """ Re-queues failed jobs whose withdrawal is still awaiting its payout. Returns how many. """
+    return PayoutJob.objects.filter(
+        pk__in=job_ids, status=Job.FAILED, withdrawal__status=Status.APPROVED,
+    ).update(status=Job.QUEUED, attempts=0, next_attempt_at=timezone.now(), last_error='')
+
+
+def _claimable(now):
+    # Due jobs, and jobs whose worker died without giving back its lease; only ever for a still approved withdrawal
+    due = Q(status=Job.QUEUED, next_attempt_at__lte=now) | Q(status=Job.RUNNING, leased_until__lt=now)
+    return due & Q(withdrawal__status=Status.APPROVED)
+
+
+def claim(worker, limit, lease_seconds=300):
+    """
+    Leases up to `limit` due jobs to `worker` (a name unique per worker).
+    Where the database can, candidates are picked with FOR UPDATE SKIP
+    LOCKED; the claiming UPDATE re-checks the condition either way, so on
+    SQLite a job raced for by two workers goes to exactly one of them.
+    """
+    now = timezone.now()
+    until = now + timedelta(seconds=lease_seconds)
+    with transaction.atomic():
+        due = PayoutJob.objects.filter(_claimable(now)).order_by('next_attempt_at', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:limit])
+        PayoutJob.objects.filter(_claimable(now), pk__in=ids).update(
+            status=Job.RUNNING, leased_by=worker, leased_until=until, attempts=F('attempts') + 1,
+        )
+    return list(PayoutJob.objects.filter(pk__in=ids, leased_by=worker, leased_until=until).select_related('withdrawal'))
+
+
+def _leased(job):
+    """ The job's row, as long as this worker still holds the lease it was claimed with. """
+    return PayoutJob.objects.filter(pk=job.pk, status=Job.RUNNING, leased_by=job.leased_by, leased_until=job.leased_until)
+
+
+def backoff(attempts):
+    """ Seconds before the next attempt: exponential from PAYOUT_BACKOFF_BASE up to PAYOUT_BACKOFF_CAP, jittered. """
+    base = getattr(settings, 'PAYOUT_BACKOFF_BASE', 30)
+    cap = getattr(settings, 'PAYOUT_BACKOFF_CAP', 3600)
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1)
+
+
+def _submit(gateway, job):
+    """ The gateway's answer for the job: a Payout, or the GatewayError / PayoutRejected it raised. """
+    try:
+        return gateway.create_payout(job.withdrawal, idempotency_key=str(job.withdrawal.request_id))
+    except (gateways.GatewayError, gateways.PayoutRejected) as e:
+        return e
+
+
+def _record(job, answer):
+    """
+    Applies the gateway's answer to a claimed job. A temporary error
+    re-queues it with backoff; after PAYOUT_MAX_ATTEMPTS the job fails but
+    the funds stay locked, since the payout may have gone through (retry()
+    re-queues it). A rejection fails the withdrawal and releases its funds.
+    """
+    withdrawal = job.withdrawal
+    if isinstance(answer, gateways.PayoutRejected):
+        logger.warning(f"Payout for withdrawal {withdrawal.request_id} rejected: {answer}")
+        if _leased(job).update(status=Job.FAILED, leased_by='', leased_until=None, last_error=str(answer)):
+            _close(withdrawal.pk, succeeded=False, gateway_status='rejected')
+        return
+    if isinstance(answer, gateways.GatewayError):
+        if job.attempts >= getattr(settings, 'PAYOUT_MAX_ATTEMPTS', 8):
+            logger.error(f"Payout for withdrawal {withdrawal.request_id} gave up after {job.attempts} attempts: {answer}")
+            _leased(job).update(status=Job.FAILED, leased_by='', leased_until=None, last_error=str(answer))
+        else:
+            _leased(job).update(
+                status=Job.QUEUED, leased_by='', leased_until=None, last_error=str(answer),
+                next_attempt_at=timezone.now() + timedelta(seconds=backoff(job.attempts)),
+            )
+        return
+
+    with transaction.atomic():
+        if not _leased(job).update(status=Job.SUBMITTED, leased_by='', leased_until=None, last_error=''):
+            return  # Lease lost; whoever holds it now records the (idempotent) same payout
+        WithdrawalRequest.objects.filter(pk=withdrawal.pk, status=Status.APPROVED).update(
+            status=Status.PROCESSING, razorpay_payout_id=answer.reference, razorpay_payout_status=answer.status,
+        )
+    if answer.status == gateways.PROCESSED or answer.status in gateways.FAILED_STATUSES:
+        settle(answer.reference, answer.status)
+
+
+def run(job, gateway):
+    """ Submits one claimed job to the gateway, outside any transaction, and records the answer. """
+    _record(job, _submit(gateway, job))
+
+
+def process(gateway, worker, limit=50, concurrency=4, lease_seconds=300):
+    """
+    Claims up to `limit` jobs and submits them with at most `concurrency`
+    gateway calls in flight. Only the calls run in the pool; answers are
+    recorded from this thread, so a worker holds one database connection.
+    The lease must outlast the whole batch. Returns how many jobs were
+    claimed.
+    """
+    jobs = claim(worker, limit, lease_seconds)
+    if concurrency <= 1:
+        for job in jobs:
+            run(job, gateway)
+    elif jobs:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            pending = {pool.submit(_submit, gateway, job): job for job in jobs}
+            for future in as_completed(pending):
+                try:
+                    _record(pending[future], future.result())
+                except Exception:
+                    logger.exception(f"Payout job {pending[future].pk} crashed; it is retried when its lease expires")
+    return len(jobs)
+
+
+def _close(withdrawal_pk, succeeded, gateway_status):
+    """
+    Pays out (or releases) the withdrawal's locked funds and records the
+    final status, unless that already happened. Locks the wallet before the
+    request, like wallet.bulk. Only an approved or processing withdrawal
+    still has its funds locked for the payout; anything else is left alone.
+    """
+    with transaction.atomic():
+        user_id = WithdrawalRequest.objects.values_list('user_id', flat=True).get(pk=withdrawal_pk)
+        wallet_id = UserWallet.objects.select_for_update().values_list('pk', flat=True).get(user_id=user_id)
+        withdrawal = WithdrawalRequest.objects.select_for_update().get(pk=withdrawal_pk)
+        if withdrawal.status not in (Status.APPROVED, Status.PROCESSING):
+            if withdrawal.status not in (Status.COMPLETED, Status.FAILED):
+                # Its funds were released (or never locked for a payout): posting would drain other requests
+                logger.error(f"Payout {gateway_status} for {withdrawal.status} withdrawal {withdrawal.request_id} ignored")
+            return withdrawal
+        kind = ledger.Kind.WITHDRAWAL_PAYOUT if succeeded else ledger.Kind.WITHDRAWAL_RELEASE
+        try:
+            ledger.post(wallet_id, kind, withdrawal.amount, reference=withdrawal.request_id)
+        except ledger.DuplicateEntry:
+            pass
+        withdrawal.status = Status.COMPLETED if succeeded else Status.FAILED
+        withdrawal.razorpay_payout_status = gateway_status
+        withdrawal.processed_at = timezone.now()
+        withdrawal.save(update_fields=['status', 'razorpay_payout_status', 'processed_at'])
+        PayoutJob.objects.filter(withdrawal_id=withdrawal_pk).update(
+            status=Job.SETTLED if succeeded else Job.FAILED, leased_by='', leased_until=None,
+        )
+    logger.info(f"Withdrawal {withdrawal.request_id} {withdrawal.status} ({gateway_status})")
+    return withdrawal
+
+
+def settle(reference, gateway_status):
+    """
+    Applies a gateway status for the payout `reference`. Idempotent: a
+    final status is applied once and replays (webhooks are redelivered)
+    change nothing. Returns the withdrawal, or None for an unknown
+    reference (e.g. a callback that beat run() to recording it; the gateway
+    redelivers it).
+    """
+    withdrawal = WithdrawalRequest.objects.filter(razorpay_payout_id=reference).only('pk', 'status').first()
+    if withdrawal is None:
+        return None
+    if gateway_status == gateways.PROCESSED or gateway_status in gateways.FAILED_STATUSES:
+        return _close(withdrawal.pk, succeeded=gateway_status == gateways.PROCESSED, gateway_status=gateway_status)
+    WithdrawalRequest.objects.filter(pk=withdrawal.pk, status=Status.PROCESSING).update(
+        razorpay_payout_status=gateway_status,
+    )
+    return withdrawal
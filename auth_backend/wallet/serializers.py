@@ -5,17 +5,23 @@ from rest_framework import serializers
 from django.db import transaction
 # from django.utils import timezone # Not needed for ID simulation anymore
 from django.contrib.auth import get_user_model
-from .models import UserWallet, WithdrawalRequest
+from . import ledger, summaries
+from .models import UserWallet, WalletSummary, WithdrawalRequest
 
 User = get_user_model()
 
-# --- UserWalletSerializer unchanged ---
-class UserWalletSerializer(serializers.ModelSerializer):
+# --- Balance endpoint: everything the wallet screen shows, from the summary read model ---
+class WalletSummarySerializer(serializers.ModelSerializer):
     withdrawable_balance = serializers.DecimalField(max_digits=12, decimal_places=2, coerce_to_string=True)
     locked_balance = serializers.DecimalField(max_digits=12, decimal_places=2, coerce_to_string=True)
+    pending_withdrawal_amount = serializers.DecimalField(max_digits=12, decimal_places=2, coerce_to_string=True)
+    lifetime_earnings = serializers.DecimalField(max_digits=14, decimal_places=2, coerce_to_string=True)
     class Meta:
-        model = UserWallet
-        fields = ['withdrawable_balance', 'locked_balance']
+        model = WalletSummary
+        fields = [
+            'withdrawable_balance', 'locked_balance', 'pending_withdrawals',
+            'pending_withdrawal_amount', 'lifetime_earnings',
+        ]
         read_only_fields = fields
 
 # --- WithdrawalHistorySerializer unchanged ---
@@ -92,21 +98,15 @@ class WithdrawalCreateSerializer(serializers.Serializer):
         method = validated_data['method']
         # 'details' were validated but we don't need to pass them to the model now
 
-        # 1. Get Wallet & Check Balance
-        wallet, created = UserWallet.objects.select_for_update().get_or_create(user=user)
-        if wallet.withdrawable_balance < amount:
-            raise serializers.ValidationError(
-                f"Withdrawal amount (₹{amount:.2f}) exceeds available balance (₹{wallet.withdrawable_balance:.2f})."
-            )
+        # 1. Get Wallet (created at signup)
+        try:
+            wallet_id = UserWallet.objects.values_list('pk', flat=True).get(user=user)
+        except UserWallet.DoesNotExist:
+            raise serializers.ValidationError("Wallet not found.")
 
         # 2. **REMOVED**: Simulation/Placeholder for Razorpay Contact/Fund Account Creation
 
-        # 3. Update Wallet Balance (Lock Funds)
-        wallet.withdrawable_balance -= amount
-        wallet.locked_balance += amount
-        wallet.save()
-
-        # 4. Create Withdrawal Request (without simulated Razorpay IDs)
+        # 3. Create Withdrawal Request (without simulated Razorpay IDs)
         withdrawal_request = WithdrawalRequest.objects.create(
             user=user,
             amount=amount,
@@ -115,4 +115,14 @@ class WithdrawalCreateSerializer(serializers.Serializer):
             # razorpay_contact_id=None, # Fields will be null by default
             # razorpay_fund_account_id=None,
         )
+
+        # 4. Lock the funds; the ledger's guarded update checks the balance atomically
+        try:
+            ledger.post(wallet_id, ledger.Kind.WITHDRAWAL_LOCK, amount, reference=withdrawal_request.request_id)
+        except ledger.InsufficientFunds:
+            available = UserWallet.objects.values_list('withdrawable_balance', flat=True).get(pk=wallet_id)
+            raise serializers.ValidationError(
+                f"Withdrawal amount (₹{amount:.2f}) exceeds available balance (₹{available:.2f})."
+            )
+        summaries.apply(user.pk, pending=1, pending_amount=amount)
         return withdrawal_request
\ No newline at end of file
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .summaries import open_wallet
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_wallet(sender, instance, created, raw=False, **kwargs):
+    # Every user gets a wallet up front, so balance reads never have to create one
+    if created and not raw:
+        open_wallet(instance.pk)
@@ -0,0 +1,76 @@
+# wallet/summaries.py
+from django.db.models import Count, F, Sum
+
+from .models import LedgerEntry, UserWallet, WalletSummary, WithdrawalRequest
+
+Account = LedgerEntry.Account
+
+
+def open_wallet(user_id):
+    """ Creates the user's wallet and its summary; called once, at signup. """
+    UserWallet.objects.get_or_create(user_id=user_id)
+    WalletSummary.objects.get_or_create(user_id=user_id)
+
+
+def apply(user_id, withdrawable=0, locked=0, earned=0, pending=0, pending_amount=0):
+    """
+    Adds the given deltas to the user's summary in one F() update. Call it
+    in the transaction that makes the change it mirrors.
+    """
+    deltas = {
+        'withdrawable_balance': withdrawable, 'locked_balance': locked, 'lifetime_earnings': earned,
+        'pending_withdrawals': pending, 'pending_withdrawal_amount': pending_amount,
+    }
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if changes:
+        WalletSummary.objects.filter(pk=user_id).update(**changes)
+
+
+def build(summary_model, wallet_model, entry_model, request_model, user_ids=None, batch_size=500):
+    """
+    (Re)computes summaries from the wallets, their ledger entries and the
+    pending withdrawal requests, a keyset-paginated chunk of wallets at a
+    time. Models are passed in so data migrations can use their historical
+    versions.
+    """
+    wallets = wallet_model.objects.all()
+    if user_ids is not None:
+        wallets = wallets.filter(user_id__in=user_ids)
+    last_user = 0
+    while True:
+        chunk = list(
+            wallets.filter(user_id__gt=last_user).order_by('user_id')
+            .values_list('user_id', 'pk', 'withdrawable_balance', 'locked_balance')[:batch_size]
+        )
+        if not chunk:
+            break
+        last_user = chunk[-1][0]
+        wallet_users = {pk: user_id for user_id, pk, _, _ in chunk}
+        earned = dict(
+            entry_model.objects.filter(wallet_id__in=wallet_users, debit_account=Account.EXTERNAL)
+            .values('wallet_id').annotate(total=Sum('amount')).values_list('wallet_id', 'total')
+        )
+        pending = {
+            row['user_id']: (row['count'], row['total'])
+            for row in request_model.objects.filter(
+                user_id__in=wallet_users.values(), status=WithdrawalRequest.StatusChoices.PENDING,
+            ).values('user_id').annotate(count=Count('pk'), total=Sum('amount'))
+        }
+        summary_model.objects.bulk_create(
+            [
+                summary_model(
+                    user_id=user_id, withdrawable_balance=withdrawable, locked_balance=locked,
+                    pending_withdrawals=pending.get(user_id, (0, 0))[0],
+                    pending_withdrawal_amount=pending.get(user_id, (0, 0))[1],
+                    lifetime_earnings=earned.get(pk, 0),
+                )
+                for user_id, pk, withdrawable, locked in chunk
+            ],
+            update_conflicts=True, unique_fields=['user'],
+            update_fields=['withdrawable_balance', 'locked_balance', 'pending_withdrawals',
+                           'pending_withdrawal_amount', 'lifetime_earnings'],
+        )
+
+
+def rebuild(user_ids=None, batch_size=500):
+    build(WalletSummary, UserWallet, LedgerEntry, WithdrawalRequest, user_ids=user_ids, batch_size=batch_size)
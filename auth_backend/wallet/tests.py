@@ -1,3 +1,591 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import ProtectedError
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from auth_backend import exports
+from custom_user.models import CustomUser
+from . import bulk, gateways, ledger, payouts, reconcile, summaries
+from .exports import WITHDRAWALS
+from .models import (
+    LedgerEntry, LockedBalanceDiscrepancy, PayoutJob, ReconciliationRun, UserWallet, WalletSummary, WithdrawalRequest,
+)
+
+
+def make_user(username):
+    return CustomUser.objects.create_user(username=username, email=f"{username}@example.com")
+
+
+def make_wallet(username, withdrawable='0.00'):
+    wallet = UserWallet.objects.get(user=make_user(username))
+    if Decimal(withdrawable):
+        ledger.post(wallet.pk, ledger.Kind.EARNING, withdrawable)
+    return wallet
+
+
+def make_withdrawal(wallet, amount):
+    """ A pending request with its funds locked, as the request endpoint leaves it. """
+    withdrawal = WithdrawalRequest.objects.create(user=wallet.user, amount=Decimal(amount), method='upi')
+    ledger.post(wallet.pk, ledger.Kind.WITHDRAWAL_LOCK, amount, reference=withdrawal.request_id)
+    summaries.apply(wallet.user_id, pending=1, pending_amount=Decimal(amount))
+    return withdrawal
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.wallet = make_wallet("dev", '500.00')
+
+    def balances(self):
+        self.wallet.refresh_from_db()
+        return self.wallet.withdrawable_balance, self.wallet.locked_balance
+
+    def test_movements_keep_the_snapshot_and_running_balances(self):
+        ledger.post(self.wallet.pk, ledger.Kind.WITHDRAWAL_LOCK, '200.00', reference='w1')
+        ledger.post(self.wallet.pk, ledger.Kind.WITHDRAWAL_LOCK, '100.00', reference='w2')
+        ledger.post(self.wallet.pk, ledger.Kind.WITHDRAWAL_RELEASE, '200.00', reference='w1')
+        entry = ledger.post(self.wallet.pk, ledger.Kind.WITHDRAWAL_PAYOUT, '100.00', reference='w2')
+
+        self.assertEqual(self.balances(), (Decimal('400.00'), Decimal('0.00')))
+        self.assertEqual((entry.sequence, entry.withdrawable_after, entry.locked_after), (5, Decimal('400.00'), Decimal('0.00')))
+        self.assertEqual(self.wallet.ledger_sequence, 5)
+        self.assertEqual(list(ledger.audit(chunk_size=2)), [])
+
+    def test_guards(self):
+        with self.assertRaises(ledger.InsufficientFunds):
+            ledger.post(self.wallet.pk, ledger.Kind.WITHDRAWAL_LOCK, '500.01')
+        ledger.post(self.wallet.pk, ledger.Kind.WITHDRAWAL_LOCK, '10.00', reference='w1')
+        with self.assertRaises(ledger.DuplicateEntry):
+            ledger.post(self.wallet.pk, ledger.Kind.WITHDRAWAL_LOCK, '10.00', reference='w1')
+        self.assertEqual(self.balances(), (Decimal('490.00'), Decimal('10.00')))
+        self.assertEqual(LedgerEntry.objects.count(), 2)
+
+    def test_audit_reports_tampering(self):
+        other = make_wallet("other", '50.00')
+        UserWallet.objects.filter(pk=self.wallet.pk).update(withdrawable_balance=Decimal('999.00'))
+        LedgerEntry.objects.filter(wallet=other).update(withdrawable_after=Decimal('49.00'))
+        unbacked = make_wallet("unbacked")
+        UserWallet.objects.filter(pk=unbacked.pk).update(locked_balance=Decimal('5.00'))
+
+        problems = list(ledger.audit(chunk_size=1))
+        self.assertEqual([(p.wallet_id, p.sequence) for p in problems], [
+            (self.wallet.pk, 1), (other.pk, 1), (unbacked.pk, 0),
+        ])
+        self.assertIn("snapshot", problems[0].problem)
+
+    def test_opening_balances_replay_to_the_snapshot(self):
+        legacy = make_wallet("legacy")
+        UserWallet.objects.filter(pk=legacy.pk).update(
+            withdrawable_balance=Decimal('70.00'), locked_balance=Decimal('30.00')
+        )
+        ledger.open_balances(UserWallet, LedgerEntry, batch_size=1)
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.ledger_sequence, 2)
+        self.assertEqual(list(ledger.audit()), [])
+
+
+class WithdrawalLedgerTests(TestCase):
+    def setUp(self):
+        self.wallet = make_wallet("dev", '100.00')
+        self.client = APIClient()
+        self.client.force_authenticate(self.wallet.user)
+
+    def request_withdrawal(self, amount):
+        return self.client.post(reverse('wallet:request-withdrawal'), {
+            'amount': amount, 'method': 'upi', 'details': {'upi_id': 'dev@bank'},
+        }, format='json')
+
+    def test_request_locks_through_the_ledger_and_rejection_releases(self):
+        self.assertEqual(self.request_withdrawal('60.00').status_code, 201)
+        self.assertEqual(self.request_withdrawal('60.00').status_code, 400)
+        withdrawal = WithdrawalRequest.objects.get()
+        self.wallet.refresh_from_db()
+        self.assertEqual((self.wallet.withdrawable_balance, self.wallet.locked_balance), (Decimal('40.00'), Decimal('60.00')))
+
+        admin = make_user("admin")
+        admin.is_staff = True
+        admin.save()
+        self.client.force_authenticate(admin)
+        url = reverse('wallet:admin-withdrawal-action', args=[withdrawal.request_id])
+        response = self.client.post(url, {'action': 'reject', 'rejection_reason': "no"})
+        self.assertEqual(response.status_code, 200)
+        self.wallet.refresh_from_db()
+        self.assertEqual((self.wallet.withdrawable_balance, self.wallet.locked_balance), (Decimal('100.00'), Decimal('0.00')))
+        self.assertEqual(
+            list(LedgerEntry.objects.values_list('kind', flat=True)),
+            ['earning', 'withdrawal_lock', 'withdrawal_release'],
+        )
+
+    def act(self, withdrawal, action):
+        admin, _ = CustomUser.objects.get_or_create(username="admin", defaults={'is_staff': True})
+        self.client.force_authenticate(admin)
+        url = reverse('wallet:admin-withdrawal-action', args=[withdrawal.request_id])
+        return self.client.post(url, {'action': action, 'rejection_reason': "no"})
+
+    def test_reject_after_approve_changes_nothing(self):
+        withdrawal = make_withdrawal(self.wallet, '60.00')
+        bulk.approve_requests([withdrawal.pk], make_user("other-admin"))
+
+        response = self.act(withdrawal, 'reject')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Approved", response.json()['error'])
+        withdrawal.refresh_from_db()
+        self.assertEqual(withdrawal.status, WithdrawalRequest.StatusChoices.APPROVED)
+        self.wallet.refresh_from_db()
+        self.assertEqual((self.wallet.withdrawable_balance, self.wallet.locked_balance), (Decimal('40.00'), Decimal('60.00')))
+        self.assertFalse(LedgerEntry.objects.filter(kind=ledger.Kind.WITHDRAWAL_RELEASE).exists())
+
+    def test_unbacked_rejection_is_a_conflict_and_rolls_back(self):
+        withdrawal = make_withdrawal(self.wallet, '60.00')
+        UserWallet.objects.filter(pk=self.wallet.pk).update(locked_balance=Decimal('0.00'))
+
+        self.assertEqual(self.act(withdrawal, 'reject').status_code, 409)
+        withdrawal.refresh_from_db()
+        self.assertEqual(withdrawal.status, WithdrawalRequest.StatusChoices.PENDING)
+
+        walletless = make_user("walletless")
+        UserWallet.objects.filter(user=walletless).delete()
+        orphan = WithdrawalRequest.objects.create(user=walletless, amount=Decimal('5.00'), method='upi')
+        self.assertEqual(self.act(orphan, 'approve').status_code, 409)
+
+
+class AccountClosureTests(TestCase):
+    def test_users_with_money_history_are_deactivated_not_deleted(self):
+        unfunded = make_wallet("unfunded")
+        unfunded.user.delete()
+        self.assertFalse(UserWallet.objects.filter(pk=unfunded.pk).exists())
+        self.assertFalse(WalletSummary.objects.filter(pk=unfunded.user_id).exists())
+
+        funded = make_wallet("funded", '10.00')
+        Token.objects.create(user=funded.user)
+        with self.assertRaises(ProtectedError):
+            funded.user.delete()
+
+        admin = CustomUser.objects.create_superuser("root", "root@example.com", "pw")
+        client = Client()
+        client.force_login(admin)
+        # The admin refuses the delete and lists the protected ledger entries
+        response = client.get(reverse('admin:custom_user_customuser_delete', args=[funded.user_id]))
+        self.assertContains(response, "Cannot delete")
+        response = client.post(reverse('admin:custom_user_customuser_changelist'), {
+            'action': 'deactivate_users', '_selected_action': [funded.user_id],
+        })
+        self.assertEqual(response.status_code, 302)
+        funded.user.refresh_from_db()
+        self.assertFalse(funded.user.is_active)
+        self.assertFalse(Token.objects.filter(user=funded.user).exists())
+        self.assertEqual(LedgerEntry.objects.filter(wallet=funded).count(), 1)
+
+
+class BulkWithdrawalTests(TestCase):
+    def setUp(self):
+        self.admin = make_user("admin")
+        self.wallets = [make_wallet(f"dev{n}", '100.00') for n in range(3)]
+        self.requests = []
+        for wallet in self.wallets:
+            for _ in range(2):
+                self.requests.append(make_withdrawal(wallet, '30.00'))
+
+    def test_mixed_outcomes(self):
+        done, first, second = self.requests[0], self.requests[2], self.requests[3]
+        WithdrawalRequest.objects.filter(pk=done.pk).update(status=WithdrawalRequest.StatusChoices.REJECTED)
+        # The second request of this wallet no longer fits the locked balance
+        UserWallet.objects.filter(pk=self.wallets[1].pk).update(locked_balance=Decimal('40.00'))
+        orphan = WithdrawalRequest.objects.create(user=make_user("nowallet"), amount=Decimal('1.00'), method='upi')
+        UserWallet.objects.filter(user=orphan.user).delete()
+
+        result = bulk.reject_requests([r.pk for r in self.requests] + [orphan.pk, 10 ** 6], self.admin, "batch")
+
+        self.assertEqual(result.counts, {bulk.REJECTED: 4, bulk.NOT_PENDING: 2, bulk.NO_WALLET: 1, bulk.INSUFFICIENT_LOCKED: 1})
+        self.assertEqual(result.outcomes[first.pk], bulk.REJECTED)
+        self.assertEqual(result.outcomes[second.pk], bulk.INSUFFICIENT_LOCKED)
+        second.refresh_from_db()
+        self.assertEqual(second.status, WithdrawalRequest.StatusChoices.PENDING)
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.processed_by, first.rejection_reason),
+                         (WithdrawalRequest.StatusChoices.REJECTED, self.admin, "batch"))
+
+    def test_deltas_are_grouped_per_wallet_and_the_ledger_replays(self):
+        result = bulk.reject_requests([r.pk for r in self.requests], self.admin, "batch", batch_size=2)
+        self.assertEqual(result.counts, {bulk.REJECTED: 6})
+        for wallet in self.wallets:
+            wallet.refresh_from_db()
+            self.assertEqual((wallet.withdrawable_balance, wallet.locked_balance, wallet.ledger_sequence),
+                             (Decimal('100.00'), Decimal('0.00'), 5))
+        self.assertEqual(
+            list(LedgerEntry.objects.filter(wallet=self.wallets[0], kind=ledger.Kind.WITHDRAWAL_RELEASE)
+                 .values_list('sequence', 'locked_after')),
+            [(4, Decimal('30.00')), (5, Decimal('0.00'))],
+        )
+        self.assertEqual(list(ledger.audit()), [])
+        # A second run finds nothing left to do
+        self.assertEqual(bulk.reject_requests([r.pk for r in self.requests], self.admin, "batch").counts,
+                         {bulk.NOT_PENDING: 6})
+
+    def test_approval_queues_payouts_and_keeps_funds_locked(self):
+        result = bulk.approve_requests([r.pk for r in self.requests], self.admin)
+        self.assertEqual(result.counts, {bulk.APPROVED: 6})
+        self.assertEqual(PayoutJob.objects.filter(withdrawal__status=WithdrawalRequest.StatusChoices.APPROVED).count(), 6)
+        self.wallets[0].refresh_from_db()
+        self.assertEqual(self.wallets[0].locked_balance, Decimal('60.00'))
+
+
+class PayoutTests(TestCase):
+    def setUp(self):
+        self.wallet = make_wallet("dev", '100.00')
+        self.withdrawal = make_withdrawal(self.wallet, '40.00')
+        bulk.approve_requests([self.withdrawal.pk], make_user("admin"))
+        self.client = APIClient()
+
+    def balances(self):
+        self.wallet.refresh_from_db()
+        return self.wallet.withdrawable_balance, self.wallet.locked_balance
+
+    def job(self):
+        return PayoutJob.objects.get(withdrawal=self.withdrawal)
+
+    def callback(self, status):
+        self.withdrawal.refresh_from_db()
+        body, headers = gateways.FakeGateway.callback(self.withdrawal.razorpay_payout_id, status)
+        return self.client.generic('POST', reverse('wallet:payout-callback'), body,
+                                   content_type='application/json', headers=headers)
+
+    def test_default_fake_gateway_completes_the_withdrawal(self):
+        payouts.process(gateways.FakeGateway(), "w1", concurrency=1)
+        self.withdrawal.refresh_from_db()
+        self.assertEqual(self.withdrawal.status, WithdrawalRequest.StatusChoices.COMPLETED)
+        self.assertEqual(self.job().status, PayoutJob.StatusChoices.SETTLED)
+        self.assertEqual(self.balances(), (Decimal('60.00'), Decimal('0.00')))
+
+    def test_submit_then_idempotent_callback(self):
+        gateway = gateways.FakeGateway(pending=True)
+        self.assertEqual(payouts.process(gateway, "w1", concurrency=1), 1)
+        self.assertEqual(payouts.process(gateway, "w1", concurrency=1), 0)
+        self.withdrawal.refresh_from_db()
+        self.assertEqual(self.withdrawal.status, WithdrawalRequest.StatusChoices.PROCESSING)
+        self.assertEqual(self.job().status, PayoutJob.StatusChoices.SUBMITTED)
+
+        for _ in range(2):
+            response = self.callback('processed')
+            self.assertEqual(response.json(), {'status': 'completed'})
+        self.assertEqual(self.balances(), (Decimal('60.00'), Decimal('0.00')))
+        self.assertEqual(self.job().status, PayoutJob.StatusChoices.SETTLED)
+        self.assertEqual(LedgerEntry.objects.filter(kind=ledger.Kind.WITHDRAWAL_PAYOUT).count(), 1)
+        # A late contradicting callback changes nothing
+        self.callback('reversed')
+        self.assertEqual(self.balances(), (Decimal('60.00'), Decimal('0.00')))
+
+    def test_callbacks_must_be_signed_and_known(self):
+        url = reverse('wallet:payout-callback')
+        body = b'{"reference": "x", "status": "processed"}'
+        self.assertEqual(self.client.generic('POST', url, body, content_type='application/json').status_code, 400)
+        body, headers = gateways.FakeGateway.callback("unknown", 'processed')
+        response = self.client.generic('POST', url, body, content_type='application/json', headers=headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_temporary_errors_back_off_then_give_up_with_funds_locked(self):
+        gateway = gateways.FakeGateway(fail_times=10)
+        with self.settings(PAYOUT_MAX_ATTEMPTS=2):
+            payouts.process(gateway, "w1", concurrency=1)
+            job = self.job()
+            self.assertEqual((job.status, job.attempts), (PayoutJob.StatusChoices.QUEUED, 1))
+            self.assertGreater(job.next_attempt_at, timezone.now())
+            self.assertEqual(payouts.process(gateway, "w1", concurrency=1), 0)  # Not due yet
+
+            PayoutJob.objects.update(next_attempt_at=timezone.now())
+            payouts.process(gateway, "w1", concurrency=1)
+        self.assertEqual(self.job().status, PayoutJob.StatusChoices.FAILED)
+        self.assertEqual(self.balances(), (Decimal('60.00'), Decimal('40.00')))
+
+        self.assertEqual(payouts.retry([self.job().pk]), 1)
+        payouts.process(gateways.FakeGateway(pending=True), "w1", concurrency=1)
+        self.assertEqual(self.job().status, PayoutJob.StatusChoices.SUBMITTED)
+
+    def test_rejected_payout_releases_funds(self):
+        payouts.process(gateways.FakeGateway(reject=True), "w1", concurrency=1)
+        self.withdrawal.refresh_from_db()
+        self.assertEqual(self.withdrawal.status, WithdrawalRequest.StatusChoices.FAILED)
+        self.assertEqual(self.balances(), (Decimal('100.00'), Decimal('0.00')))
+        self.assertEqual(list(ledger.audit()), [])
+
+    def test_no_payout_for_a_withdrawal_that_is_no_longer_approved(self):
+        # As if rejected (and its funds released) after the job was queued
+        WithdrawalRequest.objects.filter(pk=self.withdrawal.pk).update(
+            status=WithdrawalRequest.StatusChoices.REJECTED, razorpay_payout_id="fake_pout_x",
+        )
+        ledger.post(self.wallet.pk, ledger.Kind.WITHDRAWAL_RELEASE, '40.00', reference=self.withdrawal.request_id)
+        gateway = gateways.FakeGateway()
+        self.assertEqual(payouts.process(gateway, "w1", concurrency=1), 0)
+        self.assertEqual(gateway.calls, 0)
+
+        payouts.settle("fake_pout_x", 'processed')
+        self.withdrawal.refresh_from_db()
+        self.assertEqual(self.withdrawal.status, WithdrawalRequest.StatusChoices.REJECTED)
+        self.assertEqual(self.balances(), (Decimal('100.00'), Decimal('0.00')))
+        self.assertFalse(LedgerEntry.objects.filter(kind=ledger.Kind.WITHDRAWAL_PAYOUT).exists())
+
+    def test_leases(self):
+        self.assertEqual(len(payouts.claim("w1", 10, lease_seconds=60)), 1)
+        self.assertEqual(payouts.claim("w2", 10), [])
+        PayoutJob.objects.update(leased_until=timezone.now() - timedelta(seconds=1))  # w1 died
+        [job] = payouts.claim("w2", 10)
+        self.assertEqual((job.leased_by, job.attempts), ("w2", 2))
+
+
+class WalletSummaryTests(TestCase):
+    FIELDS = ('withdrawable_balance', 'locked_balance', 'pending_withdrawals', 'pending_withdrawal_amount',
+              'lifetime_earnings')
+
+    def setUp(self):
+        self.wallet = make_wallet("dev", '100.00')
+        self.user = self.wallet.user
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def summary(self):
+        return WalletSummary.objects.filter(pk=self.user.pk).values_list(*self.FIELDS).get()
+
+    def withdraw(self, amount):
+        response = self.client.post(reverse('wallet:request-withdrawal'), {
+            'amount': amount, 'method': 'upi', 'details': {'upi_id': 'dev@bank'},
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return WithdrawalRequest.objects.latest('requested_at')
+
+    def test_signup_opens_the_wallet(self):
+        user = make_user("new")
+        self.assertTrue(UserWallet.objects.filter(user=user).exists())
+        self.assertEqual(WalletSummary.objects.get(pk=user.pk).withdrawable_balance, 0)
+
+    def test_summary_follows_the_ledger_and_statuses(self):
+        first, second, _ = self.withdraw('10.00'), self.withdraw('20.00'), self.withdraw('30.00')
+        self.assertEqual(self.summary(), (Decimal('40.00'), Decimal('60.00'), 3, Decimal('60.00'), Decimal('100.00')))
+
+        admin = make_user("admin")
+        bulk.reject_requests([first.pk], admin, "no")
+        bulk.approve_requests([second.pk], admin)
+        self.assertEqual(self.summary(), (Decimal('50.00'), Decimal('50.00'), 1, Decimal('30.00'), Decimal('100.00')))
+        payouts.process(gateways.FakeGateway(), "w1", concurrency=1)
+        second.refresh_from_db()
+        payouts.settle(second.razorpay_payout_id, 'processed')
+        ledger.post(self.wallet.pk, ledger.Kind.EARNING, '5.00')
+
+        expected = (Decimal('55.00'), Decimal('30.00'), 1, Decimal('30.00'), Decimal('105.00'))
+        self.assertEqual(self.summary(), expected)
+        # The maintained row matches one rebuilt from the source tables
+        summaries.rebuild()
+        self.assertEqual(self.summary(), expected)
+
+    def test_balance_is_one_primary_key_read(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('wallet:wallet-balance'))
+        self.assertEqual(response.json(), {
+            'withdrawable_balance': '100.00', 'locked_balance': '0.00', 'pending_withdrawals': 0,
+            'pending_withdrawal_amount': '0.00', 'lifetime_earnings': '100.00',
+        })
+        WalletSummary.objects.filter(pk=self.user.pk).delete()
+        self.assertEqual(self.client.get(reverse('wallet:wallet-balance')).json()['withdrawable_balance'], '0.00')
+        self.assertFalse(WalletSummary.objects.filter(pk=self.user.pk).exists())
+
+
+class WithdrawalExportTests(TestCase):
+    def setUp(self):
+        wallet = make_wallet("=cmd", '100.00')
+        for day in ('2025-01-01', '2025-01-15', '2025-02-01'):
+            withdrawal = make_withdrawal(wallet, '10.00')
+            WithdrawalRequest.objects.filter(pk=withdrawal.pk).update(requested_at=f'{day}T08:00:00Z')
+        admin = make_user("admin")
+        admin.is_staff = True
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.url = reverse('wallet:admin-withdrawal-export')
+
+    def test_streams_csv_in_date_order(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'since': '2025-01-01', 'until': '2025-02-01T00:00:00Z'})
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['requested_at'] for row in rows], ['2025-01-01T08:00:00+00:00', '2025-01-15T08:00:00+00:00'])
+        self.assertEqual((rows[0]['username'], rows[0]['amount'], rows[0]['processed_at']), ("'=cmd", '10.00', ''))
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'since': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'type': 'xlsx'}).status_code, 400)
+
+    def test_command_writes_ndjson_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'out.ndjson')
+            call_command('export_withdrawals', format='ndjson', since='2025-01-10', output=path, stderr=StringIO())
+            with open(path, encoding='utf-8') as out:
+                rows = [json.loads(line) for line in out]
+        self.assertEqual([row['status'] for row in rows], ['pending', 'pending'])
+        self.assertEqual(rows[0]['username'], '=cmd')  # Only CSV cells are escaped
+
+
+@skipUnless(os.environ.get('VISORA_BENCHMARKS'), "set VISORA_BENCHMARKS=1 to run benchmarks")
+class WithdrawalExportBenchmark(TestCase):
+    """ Peak Python memory of an export must not grow with the row count. """
+
+    def export_peak(self, rows):
+        WithdrawalRequest.objects.all().delete()
+        user = CustomUser.objects.get(username="bench")
+        WithdrawalRequest.objects.bulk_create(
+            (WithdrawalRequest(user=user, amount=Decimal('10.00'), method='upi') for _ in range(rows)), batch_size=5000,
+        )
+        tracemalloc.start()
+        started = time.perf_counter()
+        with open(os.devnull, 'w') as sink:
+            for chunk in exports.stream(WITHDRAWALS, 'csv'):
+                sink.write(chunk)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"\nexport of {rows} withdrawals: {elapsed:.2f}s, peak {peak / 2 ** 20:.1f} MiB")
+        return peak
+
+    def test_memory_stays_flat(self):
+        make_user("bench")
+        small, large = self.export_peak(10_000), self.export_peak(100_000)
+        self.assertLess(large, small * 2)
+
+
+class LockedBalanceReconciliationTests(TestCase):
+    def setUp(self):
+        self.wallets = [make_wallet(f"dev{n}", '100.00') for n in range(4)]
+        for wallet in self.wallets:
+            make_withdrawal(wallet, '20.00')
+            make_withdrawal(wallet, '5.00')
+        # Approved and submitted payouts keep their funds locked too
+        bulk.approve_requests(WithdrawalRequest.objects.filter(user=self.wallets[0].user).values_list('pk', flat=True),
+                              make_user("admin"))
+        payouts.process(gateways.FakeGateway(), "w1", concurrency=1)
+
+    def test_balanced_wallets_pass(self):
+        out = StringIO()
+        call_command('reconcile_locked_balances', chunk_size=2, stdout=out)
+        self.assertIn("checked 5 wallets: all balanced", out.getvalue())
+
+    def test_drift_is_reported_and_runs_resume_from_the_checkpoint(self):
+        drifted = self.wallets[2]
+        UserWallet.objects.filter(pk=drifted.pk).update(locked_balance=Decimal('30.00'))
+        # An earlier run stopped after the first two wallets
+        stopped = ReconciliationRun.objects.create(last_wallet_id=self.wallets[1].pk, wallets_checked=2)
+
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "found 1 discrepancies in 5 wallets"):
+            call_command('reconcile_locked_balances', chunk_size=2, stdout=out)
+        self.assertIn(f"Resuming reconciliation {stopped.pk}", out.getvalue())
+        [discrepancy] = LockedBalanceDiscrepancy.objects.all()
+        self.assertEqual((discrepancy.run_id, discrepancy.wallet_id, discrepancy.expected_locked, discrepancy.difference),
+                         (stopped.pk, drifted.pk, Decimal('25.00'), Decimal('5.00')))
+
+        fresh = reconcile.run(chunk_size=100)
+        self.assertNotEqual(fresh.pk, stopped.pk)
+        self.assertEqual((fresh.wallets_checked, fresh.discrepancy_count), (5, 1))
+
+    def test_queries_grow_with_chunks_not_wallets(self):
+        with CaptureQueriesContext(connection) as few:
+            reconcile.run(chunk_size=100)
+        for n in range(10):
+            make_withdrawal(make_wallet(f"more{n}", '10.00'), '10.00')
+        with CaptureQueriesContext(connection) as many:
+            reconcile.run(chunk_size=100)
+        self.assertEqual(len(many), len(few))
+
+
+@skipUnless(os.environ.get('VISORA_BENCHMARKS'), "set VISORA_BENCHMARKS=1 to run benchmarks")
+class WithdrawalBulkBenchmark(TestCase):
+    ROWS = 10_000
+    USERS = 1_000
+
+    def test_bulk_reject(self):
+        users = CustomUser.objects.bulk_create(
+            CustomUser(username=f"bench{n}", email=f"bench{n}@example.com") for n in range(self.USERS)
+        )
+        per_user = self.ROWS // self.USERS
+        UserWallet.objects.bulk_create(
+            UserWallet(user=user, locked_balance=Decimal('10.00') * per_user) for user in users
+        )
+        ledger.open_balances(UserWallet, LedgerEntry)
+        WithdrawalRequest.objects.bulk_create(
+            WithdrawalRequest(user=user, amount=Decimal('10.00'), method='upi') for user in users for _ in range(per_user)
+        )
+        summaries.rebuild()  # bulk_create() skipped the signup signal
+        ids = list(WithdrawalRequest.objects.values_list('pk', flat=True))
+
+        started = time.perf_counter()
+        result = bulk.reject_requests(ids, make_user("admin"), "benchmark")
+        elapsed = time.perf_counter() - started
+
+        print(f"\nbulk reject of {len(ids)} requests over {self.USERS} wallets: {elapsed:.2f}s")
+        self.assertEqual(result.counts, {bulk.REJECTED: self.ROWS})
+        self.assertFalse(UserWallet.objects.exclude(locked_balance=0).exists())
+        self.assertEqual(list(ledger.audit()), [])
+
+
+@skipUnless(os.environ.get('VISORA_BENCHMARKS'), "set VISORA_BENCHMARKS=1 to run benchmarks")
+class PayoutWorkerBenchmark(TransactionTestCase):
+    """ Gateway latency dominates a payout; bounded concurrency overlaps it. """
+    JOBS = 100
+    LATENCY = 0.05
+
+    def test_concurrent_worker(self):
+        for n in range(self.JOBS):
+            wallet = make_wallet(f"dev{n}", '10.00')
+            make_withdrawal(wallet, '10.00')
+        bulk.approve_requests(WithdrawalRequest.objects.values_list('pk', flat=True), make_user("admin"))
+
+        started = time.perf_counter()
+        while payouts.process(gateways.FakeGateway(latency=self.LATENCY), "bench", limit=50, concurrency=8):
+            pass
+        elapsed = time.perf_counter() - started
+
+        print(f"\n{self.JOBS} payouts at {self.LATENCY * 1000:.0f}ms gateway latency, concurrency 8: {elapsed:.2f}s "
+              f"(sequential: {self.JOBS * self.LATENCY:.2f}s of latency alone)")
+        self.assertEqual(PayoutJob.objects.filter(status=PayoutJob.StatusChoices.SUBMITTED).count(), self.JOBS)
+        self.assertLess(elapsed, self.JOBS * self.LATENCY)
+
+
+@skipUnless(os.environ.get('VISORA_BENCHMARKS'), "set VISORA_BENCHMARKS=1 to run benchmarks")
+class ReconciliationBenchmark(TestCase):
+    WALLETS = int(os.environ.get('VISORA_BENCHMARK_WALLETS', 100_000))
+
+    def test_scan(self):
+        users = CustomUser.objects.bulk_create(
+            (CustomUser(username=f"bench{n}", email=f"bench{n}@example.com") for n in range(self.WALLETS)),
+            batch_size=5000,
+        )
+        UserWallet.objects.bulk_create(
+            (UserWallet(user=user, locked_balance=Decimal('10.00') if n % 2 else 0) for n, user in enumerate(users)),
+            batch_size=5000,
+        )
+        WithdrawalRequest.objects.bulk_create(
+            (WithdrawalRequest(user=user, amount=Decimal('10.00'), method='upi') for user in users[1::2]),
+            batch_size=5000,
+        )
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        result = reconcile.run()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"\nreconciled {self.WALLETS} wallets in {elapsed:.2f}s ({self.WALLETS / elapsed:.0f}/s), "
+              f"peak {peak / 2 ** 20:.1f} MiB")
+        self.assertEqual((result.wallets_checked, result.discrepancy_count), (self.WALLETS, 0))
@@ -5,6 +5,8 @@ from .views import (
     RequestWithdrawalView,
     AdminWithdrawalActionView, # Keep if you plan to use it
     UserWithdrawalHistoryView,
+    PayoutCallbackView,
+    WithdrawalExportView,
 )
 
 app_name = 'wallet'
@@ -17,4 +19,8 @@ urlpatterns = [
 
     # Admin action endpoint (requires admin user)
     path('admin/withdrawal/<uuid:request_uuid>/action/', AdminWithdrawalActionView.as_view(), name='admin-withdrawal-action'),
+    path('admin/withdrawals/export/', WithdrawalExportView.as_view(), name='admin-withdrawal-export'),
+
+    # Payout gateway webhook (signed by the gateway, no user auth)
+    path('payouts/callback/', PayoutCallbackView.as_view(), name='payout-callback'),
 ]
\ No newline at end of file
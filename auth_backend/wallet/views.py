@@ -1,5 +1,5 @@
 # wallet/views.py
-from rest_framework import generics, permissions, status, views
+from rest_framework import generics, permissions, serializers, status, views
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication # Or JWTAuthentication etc.
 from django.shortcuts import get_object_or_404
@@ -7,9 +7,14 @@ from django.utils import timezone
 from django.db import transaction # Keep if needed for Admin view
 import uuid # For admin view lookup
 
-from .models import UserWallet, WithdrawalRequest
+from auth_backend.exports import ExportView
+from auth_backend.pagination import RequestedAtPagination
+
+from . import gateways, ledger, payouts, summaries
+from .exports import WITHDRAWALS
+from .models import UserWallet, WalletSummary, WithdrawalRequest
 from .serializers import (
-    UserWalletSerializer,
+    WalletSummarySerializer,
     WithdrawalHistorySerializer,
     WithdrawalCreateSerializer,
 )
@@ -17,14 +22,16 @@ from .serializers import (
 # --- View to get User's Wallet Balance ---
 class WalletBalanceView(views.APIView):
     """
-    API endpoint that allows users to view their wallet balance.
+    API endpoint that allows users to view their wallet balance, pending
+    withdrawals and lifetime earnings: one primary-key read of WalletSummary.
     """
     authentication_classes = [TokenAuthentication] # Or your preferred auth
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        wallet, created = UserWallet.objects.get_or_create(user=request.user)
-        serializer = UserWalletSerializer(wallet)
+        # Reads never write: a user without a summary yet simply has nothing
+        summary = WalletSummary.objects.filter(pk=request.user.pk).first() or WalletSummary(user_id=request.user.pk)
+        serializer = WalletSummarySerializer(summary)
         return Response(serializer.data)
 
 # --- View to list User's Withdrawal History ---
@@ -35,6 +42,7 @@ class UserWithdrawalHistoryView(generics.ListAPIView):
     serializer_class = WithdrawalHistorySerializer
     authentication_classes = [TokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = RequestedAtPagination
 
     def get_queryset(self):
         """
@@ -114,55 +122,78 @@ class AdminWithdrawalActionView(views.APIView):
              return Response({"error": "Invalid or not found withdrawal request ID."}, status=status.HTTP_404_NOT_FOUND)
 
 
-        # --- Check Current Status ---
-        if withdrawal_request.status != WithdrawalRequest.StatusChoices.PENDING:
+        if action == 'reject' and not rejection_reason:
+            return Response({"error": "Rejection reason is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # --- Process Action ---
+        # The wallet is locked before the request (the order wallet.bulk and wallet.payouts use) and the
+        # status change is a guarded UPDATE, so a concurrent approve/reject can't be applied on top of this one
+        try:
+            with transaction.atomic():
+                wallet_id = UserWallet.objects.select_for_update().values_list('pk', flat=True).get(
+                    user_id=withdrawal_request.user_id,
+                )
+                pending = WithdrawalRequest.objects.filter(
+                    pk=withdrawal_request.pk, status=WithdrawalRequest.StatusChoices.PENDING,
+                )
+                changes = {'processed_by': request.user, 'processed_at': timezone.now()}
+                if action == 'approve':
+                    changes['status'] = WithdrawalRequest.StatusChoices.APPROVED
+                else:
+                    changes.update(status=WithdrawalRequest.StatusChoices.REJECTED, rejection_reason=rejection_reason)
+                if not pending.update(**changes):
+                    withdrawal_request.refresh_from_db(fields=['status'])
+                    return Response(
+                        {"error": f"Request is already in '{withdrawal_request.get_status_display()}' status."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                summaries.apply(withdrawal_request.user_id, pending=-1, pending_amount=-withdrawal_request.amount)
+
+                if action == 'approve':
+                    # The payout itself runs in a worker (wallet.payouts); funds stay locked until it settles
+                    payouts.enqueue([withdrawal_request.pk])
+                    return Response({"message": "Request approved. Payout queued."}, status=status.HTTP_200_OK)
+
+                # Unlock funds; only the request's first move out of PENDING gets here
+                ledger.post(
+                    wallet_id, ledger.Kind.WITHDRAWAL_RELEASE, withdrawal_request.amount,
+                    reference=withdrawal_request.request_id,
+                )
+                return Response({"message": "Request rejected and funds unlocked."}, status=status.HTTP_200_OK)
+        except UserWallet.DoesNotExist:
+            return Response({"error": "The requesting user has no wallet."}, status=status.HTTP_409_CONFLICT)
+        # Both roll the rejection back; the wallet no longer matches its requests (see reconcile_locked_balances)
+        except ledger.InsufficientFunds:
             return Response(
-                {"error": f"Request is already in '{withdrawal_request.get_status_display()}' status."},
-                status=status.HTTP_400_BAD_REQUEST
+                {"error": "The wallet's locked balance doesn't cover this request."}, status=status.HTTP_409_CONFLICT
             )
+        except ledger.DuplicateEntry:
+            return Response({"error": "This request's funds were already released."}, status=status.HTTP_409_CONFLICT)
 
-        # --- Process Action ---
-        with transaction.atomic():
-            wallet = UserWallet.objects.select_for_update().get(user=withdrawal_request.user)
-
-            if action == 'approve':
-                # ** TODO: Implement Razorpay Payout Triggering Logic Here **
-                # 1. Get withdrawal_request.razorpay_fund_account_id
-                # 2. Call Razorpay Payout API: client.payout.create({...})
-                # 3. Handle Razorpay API response (success/error)
-                # 4. If payout initiated successfully:
-                #    - Store razorpay_payout_id from response
-                #    - Set status to APPROVED or PROCESSING (based on Razorpay sync/async response)
-                #    - Set processed_by=request.user, processed_at=timezone.now()
-                #    - Save withdrawal_request
-                #    - **Note:** Balance remains locked until webhook confirms payout completion.
-                # For Demonstration: Simulate approval without payout
-                withdrawal_request.status = WithdrawalRequest.StatusChoices.APPROVED
-                withdrawal_request.processed_by = request.user
-                withdrawal_request.processed_at = timezone.now()
-                withdrawal_request.razorpay_payout_id = f"sim_pout_{uuid.uuid4()}" # Simulated Payout ID
-                withdrawal_request.save()
-                # Balance remains locked in this simplified version. Real app needs webhook.
-                return Response({"message": "Request approved (Payout simulation complete). Status updated."}, status=status.HTTP_200_OK)
-                # --- End Payout Logic ---
-
-            elif action == 'reject':
-                if not rejection_reason:
-                    return Response({"error": "Rejection reason is required."}, status=status.HTTP_400_BAD_REQUEST)
-
-                # Unlock funds
-                wallet.locked_balance -= withdrawal_request.amount
-                wallet.withdrawable_balance += withdrawal_request.amount
-                wallet.save()
-
-                # Update request status
-                withdrawal_request.status = WithdrawalRequest.StatusChoices.REJECTED
-                withdrawal_request.rejection_reason = rejection_reason
-                withdrawal_request.processed_by = request.user
-                withdrawal_request.processed_at = timezone.now()
-                withdrawal_request.save()
 
-                return Response({"message": "Request rejected and funds unlocked."}, status=status.HTTP_200_OK)
+# --- Accounting export (admins only), streamed ---
+class WithdrawalExportView(ExportView):
+    """ All withdrawal requests as CSV or NDJSON, optionally within a requested_at range. """
+    dataset = WITHDRAWALS
 
-        # Should not be reached if logic is correct
-        return Response({"error": "An unexpected error occurred."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+
+# --- Payout gateway callback (webhook) ---
+class PayoutCallbackView(views.APIView):
+    """
+    Receives payout status changes from the payout gateway. The gateway
+    signs its callbacks; they are applied idempotently, so redeliveries
+    are harmless.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            callback = gateways.get_gateway().parse_callback(request.body, request.headers)
+        except gateways.InvalidCallback:
+            return Response({"error": "Invalid callback."}, status=status.HTTP_400_BAD_REQUEST)
+        withdrawal = payouts.settle(callback.reference, callback.status)
+        if withdrawal is None:
+            # Not recorded yet (or not ours); a non-2xx answer makes the gateway redeliver it
+            return Response({"error": "Unknown payout."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"status": withdrawal.status}, status=status.HTTP_200_OK)